@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import math
+import time
+import pandas as pd
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+RULES_PATH = os.path.join(BASE_DIR, "../backend/models/apriori_rules.json")
+RULES_BIN_PATH = os.path.join(BASE_DIR, "../backend/models/apriori_rules.bin")
+sys.path.insert(0, SRC_DIR)
+
+from rules_index import RuleIndex
+
+# === CONFIGURACIÓN ===
+TERMS = [None, "bone", "mice", "space", "gene", "radiation", "plant", "inexistente"]
+CONFIDENCES = [0.5, 0.7, 0.9]
+PAGES = [(0, 10), (20, 100)]
+REPEAT = 20
+
+
+def pandas_query(rules_df, term, min_confidence, skip, limit):
+    """Implementación original de /associations sobre el DataFrame de reglas."""
+    temp_df = rules_df[rules_df['confidence'] >= min_confidence].copy()
+    if term:
+        temp_df = temp_df[temp_df['antecedents'].apply(lambda x: term in x)]
+    temp_df = temp_df.sort_values(by=['lift', 'confidence'], ascending=False)
+    return len(temp_df), temp_df.iloc[skip : skip + limit].to_dict(orient='records')
+
+
+def index_query(rule_index, term, min_confidence, skip, limit):
+    total, rule_ids = rule_index.query(antecedent=term, min_confidence=min_confidence, skip=skip, limit=limit)
+    return total, rule_index.records(rule_ids)
+
+
+def same_results(expected, result):
+    """Compara dos respuestas; las métricas con tolerancia (pd.read_json no parsea floats con precisión completa)."""
+    if expected[0] != result[0] or len(expected[1]) != len(result[1]):
+        return False
+    for a, b in zip(expected[1], result[1]):
+        if a['antecedents'] != b['antecedents'] or a['consequents'] != b['consequents']:
+            return False
+        if not all(math.isclose(a[m], b[m], rel_tol=1e-9) for m in ('support', 'confidence', 'lift')):
+            return False
+    return True
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) / REPEAT * 1000
+
+
+# === CARGA ===
+start = time.perf_counter()
+rules_df = pd.read_json(RULES_PATH, orient='records')
+pandas_load_ms = (time.perf_counter() - start) * 1000
+
+start = time.perf_counter()
+with open(RULES_PATH, 'r', encoding='utf-8') as f:
+    rule_index = RuleIndex.from_records(json.load(f))
+index_load_ms = (time.perf_counter() - start) * 1000
+
+print(f"Reglas: {len(rule_index)}")
+print(f"Carga pandas: {pandas_load_ms:.1f} ms | Carga + construcción del índice: {index_load_ms:.1f} ms")
+if os.path.exists(RULES_BIN_PATH):
+    start = time.perf_counter()
+    RuleIndex.load(RULES_BIN_PATH)
+    print(f"Carga del almacén binario (mmap): {(time.perf_counter() - start) * 1000:.2f} ms")
+print()
+
+# === COMPARACIÓN ===
+print(f"{'término':<12} {'conf':>5} {'página':>9} {'total':>6} {'pandas (ms)':>12} {'índice (ms)':>12} {'speedup':>8}")
+mismatches = 0
+for term in TERMS:
+    for min_confidence in CONFIDENCES:
+        for skip, limit in PAGES:
+            expected, pandas_ms = timed(pandas_query, rules_df, term, min_confidence, skip, limit)
+            result, index_ms = timed(index_query, rule_index, term, min_confidence, skip, limit)
+            if not same_results(expected, result):
+                mismatches += 1
+            print(f"{str(term):<12} {min_confidence:>5} {f'{skip}:{skip + limit}':>9} {result[0]:>6} "
+                  f"{pandas_ms:>12.3f} {index_ms:>12.3f} {pandas_ms / max(index_ms, 1e-9):>7.0f}x")
+
+if mismatches:
+    print(f"\n¡ADVERTENCIA! {mismatches} consultas devolvieron resultados distintos a la implementación con pandas.")
+else:
+    print("\nTodas las consultas devuelven los mismos resultados que la implementación con pandas.")
@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import tracemalloc
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+sys.path.insert(0, SRC_DIR)
+
+from fastapi.testclient import TestClient
+import api
+
+# === CONFIGURACIÓN ===
+EXPORTS = [
+    "/export/articles",
+    "/export/articles?search=bone",
+    "/export/associations?min_confidence=0",
+    "/export/associations?term=space",
+]
+REPEAT = 5
+MB = 1e6
+
+
+def stream(client, url):
+    """Descarga `url` en streaming, sin descomprimir, y devuelve los bytes recibidos."""
+    wire = 0
+    with client.stream("GET", url) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw():
+            wire += len(chunk)
+    return wire
+
+
+def measure(client, url, gzip):
+    """
+    Devuelve (bytes de NDJSON, bytes en el cable, segundos por descarga, pico de memoria Python).
+    El pico incluye cliente y servidor, que corren en el mismo proceso.
+    """
+    plain_bytes = stream(client, url)
+    if gzip:
+        url += ("&" if "?" in url else "?") + "gzip=true"
+    wire_bytes = stream(client, url)
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        stream(client, url)
+    seconds = (time.perf_counter() - start) / REPEAT
+
+    tracemalloc.start()
+    stream(client, url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return plain_bytes, wire_bytes, seconds, peak
+
+
+if __name__ == "__main__":
+    client = TestClient(api.app)
+    print(f"{'exportación':<42} {'NDJSON (MB)':>11} {'cable (MB)':>10} {'s':>7} {'MB/s':>8} {'pico (MB)':>9}")
+    for url in EXPORTS:
+        for gzip in (False, True):
+            plain_bytes, wire_bytes, seconds, peak = measure(client, url, gzip)
+            label = url + (" [gzip]" if gzip else "")
+            print(f"{label:<42} {plain_bytes / MB:>11.2f} {wire_bytes / MB:>10.2f} {seconds:>7.3f} "
+                  f"{plain_bytes / MB / seconds:>8.1f} {peak / MB:>9.2f}")
+    print("\nMB/s = MB de NDJSON sin comprimir por segundo (cliente ASGI local, sin red).")
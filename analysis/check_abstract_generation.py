@@ -0,0 +1,173 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+from collections import Counter
+
+import pandas as pd
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+sys.path.insert(0, SRC_DIR)
+
+import generate_missing_abstracts as gma
+
+# === CONFIGURACIÓN DE LA PRUEBA ===
+NUM_ARTICLES = gma.QUEUE_SIZE + 8   # Más artículos que huecos en la cola: la extracción tiene que esperar
+BROWSER_WORKERS = 2
+MAX_IN_FLIGHT = 2
+REQUESTS_PER_MINUTE = 1200          # Una petición cada 50 ms
+FLAKY = {"article-3", "article-7"}  # Fallan una vez y se reintentan
+UNWRITABLE = {"article-5", "article-11"}  # Su abstract no se puede escribir en el CSV
+TIMEOUT_SECONDS = 60                # Si el pipeline se bloquea, la prueba falla en vez de colgarse
+PAGE_HTML = "<html><body><p>{title}: " + "full text of the article " * 4 + "</p></body></html>"
+
+
+class FakeDriver:
+    """Navegador falso: la página tarda un poco en cargar y se renderiza en la segunda lectura."""
+
+    events = []
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.url = None
+        self.reads = 0
+
+    def get(self, url):
+        time.sleep(0.02)
+        self.url = url
+        self.reads = 0
+        with self.lock:
+            self.events.append(("extracted", url, time.monotonic()))
+
+    @property
+    def page_source(self):
+        self.reads += 1
+        if self.reads < 2:
+            return "<html><body>Loading...</body></html>"
+        return PAGE_HTML.format(title=self.url.rsplit("/", 1)[-1])
+
+    def quit(self):
+        pass
+
+
+class Unwritable:
+    """Texto que el modelo devuelve y que falla al convertirse para el CSV (simula un error al escribir)."""
+
+    def strip(self):
+        return self
+
+    def __bool__(self):
+        return True
+
+    def __str__(self):
+        raise ValueError("unwritable abstract")
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Modelo falso: registra cada llamada y falla una vez con los artículos de FLAKY."""
+
+    def __init__(self, output_path, unwritable=()):
+        self.output_path = output_path
+        self.unwritable = set(unwritable)
+        self.calls = []
+        self.rows_seen = []
+        self.failed_once = set()
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        title = prompt.split("'")[1]
+        with self.lock:
+            self.calls.append((title, time.monotonic()))
+            # Filas ya escritas en el CSV cuando empieza cada llamada (escritura incremental)
+            self.rows_seen.append(len(pd.read_csv(self.output_path)) if os.path.exists(self.output_path) else 0)
+            if title in FLAKY and title not in self.failed_once:
+                self.failed_once.add(title)
+                raise RuntimeError("503 transient error")
+        if title in self.unwritable:
+            return FakeResponse(Unwritable())
+        return FakeResponse(f"Generated abstract for {title}.")
+
+
+def run(failed_path, output_path, model):
+    """Ejecuta el pipeline en un hilo aparte; devuelve False si no termina en TIMEOUT_SECONDS."""
+    FakeDriver.events.clear()
+    thread = threading.Thread(target=gma.generate_missing_abstracts, daemon=True, kwargs={
+        "failed_path": failed_path, "output_path": output_path, "driver_factory": FakeDriver, "model": model,
+        "use_cache": False, "browser_workers": BROWSER_WORKERS, "max_in_flight": MAX_IN_FLIGHT,
+        "requests_per_minute": REQUESTS_PER_MINUTE,
+    })
+    thread.start()
+    thread.join(TIMEOUT_SECONDS)
+    return not thread.is_alive()
+
+
+def report(name, ok):
+    print(f"{'✅' if ok else '❌'} {name}")
+    return ok
+
+
+if __name__ == "__main__":
+    all_ok = True
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        failed_path = os.path.join(tmp_dir, "failed_articles.csv")
+        output_path = os.path.join(tmp_dir, "generated_abstracts.csv")
+        titles = [f"article-{i}" for i in range(NUM_ARTICLES)]
+        links = [f"https://example.org/pmc/{title}" for title in titles]
+        pd.DataFrame({"title": titles, "link": links}).to_csv(failed_path, index=False)
+        # Un artículo ya generado en una ejecución anterior
+        pd.DataFrame({"title": [titles[0]], "link": [links[0]], "abstract": ["Previous abstract."]}).to_csv(
+            output_path, index=False)
+
+        # === PRIMERA EJECUCIÓN ===
+        print("Primera ejecución con navegador y modelo falsos...")
+        model = FakeModel(output_path, unwritable=UNWRITABLE)
+        start = time.monotonic()
+        if not run(failed_path, output_path, model):
+            print(f"\n❌ El pipeline no terminó en {TIMEOUT_SECONDS} s")
+            sys.exit(1)
+        print(f"({time.monotonic() - start:.1f} s)\n")
+
+        generated = pd.read_csv(output_path)
+        expected = set(titles) - UNWRITABLE
+        all_ok &= report("Se generan todos los artículos salvo los que fallan al escribirse",
+                         set(generated["title"]) == expected and len(generated) == len(expected))
+        all_ok &= report("El artículo ya generado no se vuelve a pedir al modelo",
+                         titles[0] not in {title for title, _ in model.calls})
+        calls_per_title = Counter(title for title, _ in model.calls)
+        all_ok &= report("Los fallos transitorios del modelo se reintentan",
+                         all(calls_per_title[title] == (2 if title in FLAKY else 1) for title in calls_per_title))
+        call_times = sorted(t for _, t in model.calls)
+        interval = 60.0 / REQUESTS_PER_MINUTE
+        all_ok &= report("El límite de peticiones por minuto se respeta",
+                         call_times[-1] - call_times[0] >= (len(call_times) - 1) * interval * 0.95)
+        last_extraction = max(t for _, _, t in FakeDriver.events)
+        all_ok &= report("Extracción y generación se solapan (cola acotada entre las dos etapas)",
+                         call_times[0] < last_extraction)
+        all_ok &= report("Cada abstract se añade al CSV en cuanto está listo", max(model.rows_seen) > 1)
+
+        # === REANUDACIÓN ===
+        print("\nSegunda ejecución (reanudación desde el CSV)...")
+        model = FakeModel(output_path)
+        if not run(failed_path, output_path, model):
+            print(f"\n❌ El pipeline no terminó en {TIMEOUT_SECONDS} s")
+            sys.exit(1)
+        print()
+        all_ok &= report("Reanudación: solo se piden los artículos que faltaban",
+                         {title for title, _ in model.calls} == UNWRITABLE)
+        generated = pd.read_csv(output_path)
+        all_ok &= report("Reanudación: el CSV queda completo, sin duplicados ni cabeceras repetidas",
+                         sorted(generated["title"]) == sorted(titles) and generated["link"].is_unique)
+
+    if all_ok:
+        print("\nEl pipeline de generación se comporta como se espera con el navegador y el modelo falsos.")
+    else:
+        print("\n¡ADVERTENCIA! El pipeline de generación no se comporta como se espera.")
+        sys.exit(1)
@@ -1,40 +1,48 @@
+import numpy as np
 import pandas as pd
 import os
+import sys
 
 # Ruta al dataset
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "../data/final_dataset.csv")
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+sys.path.insert(0, SRC_DIR)
+
+from integrity_checks import LinkIndex, link_uniqueness, content_discrepancy, normalize_links
+from near_duplicates import NearDuplicateIndex
 
 # Cargar datos
 print(f"Cargando dataset desde: {DATA_PATH}")
 df = pd.read_csv(DATA_PATH)
 
-# Contar duplicados basados en la columna 'link'
-duplicate_links_mask = df.duplicated(subset=['link'], keep=False)
-num_duplicates_by_link = duplicate_links_mask.sum()
+# Links duplicados (comparados por id de PMC, sin importar el host) y, entre ellos, los que tienen títulos o abstracts diferentes (sobre hashes, sin agrupar fila a fila)
+link_index = LinkIndex(df['link'])
+uniqueness = link_uniqueness(link_index)
+num_duplicates_by_link = int((link_index.row_counts > 1).sum())
 
 print(f"\nNúmero total de filas: {len(df)}")
 print(f"Número de filas con links duplicados: {num_duplicates_by_link}")
 
-if num_duplicates_by_link > 0:
+if uniqueness['duplicate_rows'] > 0:
     print("\n--- Verificando contenido de filas con links duplicados ---")
-    
-    # Obtener solo las filas que tienen links duplicados
-    df_duplicates = df[duplicate_links_mask].sort_values(by='link')
-    
-    # Agrupar por link y verificar si los títulos o abstracts son diferentes
-    has_content_discrepancy = False
-    for link, group in df_duplicates.groupby('link'):
-        if group['title'].nunique() > 1 or group['abstract'].nunique() > 1:
-            print(f"\n¡ADVERTENCIA! Link '{link}' tiene títulos o abstracts diferentes:")
-            print(group[['title', 'abstract']])
-            has_content_discrepancy = True
-        # else:
-            # print(f"\nLink '{link}' tiene contenido idéntico (título y abstract).") # Descomentar para ver los que son idénticos
-            
-    if not has_content_discrepancy:
-        print("\nTodos los links duplicados tienen títulos y abstracts idénticos. Es seguro eliminar duplicados por 'link'.")
-    else:
+    discrepancy = content_discrepancy(link_index, df['title'].to_numpy(dtype=object), df['abstract'].to_numpy(dtype=object))
+
+    if discrepancy['discrepant_links']:
+        print(f"\n¡ADVERTENCIA! {discrepancy['discrepant_links']} links tienen títulos o abstracts diferentes. Ejemplos:")
+        # Todas las filas de cada link de ejemplo, también las que lo tienen bajo otro host
+        examples = df[np.isin(link_index.keys, normalize_links(discrepancy['examples']))].sort_values(by='link')
+        print(examples[['link', 'title', 'abstract']])
         print("\nSe encontraron links duplicados con contenido diferente. Se requiere una revisión manual.")
+    else:
+        print("\nTodos los links duplicados tienen títulos y abstracts idénticos. Es seguro eliminar duplicados por 'link'.")
 else:
-    print("\nNo se encontraron links duplicados.")
\ No newline at end of file
+    print("\nNo se encontraron links duplicados.")
+
+# Casi duplicados: mismo artículo con otro link y título o abstract ligeramente distintos (MinHash + LSH)
+print("\n--- Buscando casi duplicados (títulos y abstracts limpios) ---")
+near_index = NearDuplicateIndex()
+near_pairs, _ = near_index.insert(df['link'].tolist(), df['title'].tolist(), df['clean_abstract'].tolist())
+print(f"Pares con Jaccard estimada >= {near_index.threshold}: {len(near_pairs)}")
+for link, duplicate_of, similarity in near_pairs:
+    print(f"  {similarity:.2f}  {link}  ~  {duplicate_of}")
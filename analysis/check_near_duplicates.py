@@ -0,0 +1,78 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+DATA_PATH = os.path.join(BASE_DIR, "../data/final_dataset.csv")
+sys.path.insert(0, SRC_DIR)
+
+from near_duplicates import NearDuplicateIndex, INDEX_PATH, REPORT_PATH, THRESHOLD
+
+# El mismo artículo de PMC bajo el host antiguo y el nuevo (filas 51 y 554 del dataset)
+KNOWN_PAIR = ("https://pmc.ncbi.nlm.nih.gov/articles/PMC6915713/", "https://www.ncbi.nlm.nih.gov/pmc/articles/PMC6915713/")
+# Copias sintéticas: una palabra cambiada cada EDIT_EVERY da una Jaccard de shingles algo por encima del umbral
+EDIT_EVERY = 40
+MIN_RECALL = 0.9
+
+
+def report(name, ok):
+    print(f"{'✅' if ok else '❌'} {name}")
+    return ok
+
+
+def exact_jaccard(index, titles, abstracts, other_titles, other_abstracts):
+    """Jaccard exacta entre los conjuntos de shingles de cada par (sin MinHash)."""
+    values, offsets = index.shingler.batch(list(titles) + list(other_titles), list(abstracts) + list(other_abstracts))
+    n = len(titles)
+    similarities = []
+    for i in range(n):
+        a = set(values[offsets[i]:offsets[i + 1]].tolist())
+        b = set(values[offsets[n + i]:offsets[n + i + 1]].tolist())
+        similarities.append(len(a & b) / max(1, len(a | b)))
+    return np.asarray(similarities)
+
+
+if __name__ == "__main__":
+    df = pd.read_csv(DATA_PATH, dtype=str)
+    all_ok = True
+
+    # 1. El par conocido aparece al indexar el corpus y en el reporte guardado
+    index = NearDuplicateIndex()
+    print(f"LSH: {index.bands} bandas x {index.rows} filas, umbral {index.threshold}")
+    pairs, _ = index.insert(df["link"].tolist(), df["title"].tolist(), df["clean_abstract"].tolist())
+    found = {(link, duplicate_of) for link, duplicate_of, _ in pairs}
+    all_ok &= report(f"Par conocido detectado al indexar el corpus ({KNOWN_PAIR[0]})", KNOWN_PAIR in found)
+    saved = pd.read_csv(REPORT_PATH, dtype=str)
+    all_ok &= report("Par conocido presente en el reporte guardado",
+                     bool(((saved["link"] == KNOWN_PAIR[0]) & (saved["duplicate_of"] == KNOWN_PAIR[1])).any()))
+
+    # 2. El índice guardado detecta una copia del artículo (el camino de append_articles.py)
+    saved_index = NearDuplicateIndex.load(INDEX_PATH)
+    row = df[df["link"] == KNOWN_PAIR[0]].iloc[0]
+    pairs, _ = saved_index.insert(["copia"], [row["title"]], [row["clean_abstract"]], skip_duplicates=True)
+    all_ok &= report("El índice guardado detecta una copia del artículo",
+                     {duplicate_of for _, duplicate_of, _ in pairs} >= set(KNOWN_PAIR))
+
+    # 3. Exhaustividad del LSH con copias sintéticas por encima del umbral
+    abstracts = df["clean_abstract"].fillna("").tolist()
+    edited = []
+    for abstract in abstracts:
+        words = abstract.split()
+        words[EDIT_EVERY // 2::EDIT_EVERY] = ["editado"] * len(words[EDIT_EVERY // 2::EDIT_EVERY])
+        edited.append(" ".join(words))
+    similarity = exact_jaccard(index, df["title"], abstracts, df["title"], edited)
+    above = np.flatnonzero((similarity >= THRESHOLD + 0.02) & (similarity < 1.0))
+    original_keys = index.band_keys(index.signatures_for(df["title"].iloc[above], [abstracts[i] for i in above]))
+    edited_keys = index.band_keys(index.signatures_for(df["title"].iloc[above], [edited[i] for i in above]))
+    recall = float((original_keys == edited_keys).any(axis=1).mean())
+    all_ok &= report(f"Exhaustividad del LSH con {len(above)} pares de Jaccard {similarity[above].min():.2f}-"
+                     f"{similarity[above].max():.2f}: {recall:.1%} (mínimo {MIN_RECALL:.0%})", recall >= MIN_RECALL)
+
+    if all_ok:
+        print("\nEl índice de casi duplicados detecta los pares por encima del umbral.")
+    else:
+        print("\n¡ADVERTENCIA! El índice de casi duplicados deja pasar pares por encima del umbral.")
+        sys.exit(1)
@@ -0,0 +1,35 @@
+import os
+import sys
+import filecmp
+import tempfile
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+DATA_PATH = os.path.join(BASE_DIR, "../data/final_merged.csv")
+sys.path.insert(0, SRC_DIR)
+
+from preprocess_abstracts import main, main_streaming
+
+# Bloques pequeños para que haya links duplicados entre bloques distintos
+CHUNKSIZES = [37, 200, 5000]
+
+if __name__ == "__main__":
+    # Comparar el modo streaming con la implementación original sobre los datos incluidos
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        expected_path = os.path.join(tmp_dir, "expected.csv")
+        main(DATA_PATH, expected_path)
+
+        all_equal = True
+        for chunksize in CHUNKSIZES:
+            streamed_path = os.path.join(tmp_dir, f"streamed_{chunksize}.csv")
+            main_streaming(DATA_PATH, streamed_path, chunksize=chunksize, workers=2)
+            equal = filecmp.cmp(expected_path, streamed_path, shallow=False)
+            all_equal &= equal
+            print(f"chunksize={chunksize}: {'idéntico' if equal else '¡DIFERENTE!'}")
+
+    if all_equal:
+        print("\nEl modo streaming produce una salida idéntica byte a byte a la implementación original.")
+    else:
+        print("\n¡ADVERTENCIA! El modo streaming no produce la misma salida que la implementación original.")
+        sys.exit(1)
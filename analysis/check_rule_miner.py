@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import pickle
+import pandas as pd
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+DATA_PATH = os.path.join(BASE_DIR, "../data/final_dataset.csv")
+VECTORIZER_PATH = os.path.join(BASE_DIR, "../backend/models/tfidf_vectorizer.pkl")
+sys.path.insert(0, SRC_DIR)
+
+from itemset_miner import build_bitsets, frequent_itemsets, generate_rules
+
+# Mismos umbrales que model_trainer.py
+MIN_SUPPORT = 0.04
+MIN_CONFIDENCE = 0.5
+LOW_SUPPORT = 0.01
+LOW_SUPPORT_MAX_LEN = 3  # Con 1% el número de itemsets crece combinatoriamente con la longitud
+
+
+def load_transactions():
+    df = pd.read_csv(DATA_PATH)
+    with open(VECTORIZER_PATH, "rb") as f:
+        terms = list(pickle.load(f).get_feature_names_out())
+    term_set = set(terms)
+    transactions = [[word for word in abstract.split() if word in term_set] for abstract in df["clean_abstract"]]
+    return terms, transactions
+
+
+def mlxtend_rules(transactions, min_support, max_len=None):
+    from mlxtend.preprocessing import TransactionEncoder
+    from mlxtend.frequent_patterns import fpgrowth, association_rules
+
+    te = TransactionEncoder()
+    df_onehot = pd.DataFrame(te.fit(transactions).transform(transactions), columns=te.columns_)
+    itemsets = fpgrowth(df_onehot, min_support=min_support, use_colnames=True, max_len=max_len)
+    rules = association_rules(itemsets, metric="confidence", min_threshold=MIN_CONFIDENCE)
+    return {
+        (frozenset(a), frozenset(c)): (s, conf, lift)
+        for a, c, s, conf, lift in zip(rules["antecedents"], rules["consequents"], rules["support"],
+                                       rules["confidence"], rules["lift"])
+    }
+
+
+def bitset_rules(terms, transactions, min_support, max_len=None):
+    term_ids = {term: i for i, term in enumerate(terms)}
+    bitsets, n = build_bitsets(([term_ids[w] for w in t] for t in transactions), len(terms))
+    itemsets = frequent_itemsets(bitsets, n, min_support, max_len)
+    return {
+        (frozenset(terms[i] for i in a), frozenset(terms[i] for i in c)): (s, conf, lift)
+        for a, c, s, conf, lift in generate_rules(itemsets, MIN_CONFIDENCE)
+    }
+
+
+def measure(function, *args):
+    """Ejecuta `function` y devuelve (resultado, segundos, pico de memoria en MB)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def compare(terms, transactions, min_support, max_len=None):
+    """Compara ambos mineros y devuelve True si producen exactamente las mismas reglas y métricas."""
+    expected, mlxtend_seconds, mlxtend_peak = measure(mlxtend_rules, transactions, min_support, max_len)
+    mined, miner_seconds, miner_peak = measure(bitset_rules, terms, transactions, min_support, max_len)
+    print(f"min_support={min_support}, max_len={max_len}:")
+    print(f"  mlxtend: {len(expected)} reglas en {mlxtend_seconds:.2f} s (pico {mlxtend_peak:.1f} MB)")
+    print(f"  bitsets: {len(mined)} reglas en {miner_seconds:.2f} s (pico {miner_peak:.1f} MB)")
+
+    same_rules = expected.keys() == mined.keys()
+    same_metrics = same_rules and all(expected[key] == mined[key] for key in expected)
+    print(f"  Mismas reglas: {same_rules} | Mismas métricas (igualdad exacta): {same_metrics}")
+    return same_metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara el miner por bitsets con mlxtend sobre los datos incluidos.")
+    parser.add_argument("--low-support", action="store_true",
+                        help=f"Comparar también con min_support={LOW_SUPPORT} (mlxtend tarda varios minutos).")
+    args = parser.parse_args()
+
+    terms, transactions = load_transactions()
+    all_equal = compare(terms, transactions, MIN_SUPPORT)
+    if args.low_support:
+        all_equal &= compare(terms, transactions, LOW_SUPPORT, LOW_SUPPORT_MAX_LEN)
+
+    if not all_equal:
+        print("\n¡ADVERTENCIA! El miner por bitsets no reproduce las reglas de mlxtend.")
+        sys.exit(1)
@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pandas as pd
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+sys.path.insert(0, SRC_DIR)
+
+import data_cleaning
+from data_cleaning import clean_data, load_checkpoint
+
+# Páginas de prueba: (estado de cada petición sucesiva, cuerpo de la respuesta 200)
+ARTICLE_HTML = """<html><body><h1>{title}</h1>
+<section class="abstract"><h2>Abstract</h2><p>Abstract of {title}.</p></section>
+</body></html>"""
+FIXTURES = {
+    "/ok": [200],
+    "/rate-limited": [429, 200],   # 429 con Retry-After: 1
+    "/flaky": [503, 503, 200],     # 5xx sin Retry-After: espera exponencial
+    "/missing": [404],
+    "/down": [500],                # falla siempre: error transitorio que agota los reintentos
+}
+MIN_BACKOFF = 0.5  # fetch espera al menos backoff·2^intento·0.5 (backoff = 1 s por defecto)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    requests_by_path = defaultdict(list)  # ruta -> instantes de cada petición
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            times = self.requests_by_path[self.path]
+            times.append(time.monotonic())
+            statuses = FIXTURES.get(self.path, [404])
+            status = statuses[min(len(times), len(statuses)) - 1]
+        body = ARTICLE_HTML.format(title=self.path.strip("/")).encode("utf-8") if status == 200 else b"error"
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def report(name, ok):
+    print(f"{'✅' if ok else '❌'} {name}")
+    return ok
+
+
+if __name__ == "__main__":
+    # Menos reintentos que en producción para que el artículo que falla siempre no alargue la prueba
+    data_cleaning.MAX_RETRIES = 2
+    server = start_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    requests_by_path = FixtureHandler.requests_by_path
+    all_ok = True
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = {
+            "data_path": os.path.join(tmp_dir, "articles.csv"),
+            "output_path": os.path.join(tmp_dir, "cleaned.csv"),
+            "failed_output_path": os.path.join(tmp_dir, "failed.csv"),
+            "checkpoint_path": os.path.join(tmp_dir, "checkpoint.jsonl"),
+        }
+        pd.DataFrame({
+            "Title": [path.strip("/") for path in FIXTURES],
+            "Link": [base_url + path for path in FIXTURES],
+        }).to_csv(paths["data_path"], index=False)
+
+        # === PRIMERA EJECUCIÓN ===
+        print("Primera ejecución contra el servidor local...")
+        clean_data(**paths, workers=4, rate=50)
+        abstracts = pd.read_csv(paths["output_path"]).set_index("title")["abstract"].to_dict()
+        checkpoint = load_checkpoint(paths["checkpoint_path"])
+        print()
+
+        all_ok &= report("200: abstract extraído", abstracts.get("ok") == "Abstract of ok.")
+        gaps = [b - a for path in ("/rate-limited", "/flaky")
+                for a, b in zip(requests_by_path[path], requests_by_path[path][1:])]
+        all_ok &= report(
+            "429 y 5xx: reintentados con espera hasta obtener el abstract",
+            abstracts.get("rate-limited") == "Abstract of rate-limited." and abstracts.get("flaky") == "Abstract of flaky."
+            and len(requests_by_path["/flaky"]) == 3 and min(gaps) >= MIN_BACKOFF,
+        )
+        all_ok &= report(
+            "404: sin reintentos y guardado como fallido en el checkpoint",
+            len(requests_by_path["/missing"]) == 1 and base_url + "/missing" in checkpoint
+            and checkpoint[base_url + "/missing"] is None,
+        )
+        all_ok &= report(
+            "5xx persistente: agota los reintentos y no entra en el checkpoint",
+            len(requests_by_path["/down"]) == data_cleaning.MAX_RETRIES + 1 and base_url + "/down" not in checkpoint,
+        )
+        failed = set(pd.read_csv(paths["failed_output_path"])["title"])
+        all_ok &= report("Fallidos en el CSV de fallidos", failed == {"missing", "down"})
+
+        # === REANUDACIÓN ===
+        # Línea a medio escribir, como la de una ejecución interrumpida
+        with open(paths["checkpoint_path"], "a", encoding="utf-8") as f:
+            f.write('{"link": "' + base_url)
+        before = {path: len(times) for path, times in requests_by_path.items()}
+        print("\nSegunda ejecución (reanudación desde el checkpoint)...")
+        clean_data(**paths, workers=4, rate=50)
+        print()
+        repeated = {path for path, times in requests_by_path.items() if len(times) > before.get(path, 0)}
+        all_ok &= report("Reanudación: solo se vuelve a pedir el artículo sin checkpoint", repeated == {"/down"})
+        resumed = pd.read_csv(paths["output_path"]).set_index("title")["abstract"].to_dict()
+        all_ok &= report("Reanudación: los abstracts del checkpoint se conservan", resumed == abstracts)
+
+    server.shutdown()
+    if all_ok:
+        print("\nLa extracción concurrente se comporta como se espera contra el servidor local.")
+    else:
+        print("\n¡ADVERTENCIA! La extracción concurrente no se comporta como se espera.")
+        sys.exit(1)
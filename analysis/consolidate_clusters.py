@@ -1,8 +1,17 @@
 import pandas as pd
+import numpy as np
 import os
-import pickle
-from sklearn.feature_extraction.text import TfidfVectorizer
+import sys
+import time
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+from threadpoolctl import threadpool_limits
+
+from tfidf_cache import load_tfidf, check_alignment
+from k_sweep import dump_matrix, open_matrix
 
 # === CONSTANTES ===
 # Define el número de sub-clusters para cada cluster principal.
@@ -13,6 +22,8 @@ RECLUSTER_TARGETS = {
     3: 4,  # Cluster 3 -> 4 sub-clusters
     4: 3   # Cluster 4 -> 3 sub-clusters
 }
+FIRST_FINAL_CLUSTER_ID = 100 # Empezar los nuevos IDs desde 100 para evitar colisiones
+AUTO_K_RANGE = range(2, 9) # Rango de k probado por cada cluster con --auto-k
 
 # === RUTAS ===
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -20,55 +31,151 @@ DATA_PATH = os.path.join(BASE_DIR, "../data/final_dataset.csv")
 MODEL_DIR = os.path.join(BASE_DIR, "../backend/models")
 INITIAL_ASSIGNMENTS_PATH = os.path.join(BASE_DIR, "../data/cluster_assignments.csv")
 FINAL_ASSIGNMENTS_PATH = os.path.join(BASE_DIR, "../data/final_cluster_assignments.csv")
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+sys.path.insert(0, SRC_DIR)
+
+from cluster_model import CentroidModel, ClusterHierarchy, CENTROIDS_PATH, HIERARCHY_PATH
+
+# Matriz del proceso worker (se abre una vez por proceso en `_init_worker`)
+_matrix = None
+
+
+def _init_worker(directory, shape):
+    global _matrix
+    _matrix = open_matrix(directory, shape)
+    threadpool_limits(1)
+
+
+def recluster(rows, num_sub_clusters, k_range=None):
+    """
+    Re-clusteriza las filas `rows` de la matriz compartida. Con `k_range`, elige el k con mayor
+    silhouette dentro del rango (ignorando `num_sub_clusters`). Devuelve (k, etiquetas, segundos).
+    """
+    start = time.perf_counter()
+    matrix = _matrix[rows]
+    if k_range is None:
+        sub_kmeans = KMeans(n_clusters=num_sub_clusters, random_state=42, n_init=10)
+        return num_sub_clusters, sub_kmeans.fit_predict(matrix), time.perf_counter() - start
+
+    best = None
+    for k in k_range:
+        if k >= len(rows):
+            break
+        sub_labels = KMeans(n_clusters=k, random_state=42, n_init=10).fit_predict(matrix)
+        score = silhouette_score(matrix, sub_labels)
+        if best is None or score > best[0]:
+            best = (score, k, sub_labels)
+    return best[1], best[2], time.perf_counter() - start
+
+
+def consolidate(parent_labels, tfidf_matrix, targets=RECLUSTER_TARGETS, auto_k=False, k_range=AUTO_K_RANGE,
+                workers=None):
+    """
+    Sub-clusteriza cada cluster principal en paralelo (un proceso por cluster) y devuelve el array
+    de IDs finales (-1 para los artículos sin cluster principal) y un resumen por cluster.
+
+    Los IDs se reparten desde FIRST_FINAL_CLUSTER_ID en el orden de `targets`, una vez terminados
+    todos los ajustes, así que no dependen del orden en que acaben los procesos.
+    """
+    parent_labels = np.asarray(parent_labels)
+    members = {target_id: np.flatnonzero(parent_labels == target_id) for target_id in targets}
+    to_fit = [t for t in targets if len(members[t]) >= (min(k_range) + 1 if auto_k else targets[t])]
+    workers = max(1, min(workers or os.cpu_count(), len(to_fit) or 1))
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="consolidate_") as directory:
+        shape = dump_matrix(tfidf_matrix, directory)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(directory, shape)) as pool:
+            # Los clusters más grandes primero: el tiempo total se acerca al del ajuste más lento
+            futures = {
+                target_id: pool.submit(recluster, members[target_id], targets[target_id], k_range if auto_k else None)
+                for target_id in sorted(to_fit, key=lambda t: len(members[t]), reverse=True)
+            }
+            for target_id, future in futures.items():
+                results[target_id] = future.result()
+
+    final_labels = np.full(len(parent_labels), -1, dtype=np.int64)
+    summary = []
+    next_new_cluster_id = FIRST_FINAL_CLUSTER_ID
+    for target_id in targets:
+        rows = members[target_id]
+        if target_id not in results:
+            # No hay suficientes miembros para clusterizar: se asigna un único ID
+            final_labels[rows] = next_new_cluster_id
+            summary.append({"cluster": target_id, "k": 1, "first_id": next_new_cluster_id, "size": len(rows), "seconds": 0.0})
+            next_new_cluster_id += 1
+            continue
+        k, sub_labels, seconds = results[target_id]
+        final_labels[rows] = next_new_cluster_id + sub_labels
+        summary.append({"cluster": target_id, "k": k, "first_id": next_new_cluster_id, "size": len(rows), "seconds": seconds})
+        next_new_cluster_id += k
+    return final_labels, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consolida los clusters principales en sub-clusters con IDs finales.")
+    parser.add_argument("--auto-k", action="store_true",
+                        help=f"Elegir el k de cada cluster por silhouette (entre {AUTO_K_RANGE.start} y {AUTO_K_RANGE.stop - 1}).")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo.")
+    args = parser.parse_args()
+
+    # === CARGAR DATA Y MODELOS ===
+    print("Cargando dataset, asignaciones iniciales y modelos...")
+    df = pd.read_csv(DATA_PATH)
+    initial_assignments_df = pd.read_csv(INITIAL_ASSIGNMENTS_PATH)
+    df = pd.merge(df, initial_assignments_df, on='link', how='left')
+
+    # Matriz TF-IDF del corpus completo (compartida en caché entre los scripts de análisis)
+    tfidf_vectorizer, tfidf_matrix = load_tfidf()
+    check_alignment(df, tfidf_matrix)
+
+    # === CONSOLIDACIÓN DE CLUSTERS ===
+    print("Iniciando consolidación de clusters...")
+    start = time.perf_counter()
+    final_labels, summary = consolidate(df['cluster'].to_numpy(), tfidf_matrix, auto_k=args.auto_k, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    for entry in summary:
+        if entry["k"] == 1:
+            print(f"\n  ADVERTENCIA: El cluster {entry['cluster']} solo tiene {entry['size']} miembros. "
+                  f"Se asignó un único ID de cluster ({entry['first_id']}).")
+            continue
+        print(f"\nCluster original {entry['cluster']} ({entry['size']} artículos) -> {entry['k']} sub-clusters "
+              f"en {entry['seconds']:.2f} s")
+        for i in range(entry["k"]):
+            print(f"  Sub-cluster {entry['cluster']}.{i} asignado al ID final {entry['first_id'] + i}.")
+    slowest = max((entry["seconds"] for entry in summary), default=0.0)
+    print(f"\nJerarquía construida en {elapsed:.2f} s (ajuste más lento: {slowest:.2f} s)")
+
+    df['final_cluster'] = final_labels
+
+    # === GUARDAR ASIGNACIONES FINALES ===
+    print(f"\nGuardando asignaciones de cluster finales en: {FINAL_ASSIGNMENTS_PATH}")
+    final_assignments_df = df[['link', 'final_cluster']]
+    final_assignments_df.to_csv(FINAL_ASSIGNMENTS_PATH, index=False)
+
+    print("\nResumen de las asignaciones finales:")
+    print(final_assignments_df['final_cluster'].value_counts().sort_index())
+
+    # === GUARDAR JERARQUÍA ===
+    # Centroides principales y de sub-clusters, tamaños y términos principales en un solo artefacto:
+    # nombrar, reportar y asignar artículos nuevos no necesita volver a transformar ni ajustar nada
+    top_model = CentroidModel.load(CENTROIDS_PATH)
+    parent_labels = df['cluster'].fillna(-1).astype(int).to_numpy()
+    assigned = parent_labels >= 0
+    hierarchy = ClusterHierarchy.from_members(
+        top_model, tfidf_matrix, parent_labels, final_labels,
+        terms=list(tfidf_vectorizer.get_feature_names_out()),
+        meta={
+            # Referencia para detectar deriva al añadir artículos (append_articles.py)
+            "mean_squared_distance": top_model.mean_squared_distance(tfidf_matrix[assigned], parent_labels[assigned]),
+            "num_articles": int(assigned.sum()),
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+    )
+    hierarchy.save(HIERARCHY_PATH)
+    print(f"\nJerarquía de clusters guardada en: {HIERARCHY_PATH}")
+
 
-# === CARGAR DATA Y MODELOS ===
-print("Cargando dataset, asignaciones iniciales y modelos...")
-df = pd.read_csv(DATA_PATH)
-initial_assignments_df = pd.read_csv(INITIAL_ASSIGNMENTS_PATH)
-df = pd.merge(df, initial_assignments_df, on='link', how='left')
-
-tfidf_vectorizer_path = os.path.join(MODEL_DIR, "tfidf_vectorizer.pkl")
-with open(tfidf_vectorizer_path, "rb") as f:
-    tfidf_vectorizer = pickle.load(f)
-
-# === CONSOLIDACIÓN DE CLUSTERS ===
-print("Iniciando consolidación de clusters...")
-df['final_cluster'] = -1 # Inicializar la columna de cluster final
-next_new_cluster_id = 100 # Empezar los nuevos IDs desde 100 para evitar colisiones
-
-# Re-clusterizar todos los clusters originales
-for target_id, num_sub_clusters in RECLUSTER_TARGETS.items():
-    print(f"\nRe-clusterizando el Cluster original {target_id} en {num_sub_clusters} sub-clusters...")
-    
-    # Aislar los datos del cluster objetivo
-    target_df_indices = df[df['cluster'] == target_id].index
-    
-    # Asegurarse de que hay suficientes miembros para clusterizar
-    if len(target_df_indices) < num_sub_clusters:
-        print(f"  ADVERTENCIA: No se puede re-clusterizar el cluster {target_id} en {num_sub_clusters} sub-clusters porque solo tiene {len(target_df_indices)} miembros. Se asignará un único ID de cluster.")
-        df.loc[target_df_indices, 'final_cluster'] = next_new_cluster_id
-        next_new_cluster_id += 1
-        continue
-
-    target_tfidf_matrix = tfidf_vectorizer.transform(df.loc[target_df_indices, "clean_abstract"])
-    
-    # Realizar el re-clustering
-    sub_kmeans = KMeans(n_clusters=num_sub_clusters, random_state=42, n_init=10)
-    sub_labels = sub_kmeans.fit_predict(target_tfidf_matrix)
-    
-    # Asignar los nuevos IDs de sub-cluster
-    for i in range(num_sub_clusters):
-        sub_cluster_indices = target_df_indices[sub_labels == i]
-        final_id = next_new_cluster_id + i
-        df.loc[sub_cluster_indices, 'final_cluster'] = final_id
-        print(f"  Sub-cluster {target_id}.{i} asignado al ID final {final_id}.")
-    
-    next_new_cluster_id += num_sub_clusters
-
-# === GUARDAR ASIGNACIONES FINALES ===
-print(f"\nGuardando asignaciones de cluster finales en: {FINAL_ASSIGNMENTS_PATH}")
-final_assignments_df = df[['link', 'final_cluster']]
-final_assignments_df.to_csv(FINAL_ASSIGNMENTS_PATH, index=False)
-
-print("\nResumen de las asignaciones finales:")
-print(final_assignments_df['final_cluster'].value_counts().sort_index())
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,38 @@
-import pandas as pd
 import os
+import sys
 
 # === RUTAS ===
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-FINAL_DATASET_PATH = os.path.join(BASE_DIR, "../data/final_dataset.csv")
-INITIAL_ASSIGNMENTS_PATH = os.path.join(BASE_DIR, "../data/cluster_assignments.csv")
-FINAL_ASSIGNMENTS_PATH = os.path.join(BASE_DIR, "../data/final_cluster_assignments.csv")
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+sys.path.insert(0, SRC_DIR)
 
-def analyze_file(path, name):
-    print(f"--- Analizando Archivo: {name} ---")
-    if not os.path.exists(path):
-        print("Archivo no encontrado.\n")
-        return None
-    
-    df = pd.read_csv(path)
-    total_rows = len(df)
-    unique_links = df['link'].nunique()
-    num_duplicates = total_rows - unique_links
-    
-    print(f"  - Filas totales: {total_rows}")
-    print(f"  - Links únicos: {unique_links}")
-    print(f"  - Filas con links duplicados: {num_duplicates}\n")
-    return df
+from integrity_checks import load_artifacts, run_checks
+
+# Cada CSV se lee una sola vez; las comprobaciones trabajan sobre hashes de los links
+artifacts = load_artifacts()
+checks = run_checks(artifacts)
 
 # --- Ejecutar Análisis ---
-df_final_dataset = analyze_file(FINAL_DATASET_PATH, "final_dataset.csv")
-df_initial_assignments = analyze_file(INITIAL_ASSIGNMENTS_PATH, "cluster_assignments.csv")
-df_final_assignments = analyze_file(FINAL_ASSIGNMENTS_PATH, "final_cluster_assignments.csv")
+for name in artifacts:
+    result = checks[f"link_uniqueness.{name}"]
+    print(f"--- Analizando Archivo: {name}.csv ---")
+    print(f"  - Filas totales: {result['rows']}")
+    print(f"  - Links únicos: {result['unique_links']}")
+    print(f"  - Filas con links duplicados: {result['duplicate_rows']}\n")
+
+# --- Simular la Unión (sin hacerla: se cuenta cuántas filas produciría) ---
+print("--- Simulando la Unión (Merge) ---")
+merge = checks["merge_cardinality.final_cluster_assignments"]
+orphans = checks["orphan_assignments.final_cluster_assignments"]
+print(f"Filas en final_dataset.csv (limpio): {merge['left_rows']}")
+print(f"Filas en final_cluster_assignments.csv: {merge['right_rows']}")
+print(f"Filas después de la unión: {merge['merged_rows']}\n")
 
-# --- Simular la Unión ---
-if df_final_dataset is not None and df_final_assignments is not None:
-    print("--- Simulando la Unión (Merge) ---")
-    # Asegurémonos de que el df principal no tenga duplicados para una prueba limpia
-    df_main_clean = df_final_dataset.drop_duplicates(subset=['link'])
-    
-    merged_df = pd.merge(df_main_clean, df_final_assignments, on='link', how='left')
-    print(f"Filas en final_dataset.csv (limpio): {len(df_main_clean)}")
-    print(f"Filas en final_cluster_assignments.csv: {len(df_final_assignments)}")
-    print(f"Filas después de la unión: {len(merged_df)}\n")
-    
-    if len(merged_df) > len(df_final_assignments):
-        print("¡ALERTA! La operación de unión está creando filas duplicadas. Esto sugiere que hay `links` en `final_cluster_assignments.csv` que no están en `final_dataset.csv` o viceversa, causando problemas en el `merge`.")
-    elif len(merged_df) > len(df_main_clean):
-         print("¡ALERTA! La operación de unión está creando filas duplicadas. Esto confirma que hay `links` duplicados en `final_cluster_assignments.csv`.")
-    else:
-        print("La operación de unión parece ser estable y no crea filas adicionales.")
+if orphans["orphan_rows"]:
+    print(f"¡ALERTA! Hay {orphans['orphan_rows']} `links` en `final_cluster_assignments.csv` que no están en `final_dataset.csv` "
+          f"(p. ej. {', '.join(orphans['examples'][:3])}).")
+if merge["fanout_links"]:
+    print(f"¡ALERTA! La operación de unión está creando filas duplicadas: {merge['fanout_links']} `links` aparecen "
+          "más de una vez en `final_cluster_assignments.csv`.")
+if not orphans["orphan_rows"] and not merge["fanout_links"]:
+    print("La operación de unión parece ser estable y no crea filas adicionales.")
@@ -0,0 +1,142 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+from sklearn.metrics.pairwise import euclidean_distances
+from threadpoolctl import threadpool_limits
+
+# === CONFIGURACIÓN ===
+N_INIT = 10
+RANDOM_STATE = 42
+RESULT_COLUMNS = ["k", "inertia", "silhouette", "davies_bouldin", "seconds"]
+
+# Matriz del proceso worker (se abre una vez por proceso en `_init_worker`)
+_matrix = None
+
+
+# === MATRIZ COMPARTIDA ===
+def dump_matrix(matrix, directory):
+    """Guarda los arrays de la matriz CSR como .npy para que los workers los abran con mmap."""
+    matrix = sp.csr_matrix(matrix)
+    for name in ("data", "indices", "indptr"):
+        np.save(os.path.join(directory, f"{name}.npy"), getattr(matrix, name))
+    return matrix.shape
+
+
+def open_matrix(directory, shape):
+    """Reconstruye la matriz CSR sobre los .npy mapeados en memoria (sin copiar los datos)."""
+    data, indices, indptr = (
+        np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in ("data", "indices", "indptr")
+    )
+    return sp.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def _init_worker(directory, shape):
+    global _matrix
+    _matrix = open_matrix(directory, shape)
+    # Un hilo por proceso: el paralelismo viene de los procesos, no de OpenMP/BLAS
+    threadpool_limits(1)
+
+
+# === MÉTRICAS ===
+def davies_bouldin(matrix, labels):
+    """
+    Índice Davies-Bouldin calculado sobre la matriz dispersa (la versión de sklearn exige una
+    matriz densa). Mismo criterio: centroides como media de cada cluster y distancias euclídeas.
+    """
+    k = labels.max() + 1
+    membership = sp.csr_matrix((np.ones(len(labels)), (labels, np.arange(len(labels)))), shape=(k, len(labels)))
+    counts = np.asarray(membership.sum(axis=1)).ravel()
+    centroids = (membership @ matrix).toarray() / counts[:, None]
+
+    distances = euclidean_distances(matrix, centroids)
+    scatter = np.bincount(labels, weights=distances[np.arange(len(labels)), labels], minlength=k) / counts
+    centroid_distances = euclidean_distances(centroids)
+    if np.allclose(scatter, 0) or np.allclose(centroid_distances, 0):
+        return 0.0
+    centroid_distances[centroid_distances == 0] = np.inf
+    ratios = (scatter[:, None] + scatter[None, :]) / centroid_distances
+    return float(np.mean(np.max(ratios, axis=1)))
+
+
+def evaluate_k(matrix, k, n_init=N_INIT, random_state=RANDOM_STATE, silhouette_sample=None):
+    """Ajusta KMeans con k clusters y devuelve sus métricas (una fila de la tabla de resultados)."""
+    start = time.perf_counter()
+    kmeans = KMeans(n_clusters=k, random_state=random_state, n_init=n_init)
+    labels = kmeans.fit_predict(matrix)
+    if len(np.unique(labels)) > 1:
+        sample_size = silhouette_sample if silhouette_sample and silhouette_sample < matrix.shape[0] else None
+        silhouette = float(silhouette_score(matrix, labels, sample_size=sample_size, random_state=random_state))
+        db_index = davies_bouldin(matrix, labels)
+    else:
+        silhouette = db_index = float("nan")
+    return {
+        "k": k,
+        "inertia": float(kmeans.inertia_),
+        "silhouette": silhouette,
+        "davies_bouldin": db_index,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def _evaluate_in_worker(k, n_init, random_state, silhouette_sample):
+    return evaluate_k(_matrix, k, n_init, random_state, silhouette_sample)
+
+
+# === BARRIDO ===
+def sweep(matrix, k_values, n_init=N_INIT, random_state=RANDOM_STATE, silhouette_sample=None, workers=None):
+    """
+    Ajusta KMeans para cada k en paralelo (un proceso por ajuste) y devuelve un DataFrame con
+    inercia, silhouette, Davies-Bouldin y tiempo por k, ordenado por k.
+
+    La matriz no se envía a cada worker: se escribe una vez como .npy y cada proceso la abre con
+    mmap, de modo que todos comparten las mismas páginas en memoria.
+    """
+    k_values = [k for k in k_values if k <= matrix.shape[0]]
+    workers = max(1, min(workers or os.cpu_count(), len(k_values)))
+    # Los k grandes tardan más: se lanzan primero para equilibrar la carga entre procesos
+    order = sorted(k_values, reverse=True)
+
+    with tempfile.TemporaryDirectory(prefix="k_sweep_") as directory:
+        shape = dump_matrix(matrix, directory)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(directory, shape)) as pool:
+            futures = [pool.submit(_evaluate_in_worker, k, n_init, random_state, silhouette_sample) for k in order]
+            rows = [future.result() for future in futures]
+
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS).sort_values("k").reset_index(drop=True)
+
+
+def best_k(results):
+    """k con mayor silhouette en la tabla de resultados."""
+    return int(results.loc[results["silhouette"].idxmax(), "k"])
+
+
+if __name__ == "__main__":
+    from tfidf_cache import load_tfidf
+
+    parser = argparse.ArgumentParser(description="Barrido de k para KMeans sobre la matriz TF-IDF del corpus.")
+    parser.add_argument("--k-min", type=int, default=2)
+    parser.add_argument("--k-max", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto, todos los núcleos).")
+    parser.add_argument("--silhouette-sample", type=int, default=None, help="Muestra para el silhouette.")
+    parser.add_argument("--output", default=None, help="CSV donde guardar la tabla de resultados.")
+    args = parser.parse_args()
+
+    _, tfidf_matrix = load_tfidf()
+    start = time.perf_counter()
+    results = sweep(tfidf_matrix, range(args.k_min, args.k_max + 1),
+                    silhouette_sample=args.silhouette_sample, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(results.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+    print(f"\nTiempo total: {elapsed:.2f} s | Suma de tiempos por k: {results['seconds'].sum():.2f} s "
+          f"| Mejor k por silhouette: {best_k(results)}")
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Resultados guardados en: {args.output}")
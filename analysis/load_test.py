@@ -0,0 +1,133 @@
+import os
+import gc
+import sys
+import time
+import random
+import asyncio
+import argparse
+import multiprocessing
+import numpy as np
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BASE_DIR, "../backend/src")
+sys.path.insert(0, SRC_DIR)
+
+import httpx
+import api
+
+# === CONFIGURACIÓN ===
+WORKER_COUNTS = [1, 2, 4]
+CONCURRENCY = 16        # Peticiones simultáneas por worker
+DURATION = 5.0          # Segundos de carga por configuración
+WARMUP = 1.0
+SEARCHES = ["bone", "muscle atrophy", "\"bone loss\"", "plant OR arabidopsis", "radiation", "immune"]
+TERMS = ["bone", "space", "gene", "radiation", "mice", "plant"]
+
+
+def random_url(rng, cluster_ids):
+    """Mezcla de consultas parecida a la del frontend: listado de clusters, páginas, búsquedas y reglas."""
+    kind = rng.random()
+    if kind < 0.3:
+        return "/clusters"
+    if kind < 0.55:
+        return f"/articles?cluster_id={rng.choice(cluster_ids)}&skip={rng.randrange(0, 60, 20)}"
+    if kind < 0.8:
+        return f"/articles?search={rng.choice(SEARCHES)}&limit={rng.choice([20, 100])}"
+    return f"/associations?term={rng.choice(TERMS)}&min_confidence={rng.choice([0.5, 0.8])}"
+
+
+def memory_mb():
+    """(RSS, PSS) del proceso en MB. PSS reparte las páginas compartidas entre los procesos que las usan."""
+    values = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    values[name] = int(rest.split()[0]) / 1024
+    except OSError:
+        pass
+    return values.get("Rss", float("nan")), values.get("Pss", float("nan"))
+
+
+async def run_client(worker_id, start_at, duration, concurrency, cluster_ids):
+    """Lanza `concurrency` clientes contra la app en el propio proceso (ASGI, sin red) hasta `start_at + duration`."""
+    transport = httpx.ASGITransport(app=api.app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        async def user(user_id):
+            rng = random.Random(worker_id * 1000 + user_id)
+            while time.time() < start_at + duration:
+                url = random_url(rng, cluster_ids)
+                sent = time.perf_counter()
+                response = await client.get(url)
+                elapsed = time.perf_counter() - sent
+                response.raise_for_status()
+                if time.time() >= start_at:
+                    latencies.append(elapsed)
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return latencies
+
+
+def worker_main(worker_id, start_at, duration, concurrency, cluster_ids, queue):
+    latencies = asyncio.run(run_client(worker_id, start_at, duration, concurrency, cluster_ids))
+    queue.put((latencies, memory_mb()))
+
+
+def run_load(num_workers, duration, concurrency, cluster_ids):
+    """Lanza `num_workers` procesos (fork del proceso con los datos ya cargados) y agrega sus latencias."""
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    start_at = time.time() + WARMUP
+    processes = [
+        context.Process(target=worker_main, args=(i, start_at, duration, concurrency, cluster_ids, queue))
+        for i in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    latencies = np.concatenate([np.asarray(r[0]) for r in results]) * 1000
+    return {
+        "workers": num_workers,
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "rss": sum(r[1][0] for r in results),
+        "pss": sum(r[1][1] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API: latencia y peticiones/s según el número de workers.")
+    parser.add_argument("--workers", type=int, nargs="+", default=WORKER_COUNTS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Peticiones simultáneas por worker.")
+    parser.add_argument("--duration", type=float, default=DURATION, help="Segundos de carga por configuración.")
+    parser.add_argument("--no-cache", action="store_true", help="Desactivar la caché de respuestas serializadas.")
+    args = parser.parse_args()
+
+    # Igual que gunicorn.conf.py: los datos se cargan una vez y los workers los heredan al hacer fork
+    state = api.get_state()
+    if args.no_cache:
+        api._response_cache.max_entries = 0
+    cluster_ids = [c for c, listed in zip(state.data.cluster_ids, state.data.cluster_listed) if listed]
+    gc.collect()
+    gc.freeze()
+
+    print(f"CPUs: {os.cpu_count()} | concurrencia por worker: {args.concurrency} | {args.duration:.0f} s por configuración"
+          f" | caché de respuestas: {'no' if args.no_cache else 'sí'}")
+    print(f"{'workers':>7} {'peticiones':>10} {'req/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'RSS total (MB)':>15} {'PSS total (MB)':>15}")
+    for num_workers in args.workers:
+        r = run_load(num_workers, args.duration, args.concurrency, cluster_ids)
+        print(f"{r['workers']:>7} {r['requests']:>10} {r['rps']:>9.0f} {r['p50']:>9.2f} {r['p99']:>9.2f} "
+              f"{r['rss']:>15.1f} {r['pss']:>15.1f}")
+    print("\nRSS cuenta las páginas compartidas (mmap, copy-on-write) en cada worker; PSS las reparte entre ellos.")
+
+
+if __name__ == "__main__":
+    main()
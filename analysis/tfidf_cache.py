@@ -0,0 +1,72 @@
+import os
+import glob
+import pickle
+import hashlib
+import pandas as pd
+import scipy.sparse as sp
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(BASE_DIR, "../data/final_dataset.csv")
+VECTORIZER_PATH = os.path.join(BASE_DIR, "../backend/models/tfidf_vectorizer.pkl")
+CACHE_DIR = os.path.join(BASE_DIR, "../data/tfidf_cache")
+TEXT_COLUMN = "clean_abstract"
+
+
+def file_hash(path):
+    """sha256 del contenido de un archivo (primeros 16 caracteres)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def load_vectorizer(vectorizer_path=VECTORIZER_PATH):
+    with open(vectorizer_path, "rb") as f:
+        return pickle.load(f)
+
+
+def cache_path(data_path=DATA_PATH, vectorizer_path=VECTORIZER_PATH, cache_dir=CACHE_DIR):
+    """La matriz se identifica por el hash del vectorizador y el del dataset."""
+    return os.path.join(cache_dir, f"tfidf_{file_hash(vectorizer_path)}_{file_hash(data_path)}.npz")
+
+
+def load_tfidf(data_path=DATA_PATH, vectorizer_path=VECTORIZER_PATH, cache_dir=CACHE_DIR):
+    """
+    Devuelve (vectorizador, matriz TF-IDF del corpus completo) en formato CSR.
+
+    La fila i de la matriz corresponde a la fila i de final_dataset.csv, así que cada script
+    obtiene la matriz de un subconjunto con `matriz[posiciones]` en lugar de volver a llamar a
+    `transform`. La matriz se calcula una sola vez y se guarda en `cache_dir`; si cambia el
+    vectorizador o el dataset, cambia la clave y se recalcula.
+    """
+    tfidf_vectorizer = load_vectorizer(vectorizer_path)
+    path = cache_path(data_path, vectorizer_path, cache_dir)
+    if os.path.exists(path):
+        return tfidf_vectorizer, sp.load_npz(path).tocsr()
+
+    print("Calculando la matriz TF-IDF del corpus (se guardará en caché)...")
+    texts = pd.read_csv(data_path, usecols=[TEXT_COLUMN])[TEXT_COLUMN].fillna("")
+    tfidf_matrix = tfidf_vectorizer.transform(texts).tocsr()
+
+    # Solo se conserva la versión actual de la matriz
+    os.makedirs(cache_dir, exist_ok=True)
+    for old_path in glob.glob(os.path.join(cache_dir, "tfidf_*.npz")):
+        os.remove(old_path)
+    tmp_path = f"{path[:-len('.npz')]}.tmp.npz"
+    sp.save_npz(tmp_path, tfidf_matrix, compressed=False)
+    os.replace(tmp_path, path)
+    return tfidf_vectorizer, tfidf_matrix
+
+
+def check_alignment(df, tfidf_matrix):
+    """
+    Comprueba que el DataFrame (dataset fusionado con asignaciones) conserva las filas del
+    dataset, de modo que su índice sirve para indexar la matriz.
+    """
+    if len(df) != tfidf_matrix.shape[0] or not df.index.equals(pd.RangeIndex(len(df))):
+        raise ValueError(
+            f"El DataFrame tiene {len(df)} filas pero la matriz TF-IDF {tfidf_matrix.shape[0]}; "
+            "las asignaciones deben tener un único registro por link."
+        )
@@ -1,9 +1,27 @@
+import time
+IMPORT_START = time.perf_counter()  # Medir el arranque del worker incluyendo los imports
+
 import os
 import json
-import pandas as pd
-from fastapi import FastAPI, Query
+import threading
+import numpy as np
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from search_index import InvertedIndex
+from rules_index import RuleIndex
+from serving_snapshot import ServingData, SNAPSHOT_PATH, data_version
+from similar_articles import SimilarArticles, SIMILAR_PATH
+from cluster_classifier import ClusterClassifier, MAX_BATCH, VECTORIZER_PATH
+from cluster_model import CENTROIDS_PATH, HIERARCHY_PATH
+from response_cache import ResponseCache, CACHE_CONTROL, etag_matches, serialize_object
+from export_stream import (
+    NDJSON_MEDIA_TYPE, iter_row_batches, iter_all_rows, ranked_rows, article_lines, rule_lines, gzip_chunks,
+)
 
 # --- 1. Carga y Preparación de Datos ---
 
@@ -12,31 +30,133 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, '../data')
 MODEL_DIR = os.path.join(BASE_DIR, 'models')
 
-print("Iniciando API: Cargando y fusionando datos...")
-
-try:
-    # Cargar datasets de artículos y clusters
-    articles_df = pd.read_csv(os.path.join(DATA_DIR, 'final_dataset.csv'))
-    assignments_df = pd.read_csv(os.path.join(DATA_DIR, 'final_cluster_assignments.csv'))
-    with open(os.path.join(DATA_DIR, 'cluster_names.json'), 'r', encoding='utf-8') as f:
-        cluster_names = json.load(f)
-    
-    # Fusionar dataframes de artículos
-    merged_df = pd.merge(articles_df, assignments_df, on='link', how='left')
-    merged_df['final_cluster'] = merged_df['final_cluster'].astype(str)
-    merged_df['cluster_name'] = merged_df['final_cluster'].map(cluster_names)
-    merged_df['cluster_name'] = merged_df['cluster_name'].fillna('Sin categoría')
-    merged_df['final_cluster'] = merged_df['final_cluster'].fillna('-1')
-    print(f"Datos de artículos cargados. Total: {len(merged_df)} artículos.")
-
-    # Cargar las reglas de asociación
+# Los datos no se cargan al importar el módulo: se abren una sola vez por proceso, al arrancar el
+# worker o en la primera petición. El snapshot y las reglas se leen con mmap, así que todos los
+# workers comparten las mismas páginas de memoria del sistema operativo. Con gunicorn
+# (gunicorn.conf.py) se cargan una vez en el proceso master y los workers los heredan al hacer fork.
+_state = None
+_state_error = None
+_state_lock = threading.Lock()
+
+# Respuestas ya serializadas de los endpoints de solo lectura (una caché por proceso)
+_response_cache = ResponseCache()
+
+
+class ServingState:
+    """Datos de solo lectura del proceso: artículos/clusters/búsqueda, reglas y tiempos de carga."""
+
+    def __init__(self, data, rule_index, similar, timings, version):
+        self.data = data
+        self.rule_index = rule_index
+        self.similar = similar
+        # El clasificador de /classify se carga en su primera petición (ver get_classifier)
+        self.classifier = None
+        self.classifier_loaded = False
+        self.timings = timings
+        # Versión de todo lo que se sirve (snapshot + reglas); forma parte de las claves de caché
+        self.version = version
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def load_state():
+    """Abre el snapshot de datos y el almacén de reglas, registrando el tiempo de cada paso."""
+    timings = {}
+
+    start = time.perf_counter()
+    if os.path.exists(SNAPSHOT_PATH):
+        data = ServingData.load(SNAPSHOT_PATH)
+    else:
+        print(f"ADVERTENCIA: No existe {SNAPSHOT_PATH}. Construyendo los datos desde los CSV "
+              "(ejecute serving_snapshot.py para acelerar el arranque).")
+        data = ServingData.from_sources()
+    timings["snapshot_ms"] = _elapsed_ms(start)
+    print(f"Datos de artículos cargados en {timings['snapshot_ms']} ms. "
+          f"Total: {len(data)} artículos (versión {data.version}).")
+    if data.stale_sources:
+        print(f"ADVERTENCIA: Archivos modificados después de construir el snapshot: {', '.join(data.stale_sources)}. "
+              "La API sirve datos desactualizados; ejecute serving_snapshot.py para regenerarlo.")
+
+    # Se prefiere el almacén binario (mmap, sin parseo); el JSON queda como respaldo
+    start = time.perf_counter()
+    rules_bin_path = os.path.join(MODEL_DIR, 'apriori_rules.bin')
     rules_path = os.path.join(MODEL_DIR, 'apriori_rules.json')
-    rules_df = pd.read_json(rules_path, orient='records')
-    print(f"Reglas de asociación cargadas. Total: {len(rules_df)} reglas.")
+    if os.path.exists(rules_bin_path):
+        rule_index = RuleIndex.load(rules_bin_path)
+        rules_version = data_version([rules_bin_path])
+    else:
+        with open(rules_path, 'r', encoding='utf-8') as f:
+            rule_index = RuleIndex.from_records(json.load(f))
+        rules_version = data_version([rules_path])
+    timings["rules_ms"] = _elapsed_ms(start)
+    print(f"Reglas de asociación cargadas en {timings['rules_ms']} ms. Total: {len(rule_index)} reglas.")
+
+    # Tabla de artículos similares (opcional): solo es válida si se calculó sobre el mismo snapshot
+    start = time.perf_counter()
+    similar = None
+    if os.path.exists(SIMILAR_PATH):
+        similar = SimilarArticles.load(SIMILAR_PATH)
+        if similar.data_version != data.version:
+            print("ADVERTENCIA: La tabla de artículos similares no corresponde a la versión de los datos. "
+                  "Ejecute similar_articles.py para regenerarla.")
+            similar = None
+    timings["similar_ms"] = _elapsed_ms(start)
+
+    timings["boot_ms"] = _elapsed_ms(IMPORT_START)
+    return ServingState(data, rule_index, similar, timings, f"{data.version}-{rules_version}")
+
 
-except FileNotFoundError as e:
-    print(f"Error: No se pudo encontrar un archivo de datos esencial: {e}. Asegúrese de que los archivos de datos existen.")
-    exit()
+def load_classifier(data):
+    """Clasificador de textos nuevos (opcional): vectorizador TF-IDF + centroides de la jerarquía."""
+    if not (os.path.exists(VECTORIZER_PATH) and (os.path.exists(HIERARCHY_PATH) or os.path.exists(CENTROIDS_PATH))):
+        print("ADVERTENCIA: No existen el vectorizador o los centroides; /classify no estará disponible.")
+        return None
+    return ClusterClassifier.from_serving_data(data)
+
+
+def get_state():
+    """Devuelve los datos del proceso, cargándolos la primera vez."""
+    global _state, _state_error
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                try:
+                    _state = load_state()
+                    _state_error = None
+                except FileNotFoundError as e:
+                    _state_error = str(e)
+                    print(f"Error: No se pudo encontrar un archivo de datos esencial: {e}. Asegúrese de que los archivos de datos existen.")
+                    raise
+    return _state
+
+
+def get_classifier():
+    """
+    Devuelve el clasificador, cargándolo en la primera llamada. No forma parte del arranque del
+    worker: importar sklearn y deserializar el vectorizador cuesta más de un segundo.
+    """
+    state = get_state()
+    if not state.classifier_loaded:
+        with _state_lock:
+            if not state.classifier_loaded:
+                start = time.perf_counter()
+                state.classifier = load_classifier(state.data)
+                state.classifier_loaded = True
+                state.timings["classifier_ms"] = _elapsed_ms(start)
+    return state.classifier
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Precargar al arrancar el worker para que /health refleje cuándo está listo
+    try:
+        state = get_state()
+        print(f"Worker listo en {state.timings['boot_ms']} ms desde el import. Visite /docs para ver la documentación interactiva.")
+    except FileNotFoundError:
+        pass
+    yield
 
 
 # --- 2. Inicialización de la App FastAPI ---
@@ -44,7 +164,8 @@ except FileNotFoundError as e:
 app = FastAPI(
     title="Space Biology Knowledge Engine API",
     description="API para explorar publicaciones de biología espacial de la NASA clasificadas por temas y sus asociaciones.",
-    version="1.1.0"
+    version="1.1.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -57,28 +178,53 @@ app.add_middleware(
 
 
 # --- 3. Endpoints de la API ---
+# Los handlers son `async def`: cada consulta son operaciones sobre arrays ya precalculados (o una
+# respuesta ya serializada en caché), así que se resuelven en el event loop sin pasar por el
+# threadpool. Los generadores de las exportaciones son síncronos y Starlette los itera en el threadpool.
+
+def cached_json(request, params, build):
+    """
+    Respuesta JSON servida desde la caché de respuestas serializadas.
+    - La clave combina la ruta, los parámetros ya validados (`params`) y la versión de los datos.
+    - `build()` solo se ejecuta si la respuesta no está en caché.
+    - Incluye ETag fuerte y Cache-Control; si el cliente envía If-None-Match con el mismo ETag
+      se responde 304 sin cuerpo.
+    """
+    key = ResponseCache.make_key(request.url.path, params, get_state().version)
+    body, etag = _response_cache.get_or_build(key, build)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 @app.get("/clusters", summary="Obtener la lista de todos los clusters temáticos")
-def get_clusters():
+async def get_clusters(request: Request):
     """
     Devuelve una lista de todos los clusters temáticos, incluyendo su ID, nombre y el número de artículos que contiene cada uno.
     """
-    cluster_counts = merged_df['final_cluster'].value_counts().to_dict()
-    
-    cluster_list = []
-    for cluster_id, cluster_name in cluster_names.items():
-        cluster_list.append({
-            "id": cluster_id,
-            "name": cluster_name,
-            "article_count": cluster_counts.get(cluster_id, 0)
-        })
-        
-    cluster_list = sorted(cluster_list, key=lambda x: int(x['id']))
-    return {"clusters": cluster_list}
+    def build():
+        data = get_state().data
+
+        cluster_list = []
+        for code, cluster_id in enumerate(data.cluster_ids):
+            if not data.cluster_listed[code]:
+                continue
+            cluster_list.append({
+                "id": cluster_id,
+                "name": data.cluster_names[code],
+                "article_count": int(data.cluster_counts[code])
+            })
+
+        cluster_list = sorted(cluster_list, key=lambda x: int(x['id']))
+        return {"clusters": cluster_list}
+
+    return cached_json(request, {}, build)
 
 
 @app.get("/articles", summary="Obtener una lista de artículos con filtros")
-def get_articles(
+async def get_articles(
+    request: Request,
     cluster_id: Optional[str] = Query(None, description="Filtrar artículos por el ID del cluster temático."),
     search: Optional[str] = Query(None, description="Buscar un término en el título y el resumen de los artículos."),
     skip: int = Query(0, ge=0, description="Número de artículos a omitir (para paginación)."),
@@ -86,33 +232,80 @@ def get_articles(
 ):
     """
     Devuelve una lista de artículos. Permite filtrar por cluster, buscar por texto y paginar los resultados.
+    - La búsqueda usa el índice invertido: términos separados por espacio (AND), OR entre grupos
+      y "frases entre comillas". Los resultados se ordenan por relevancia (BM25).
     """
-    temp_df = merged_df.copy()
-    
-    if search:
-        search_term = search.lower()
-        temp_df = temp_df[
-            temp_df['title'].str.lower().str.contains(search_term) |
-            temp_df['abstract'].str.lower().str.contains(search_term)
-        ]
-        
-    if cluster_id:
-        temp_df = temp_df[temp_df['final_cluster'] == cluster_id]
-        
-    total_results = len(temp_df)
-    paginated_df = temp_df.iloc[skip : skip + limit]
-    articles = paginated_df.to_dict(orient='records')
-    
-    return {
-        "total_results": total_results,
-        "articles": articles,
-        "skip": skip,
-        "limit": limit
-    }
+    def build():
+        data = get_state().data
+        cluster_code = data.cluster_code_by_id.get(cluster_id, -1) if cluster_id else None
+
+        if search:
+            rows, scores = data.search_index.match(search)
+            if cluster_id:
+                in_cluster = data.in_cluster(rows, cluster_code)
+                rows, scores = rows[in_cluster], scores[in_cluster]
+            total_results = len(rows)
+            page_rows = InvertedIndex.rank(rows, scores, skip, limit)
+        else:
+            # Navegar por un cluster cuesta lo mismo que la página: sus filas ya están precalculadas
+            if cluster_id:
+                members = data.cluster_members(cluster_code)
+                total_results = len(members)
+                page_rows = members[skip : skip + limit]
+            else:
+                total_results = len(data)
+                page_rows = np.arange(skip, min(skip + limit, total_results))
+
+        # La página se arma con los artículos ya serializados en el snapshot (sin decodificar campos)
+        return serialize_object({
+            "total_results": total_results,
+            "articles": data.records_json(page_rows),
+            "skip": skip,
+            "limit": limit
+        })
+
+    # Un cluster_id o una búsqueda vacíos equivalen a no filtrar
+    params = {"cluster_id": cluster_id or None, "search": search or None, "skip": skip, "limit": limit}
+    return cached_json(request, params, build)
+
+@app.get("/articles/{article_id}/similar", summary="Obtener artículos similares a uno dado")
+async def get_similar_articles(
+    request: Request,
+    article_id: str,
+    limit: int = Query(10, ge=1, le=100, description="Número máximo de artículos similares a devolver.")
+):
+    """
+    Devuelve los artículos más parecidos (similitud coseno entre sus vectores TF-IDF) al artículo indicado.
+    - 'article_id' es el identificador PMC que aparece al final del link del artículo (p. ej. PMC4136787).
+    - Los vecinos están precalculados (similar_articles.py), así que la consulta no recalcula similitudes.
+    """
+    def build():
+        state = get_state()
+        if state.similar is None:
+            raise HTTPException(status_code=503, detail="La tabla de artículos similares no está disponible.")
+
+        row = state.data.row_by_article_id.get(article_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail=f"No se encontró el artículo '{article_id}'.")
+
+        rows, scores = state.similar.query(row, limit)
+        similar = state.data.records(rows)
+        for article, score in zip(similar, scores):
+            article["similarity"] = round(float(score), 4)
+
+        return {
+            "article_id": article_id,
+            "title": state.data.columns["title"][row],
+            "similar": similar
+        }
+
+    return cached_json(request, {"limit": limit}, build)
 
 @app.get("/associations", summary="Explorar reglas de asociación entre palabras clave")
-def get_associations(
+async def get_associations(
+    request: Request,
     term: Optional[str] = Query(None, description="Término para buscar en los antecedentes de una regla."),
+    consequent: Optional[str] = Query(None, description="Término para buscar en los consecuentes de una regla (¿qué implica X?)."),
     min_confidence: float = Query(0.5, ge=0, le=1, description="Confianza mínima de la regla."),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100)
@@ -120,34 +313,145 @@ def get_associations(
     """
     Devuelve una lista de reglas de asociación.
     - Si se proporciona un 'term', filtra las reglas donde el término está en los antecedentes.
+    - Si se proporciona un 'consequent', filtra las reglas donde el término está en los consecuentes.
     - Filtra por una confianza mínima.
     - Devuelve las reglas más fuertes (mayor 'lift' y 'confidence') primero.
     """
-    temp_df = rules_df[rules_df['confidence'] >= min_confidence].copy()
-    
-    if term:
-        # Filtrar donde el término de búsqueda está en la lista de antecedentes
-        temp_df = temp_df[temp_df['antecedents'].apply(lambda x: term in x)]
-        
-    # Ordenar por las métricas más relevantes
-    temp_df = temp_df.sort_values(by=['lift', 'confidence'], ascending=False)
-    
-    total_results = len(temp_df)
-    
-    # Aplicar paginación
-    paginated_df = temp_df.iloc[skip : skip + limit]
-    
-    rules = paginated_df.to_dict(orient='records')
-    
+    def build():
+        rule_index = get_state().rule_index
+        total_results, rule_ids = rule_index.query(
+            antecedent=term or None,
+            consequent=consequent or None,
+            min_confidence=min_confidence,
+            skip=skip,
+            limit=limit,
+        )
+        rules = rule_index.records(rule_ids)
+
+        return {
+            "total_results": total_results,
+            "rules": rules,
+            "skip": skip,
+            "limit": limit
+        }
+
+    params = {"term": term or None, "consequent": consequent or None, "min_confidence": min_confidence,
+              "skip": skip, "limit": limit}
+    return cached_json(request, params, build)
+
+def ndjson_response(chunks, total, gzip):
+    """Respuesta NDJSON en streaming; con `gzip` se comprime a medida que se envía."""
+    headers = {"X-Total-Count": str(total)}
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+@app.get("/export/articles", summary="Exportar artículos como NDJSON")
+async def export_articles(
+    cluster_id: Optional[str] = Query(None, description="Filtrar artículos por el ID del cluster temático."),
+    search: Optional[str] = Query(None, description="Buscar un término en el título y el resumen de los artículos."),
+    gzip: bool = Query(False, description="Comprimir la respuesta con gzip.")
+):
+    """
+    Devuelve todos los artículos que cumplen los filtros de /articles, uno por línea (NDJSON), en el
+    mismo orden que las páginas de /articles. La respuesta se genera por bloques, así que la memoria
+    del servidor no depende del tamaño del resultado. El total va en la cabecera X-Total-Count.
+    """
+    data = get_state().data
+    cluster_code = data.cluster_code_by_id.get(cluster_id, -1) if cluster_id else None
+
+    if search:
+        rows, scores = data.search_index.match(search)
+        if cluster_id:
+            in_cluster = data.in_cluster(rows, cluster_code)
+            rows, scores = rows[in_cluster], scores[in_cluster]
+        total_results = len(rows)
+        row_batches = iter_row_batches(ranked_rows(rows, scores))
+    elif cluster_id:
+        members = data.cluster_members(cluster_code)
+        total_results = len(members)
+        row_batches = iter_row_batches(members)
+    else:
+        total_results = len(data)
+        row_batches = iter_all_rows(total_results)
+
+    return ndjson_response(article_lines(data, row_batches), total_results, gzip)
+
+
+@app.get("/export/associations", summary="Exportar reglas de asociación como NDJSON")
+async def export_associations(
+    term: Optional[str] = Query(None, description="Término para buscar en los antecedentes de una regla."),
+    consequent: Optional[str] = Query(None, description="Término para buscar en los consecuentes de una regla (¿qué implica X?)."),
+    min_confidence: float = Query(0.5, ge=0, le=1, description="Confianza mínima de la regla."),
+    gzip: bool = Query(False, description="Comprimir la respuesta con gzip.")
+):
+    """
+    Devuelve todas las reglas que cumplen los filtros de /associations, una por línea (NDJSON), en
+    el mismo orden (mayor 'lift' y 'confidence' primero). El total va en la cabecera X-Total-Count.
+    """
+    rule_index = get_state().rule_index
+    filters = {"antecedent": term or None, "consequent": consequent or None, "min_confidence": min_confidence}
+    total_results, _ = rule_index.query(**filters, limit=0)
+    return ndjson_response(rule_lines(rule_index, rule_index.iter_query(**filters)), total_results, gzip)
+
+
+class ClassifyRequest(BaseModel):
+    abstract: Optional[str] = Field(None, description="Un abstract a clasificar.")
+    abstracts: Optional[List[str]] = Field(None, max_length=MAX_BATCH, description="Lote de abstracts a clasificar.")
+
+
+@app.post("/classify", summary="Clasificar abstracts nuevos en los clusters temáticos")
+def classify(request: ClassifyRequest):
+    """
+    Asigna uno o varios abstracts al cluster principal y al sub-cluster (categoría final) más cercanos.
+    - Enviar 'abstract' para un texto o 'abstracts' para un lote (hasta 1000); un lote se vectoriza
+      y se asigna con un único producto por nivel, así que el coste por documento baja con el tamaño.
+    - 'distance' es la distancia euclídea TF-IDF al centroide de la categoría; 'terms_matched' cuenta
+      los términos del vocabulario encontrados (con 0 la asignación no es significativa).
+    - Es `def` y no `async def`: un lote grande se procesa en el threadpool sin bloquear el event loop.
+    """
+    classifier = get_classifier()
+    if classifier is None:
+        raise HTTPException(status_code=503, detail="El clasificador no está disponible.")
+    texts = ([request.abstract] if request.abstract is not None else []) + (request.abstracts or [])
+    if not texts:
+        raise HTTPException(status_code=422, detail="Envíe 'abstract' o 'abstracts'.")
+
+    start = time.perf_counter()
+    results = classifier.classify(texts)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return {
+        "results": results,
+        "elapsed_ms": round(elapsed_ms, 3),
+        "per_document_ms": round(elapsed_ms / len(texts), 4),
+    }
+
+
+@app.get("/health", summary="Estado de preparación del worker")
+async def health(response: Response):
+    """
+    Señal de readiness: 200 cuando los datos del proceso están cargados, 503 mientras no lo están.
+    Incluye la versión de los datos servidos, si sus archivos de entrada cambiaron después de
+    construir el snapshot y los tiempos de arranque del worker.
+    """
+    if _state is None:
+        response.status_code = 503
+        if _state_error:
+            return {"status": "error", "detail": _state_error}
+        return {"status": "loading"}
     return {
-        "total_results": total_results,
-        "rules": rules,
-        "skip": skip,
-        "limit": limit
+        "status": "ok",
+        "data_version": _state.data.version,
+        # Archivos de entrada modificados después de construir el snapshot servido
+        "stale_sources": _state.data.stale_sources,
+        "articles": len(_state.data),
+        "rules": len(_state.rule_index),
+        "timings": _state.timings,
+        "response_cache": _response_cache.stats(),
     }
 
 @app.get("/", summary="Endpoint de bienvenida")
-def read_root():
+async def read_root():
     return {"message": "Bienvenido a la API del Space Biology Knowledge Engine. Visite /docs para la documentación."}
-
-print("API lista y actualizada con reglas de asociación. Visite /docs para ver la documentación interactiva.")
\ No newline at end of file
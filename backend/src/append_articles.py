@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import numpy as np
+import pandas as pd
+
+from cluster_model import CentroidModel, ClusterHierarchy, save_centroids, CENTROIDS_PATH, HIERARCHY_PATH
+from minibatch_clustering import (
+    update_centroids, update_hierarchy_top, minibatch_model_from_centroids, iter_document_batches, TEXT_COLUMN,
+)
+from itemset_miner import (
+    build_bitsets, count_itemsets, supports_from_counts, generate_rules, popcount,
+    load_itemset_counts, save_itemset_counts,
+)
+from rules_index import RuleColumns, save_rule_columns
+from near_duplicates import NearDuplicateIndex, near_duplicate_report, INDEX_PATH as NEAR_DUPLICATES_PATH, REPORT_PATH as NEAR_DUPLICATES_REPORT_PATH
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "../../data")
+MODEL_DIR = os.path.join(BASE_DIR, "../models")
+MERGED_PATH = os.path.join(DATA_DIR, "final_merged.csv")
+DATASET_PATH = os.path.join(DATA_DIR, "final_dataset.csv")
+ASSIGNMENTS_PATH = os.path.join(DATA_DIR, "cluster_assignments.csv")
+FINAL_ASSIGNMENTS_PATH = os.path.join(DATA_DIR, "final_cluster_assignments.csv")
+APPEND_STATE_PATH = os.path.join(DATA_DIR, "append_state.json")
+VECTORIZER_PATH = os.path.join(MODEL_DIR, "tfidf_vectorizer.pkl")
+KMEANS_PATH = os.path.join(MODEL_DIR, "kmeans_model.pkl")
+ITEMSETS_PATH = os.path.join(MODEL_DIR, "frequent_itemsets.bin")
+RULES_BIN_PATH = os.path.join(MODEL_DIR, "apriori_rules.bin")
+RULES_JSON_PATH = os.path.join(MODEL_DIR, "apriori_rules.json")
+
+# === UMBRALES DE DERIVA ===
+# Si se supera alguno, los modelos incrementales dejan de ser fiables y conviene reconstruir todo
+MAX_NEW_FRACTION = 0.2        # Artículos añadidos desde la última reconstrucción / corpus de entonces
+MAX_DISTANCE_RATIO = 1.25     # Distancia media de los nuevos a su centroide / la del corpus
+MAX_EMERGING_FRACTION = 0.02  # Términos que pasan a ser frecuentes (sus itemsets no están minados) / frecuentes
+
+# Etapas del pipeline cuyas salidas actualiza este script
+APPEND_STAGES = ["merged_csvs_final", "preprocess_abstracts", "near_duplicates", "model_trainer", "consolidate_clusters"]
+SERVING_STAGES = ["integrity_checks", "serving_snapshot", "similar_articles"]
+
+
+# === REGLAS ===
+def update_rules(transactions, itemsets_path=ITEMSETS_PATH):
+    """
+    Suma a los conteos guardados los de las transacciones nuevas (sin volver a minar) y regenera
+    las reglas. Las reglas son exactas para los itemsets ya minados; las de los términos que se
+    vuelven frecuentes ahora faltan hasta la siguiente reconstrucción.
+    Devuelve (nº de reglas, términos que se han vuelto frecuentes, nº de términos frecuentes, meta).
+    """
+    terms, itemset_counts, item_counts, meta = load_itemset_counts(itemsets_path)
+    term_ids = {term: i for i, term in enumerate(terms)}
+    bitsets, num_new = build_bitsets(
+        ([term_ids[word] for word in text.split() if word in term_ids] for text in transactions), len(terms)
+    )
+    itemsets = list(itemset_counts)
+    delta = count_itemsets(itemsets, bitsets)
+    itemset_counts = {itemset: count + int(extra) for (itemset, count), extra in zip(itemset_counts.items(), delta)}
+    item_counts = item_counts + popcount(bitsets)
+    num_transactions = meta["num_transactions"] + num_new
+
+    min_support = meta["min_support"]
+    known_terms = {itemset[0] for itemset in itemsets if len(itemset) == 1}
+    emerging = [terms[i] for i in np.flatnonzero(item_counts / float(num_transactions) >= min_support)
+                if i not in known_terms]
+
+    rule_columns = RuleColumns(terms)
+    supports = supports_from_counts(itemset_counts, num_transactions, min_support)
+    for rule in generate_rules(supports, meta["min_confidence"]):
+        rule_columns.append(*rule)
+    # También sin reglas: si no, la API seguiría sirviendo las de antes de añadir los artículos
+    save_rule_columns(RULES_BIN_PATH, rule_columns, json_path=RULES_JSON_PATH)
+    save_itemset_counts(itemsets_path, terms, itemset_counts, item_counts, num_transactions, meta)
+    return len(rule_columns), emerging, len(known_terms), meta
+
+
+# === CLUSTERS ===
+def update_top_clusters(hierarchy, new_matrix, new_parents):
+    """
+    Mueve los centroides principales a la media acumulada de sus artículos y de los nuevos
+    (sin reentrenar) y guarda centroides con sus conteos, jerarquía y el MiniBatchKMeans del
+    pickle, que arranca con esos conteos. Devuelve la jerarquía actualizada.
+    """
+    top_model = CentroidModel.load(CENTROIDS_PATH)
+    counts = top_model.counts
+    if counts is None:
+        # Centroides guardados antes de que el artefacto llevara los conteos: salen de las asignaciones
+        counts = np.bincount(pd.read_csv(ASSIGNMENTS_PATH)["cluster"], minlength=len(top_model.centroids))
+    centroids, counts, _ = update_centroids(top_model.centroids, counts, new_matrix, labels=new_parents)
+
+    kmeans_model = minibatch_model_from_centroids(centroids, counts)
+    with open(KMEANS_PATH, "wb") as f:
+        pickle.dump(kmeans_model, f)
+    save_centroids(CENTROIDS_PATH, centroids, {"model": type(kmeans_model).__name__}, counts=counts)
+    hierarchy = update_hierarchy_top(hierarchy, centroids, counts, new_matrix, new_parents)
+    hierarchy.save(HIERARCHY_PATH)
+    return hierarchy
+
+
+def reassign_existing(hierarchy, vectorizer, dataset_path=DATASET_PATH):
+    """
+    Al moverse los centroides, algún artículo del corpus puede quedar más cerca de otro cluster
+    principal. Se recorre el dataset por lotes con la jerarquía actualizada y se devuelven
+    (link, cluster, final_cluster) de los que cambian de cluster principal respecto a las
+    asignaciones guardadas, para que los CSV de asignaciones sigan coincidiendo con el modelo.
+    """
+    stored = pd.read_csv(ASSIGNMENTS_PATH, dtype={"link": str}).set_index("link")["cluster"]
+    changed = []
+    for chunk in iter_document_batches(dataset_path, columns=("link", TEXT_COLUMN)):
+        parents, finals, _, _ = hierarchy.assign(vectorizer.transform(chunk[TEXT_COLUMN]))
+        moved = parents != stored.reindex(chunk["link"]).to_numpy()
+        changed.append(pd.DataFrame({"link": chunk["link"].to_numpy()[moved], "cluster": parents[moved],
+                                     "final_cluster": finals[moved]}))
+    return pd.concat(changed, ignore_index=True)
+
+
+def rewrite_assignments(path, column, changed):
+    """Reescribe la columna `column` de un CSV de asignaciones para los links de `changed`."""
+    assignments = pd.read_csv(path, dtype={"link": str})
+    updated = assignments["link"].map(changed.set_index("link")[column])
+    assignments[column] = updated.fillna(assignments[column]).astype(assignments[column].dtype)
+    assignments.to_csv(path, index=False)
+
+
+# === DATOS ===
+def load_new_articles(path, existing_links):
+    """Artículos nuevos (title, link, abstract) sin links ya presentes ni abstracts vacíos."""
+    new_df = pd.read_csv(path, dtype=str)
+    missing = {"title", "link", "abstract"} - set(new_df.columns)
+    if missing:
+        raise ValueError(f"Faltan columnas en {path}: {', '.join(sorted(missing))}")
+    new_df = new_df.drop_duplicates(subset=["link"], keep="first")
+    new_df = new_df[~new_df["link"].isin(existing_links)]
+    empty = new_df["abstract"].fillna("").str.strip() == ""
+    if empty.any():
+        print(f"Se omiten {int(empty.sum())} artículos sin abstract.")
+    return new_df[~empty][["title", "link", "abstract"]].reset_index(drop=True)
+
+
+def append_csv(path, frame):
+    frame.to_csv(path, mode="a", header=False, index=False)
+
+
+def load_state():
+    if not os.path.exists(APPEND_STATE_PATH):
+        return {"appended_since_rebuild": 0, "batches": []}
+    with open(APPEND_STATE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# === APPEND ===
+def append_articles(new_articles_path, refresh_serving=True, keep_near_duplicates=False):
+    start = time.perf_counter()
+    from preprocess_abstracts import preprocess_texts
+
+    dataset_links = pd.read_csv(DATASET_PATH, usecols=["link"])["link"]
+    new_df = load_new_articles(new_articles_path, set(dataset_links))
+    if new_df.empty:
+        print("No hay artículos nuevos que añadir.")
+        return None
+    new_df["clean_abstract"] = preprocess_texts(new_df["abstract"].tolist())
+
+    # 0. Casi duplicados: el lote se compara con el índice MinHash del corpus, sin recorrerlo
+    near_index = NearDuplicateIndex.load(NEAR_DUPLICATES_PATH) if os.path.exists(NEAR_DUPLICATES_PATH) else None
+    near_pairs = []
+    if near_index is not None:
+        near_pairs, _ = near_index.insert(new_df["link"].tolist(), new_df["title"].tolist(),
+                                          new_df["clean_abstract"].tolist(), skip_duplicates=not keep_near_duplicates)
+        if near_pairs:
+            print(f"{len({pair[0] for pair in near_pairs})} artículos son casi duplicados de otros ya presentes"
+                  f"{'' if keep_near_duplicates else ' y se omiten'}:")
+            for link, duplicate_of, similarity in near_pairs[:10]:
+                print(f"  - {link} ~ {duplicate_of} (Jaccard {similarity:.2f})")
+            if not keep_near_duplicates:
+                new_df = new_df[~new_df["link"].isin({pair[0] for pair in near_pairs})].reset_index(drop=True)
+    if new_df.empty:
+        print("No hay artículos nuevos que añadir.")
+        return None
+    print(f"Añadiendo {len(new_df)} artículos nuevos a un corpus de {len(dataset_links)}...")
+
+    # 1. Vectorizador congelado y jerarquía de centroides guardada (sin transformar el corpus)
+    with open(VECTORIZER_PATH, "rb") as f:
+        tfidf_vectorizer = pickle.load(f)
+    hierarchy = ClusterHierarchy.load(HIERARCHY_PATH)
+    new_matrix = tfidf_vectorizer.transform(new_df["clean_abstract"])
+    new_parents, new_finals, _, _ = hierarchy.assign(new_matrix)
+
+    # 2. Conteos de itemsets y reglas
+    num_rules, emerging_terms, num_frequent_terms, itemsets_meta = update_rules(new_df["clean_abstract"])
+
+    # 3. Deriva
+    baseline = hierarchy.meta.get("mean_squared_distance")
+    new_distance = hierarchy.top_model.mean_squared_distance(new_matrix, new_parents)
+    # model_trainer.py guarda el tamaño del corpus al reconstruir: lo añadido desde entonces es la diferencia
+    built = itemsets_meta["built_transactions"]
+    appended = itemsets_meta["num_transactions"] + len(new_df) - built
+    drift = {
+        "new_fraction": appended / float(built),
+        "distance_ratio": new_distance / baseline if baseline else 0.0,
+        "emerging_fraction": len(emerging_terms) / float(max(1, num_frequent_terms)),
+        "emerging_terms": emerging_terms,
+    }
+    reasons = []
+    if drift["new_fraction"] > MAX_NEW_FRACTION:
+        reasons.append(f"{appended} artículos añadidos desde la última reconstrucción ({drift['new_fraction']:.0%})")
+    if drift["distance_ratio"] > MAX_DISTANCE_RATIO:
+        reasons.append(f"los nuevos artículos están lejos de los centroides (x{drift['distance_ratio']:.2f})")
+    if drift["emerging_fraction"] > MAX_EMERGING_FRACTION:
+        reasons.append(f"{len(emerging_terms)} términos pasan a ser frecuentes: {', '.join(emerging_terms[:10])}")
+
+    # 4. Centroides principales: media acumulada con los nuevos y reasignación de los que cambian
+    hierarchy = update_top_clusters(hierarchy, new_matrix, new_parents)
+    reassigned = reassign_existing(hierarchy, tfidf_vectorizer)
+    if not reassigned.empty:
+        print(f"{len(reassigned)} artículos del corpus pasan a otro cluster principal al moverse los centroides.")
+        rewrite_assignments(ASSIGNMENTS_PATH, "cluster", reassigned)
+        rewrite_assignments(FINAL_ASSIGNMENTS_PATH, "final_cluster", reassigned)
+
+    # 5. Guardar datos y asignaciones
+    append_csv(MERGED_PATH, new_df[["title", "link", "abstract"]].assign(source="appended"))
+    append_csv(DATASET_PATH, new_df[["title", "link", "abstract", "clean_abstract"]])
+    append_csv(ASSIGNMENTS_PATH, pd.DataFrame({"link": new_df["link"], "cluster": new_parents}))
+    append_csv(FINAL_ASSIGNMENTS_PATH, pd.DataFrame({"link": new_df["link"], "final_cluster": new_finals}))
+    if near_index is not None:
+        near_index.save(NEAR_DUPLICATES_PATH)
+        if near_pairs:
+            append_csv(NEAR_DUPLICATES_REPORT_PATH, near_duplicate_report(near_pairs))
+
+    state = load_state()
+    state["appended_since_rebuild"] = appended
+    state["needs_rebuild"] = bool(reasons)
+    state["drift"] = drift
+    state["batches"].append({"at": time.strftime("%Y-%m-%dT%H:%M:%S"), "articles": len(new_df),
+                             "reassigned": len(reassigned)})
+    with open(APPEND_STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+
+    # El pipeline considera al día las etapas actualizadas aquí; solo se reconstruye lo que se sirve
+    from pipeline import adopt_outputs, run_pipeline
+    adopt_outputs(only=APPEND_STAGES)
+    if refresh_serving:
+        run_pipeline(only=SERVING_STAGES)
+
+    print(f"\nArtículos por cluster final: {pd.Series(new_finals).value_counts().sort_index().to_dict()}")
+    print(f"Reglas regeneradas: {num_rules}")
+    print(f"Tiempo total: {time.perf_counter() - start:.2f} s")
+    if reasons:
+        print("\n⚠️  Deriva por encima del umbral; conviene reconstruir todo (python pipeline.py --force model_trainer):")
+        for reason in reasons:
+            print(f"  - {reason}")
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Añade artículos nuevos sin reentrenar vectorizador, clusters ni reglas.")
+    parser.add_argument("new_articles", help="CSV con las columnas title, link y abstract.")
+    parser.add_argument("--no-serving", action="store_true", help="No reconstruir el snapshot de la API.")
+    parser.add_argument("--keep-near-duplicates", action="store_true",
+                        help="Añadir también los artículos casi duplicados de otros ya presentes.")
+    args = parser.parse_args()
+
+    result = append_articles(args.new_articles, refresh_serving=not args.no_serving,
+                             keep_near_duplicates=args.keep_near_duplicates)
+    sys.exit(2 if result and result["needs_rebuild"] else 0)
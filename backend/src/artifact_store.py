@@ -0,0 +1,104 @@
+import os
+import json
+import mmap
+import struct
+import numpy as np
+
+# === FORMATO ===
+# [MAGIC (8 bytes)][longitud de la cabecera (uint64)][cabecera JSON][arrays alineados a 64 bytes]
+# La cabecera describe cada array (dtype, shape, offset) y metadatos libres del artefacto.
+# Los arrays se leen con mmap sin copiarlos: la memoria la comparte el page cache del sistema
+# entre todos los procesos que abren el mismo archivo.
+MAGIC = b"SBKEART1"
+ALIGNMENT = 64
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_artifact(path, arrays, meta=None):
+    """
+    Guarda un diccionario {nombre: np.ndarray} en un archivo binario mapeable en memoria.
+    La escritura es atómica (archivo temporal + rename) para no romper lectores activos.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # Calcular offsets relativos al inicio de la zona de datos
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = json.dumps({"meta": meta or {}, "arrays": layout}).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + layout[name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+def open_artifact(path):
+    """
+    Abre un artefacto con mmap y devuelve (arrays, meta).
+    Los arrays son vistas de solo lectura sobre el archivo (zero-copy).
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} no es un artefacto binario válido.")
+    (header_length,) = struct.unpack_from("<Q", buffer, len(MAGIC))
+    header_start = len(MAGIC) + 8
+    header = json.loads(buffer[header_start:header_start + header_length].decode("utf-8"))
+    data_start = _align(header_start + header_length)
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        if count == 0:
+            arrays[name] = np.empty(spec["shape"], dtype=dtype)
+            continue
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec["offset"])
+        arrays[name] = array.reshape(spec["shape"])
+    return arrays, header["meta"]
+
+
+# === COLUMNAS DE TEXTO ===
+def encode_strings(values):
+    """Codifica una lista de strings como (offsets int64, blob uint8 en UTF-8)."""
+    encoded = [("" if value is None else str(value)).encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, blob
+
+
+def decode_strings(offsets, blob):
+    """Decodifica una columna de texto completa a una lista de strings."""
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+class StringColumn:
+    """Columna de texto sobre (offsets, blob) que decodifica cada valor solo cuando se pide."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
@@ -0,0 +1,76 @@
+import os
+import pickle
+import numpy as np
+
+from text_processing import tokenize
+from cluster_model import CentroidModel, ClusterHierarchy, CENTROIDS_PATH, HIERARCHY_PATH
+from serving_snapshot import UNASSIGNED_CLUSTER_ID, UNASSIGNED_CLUSTER_NAME
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "../models")
+VECTORIZER_PATH = os.path.join(MODEL_DIR, "tfidf_vectorizer.pkl")
+
+# Textos por petición a /classify
+MAX_BATCH = 1000
+
+
+class ClusterClassifier:
+    """
+    Clasifica textos nuevos en la jerarquía de clusters: los preprocesa igual que
+    preprocess_abstracts.py, los vectoriza con el TF-IDF entrenado y asigna todo el lote de una vez
+    (cluster principal y sub-cluster más cercanos).
+    """
+
+    def __init__(self, vectorizer, hierarchy, stopwords, cluster_ids, cluster_names):
+        self.vectorizer = vectorizer
+        self.hierarchy = hierarchy
+        self.stopwords = stopwords
+        self.cluster_names = dict(zip(cluster_ids, cluster_names))
+
+    @classmethod
+    def from_serving_data(cls, data, vectorizer_path=VECTORIZER_PATH, hierarchy_path=HIERARCHY_PATH,
+                          centroids_path=CENTROIDS_PATH):
+        """
+        Carga el vectorizador y la jerarquía guardada por consolidate_clusters.py. Si no existe, los
+        centroides de los sub-clusters se calculan con los artículos del snapshot (su clean_abstract
+        y su cluster final) a partir de los centroides principales.
+        """
+        with open(vectorizer_path, "rb") as f:
+            vectorizer = pickle.load(f)
+        if os.path.exists(hierarchy_path):
+            hierarchy = ClusterHierarchy.load(hierarchy_path)
+            return cls(vectorizer, hierarchy, data.search_index.stopwords, data.cluster_ids, data.cluster_names)
+
+        top_model = CentroidModel.load(centroids_path)
+
+        clean_abstracts = data.columns["clean_abstract"]
+        matrix = vectorizer.transform(clean_abstracts[row] for row in range(len(data)))
+        final_labels = np.asarray([int(cluster_id) for cluster_id in data.cluster_ids])[data.cluster_codes]
+        parent_labels = top_model.assign(matrix)
+        hierarchy = ClusterHierarchy.from_members(top_model, matrix, parent_labels, final_labels)
+        return cls(vectorizer, hierarchy, data.search_index.stopwords, data.cluster_ids, data.cluster_names)
+
+    def preprocess(self, texts):
+        return [" ".join(tokenize(text, self.stopwords)) for text in texts]
+
+    def classify(self, texts):
+        """Devuelve, para cada texto, su cluster final, nombre, cluster principal y distancias."""
+        matrix = self.vectorizer.transform(self.preprocess(texts))
+        parents, finals, parent_distances, final_distances = self.hierarchy.assign(matrix)
+        terms_matched = np.diff(matrix.indptr)
+
+        results = []
+        for parent, final, parent_distance, final_distance, matched in zip(
+                parents, finals, parent_distances, final_distances, terms_matched):
+            cluster_id = str(final) if final >= 0 else UNASSIGNED_CLUSTER_ID
+            results.append({
+                "cluster_id": cluster_id,
+                "cluster_name": self.cluster_names.get(cluster_id, UNASSIGNED_CLUSTER_NAME),
+                "distance": round(float(final_distance), 4) if final >= 0 else None,
+                "parent_cluster": int(parent),
+                "parent_distance": round(float(parent_distance), 4),
+                # Sin términos del vocabulario el texto queda en el origen y la asignación no significa nada
+                "terms_matched": int(matched),
+            })
+        return results
@@ -0,0 +1,197 @@
+import os
+import numpy as np
+
+from artifact_store import write_artifact, open_artifact, encode_strings, decode_strings
+
+CENTROIDS_FORMAT_VERSION = 1
+HIERARCHY_FORMAT_VERSION = 1
+TOP_TERMS = 10  # Términos de mayor peso guardados por sub-cluster
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "../models")
+CENTROIDS_PATH = os.path.join(MODEL_DIR, "cluster_centroids.bin")
+HIERARCHY_PATH = os.path.join(MODEL_DIR, "cluster_hierarchy.bin")
+
+
+def save_centroids(path, centroids, meta=None, counts=None):
+    """
+    Guarda los centroides del clustering de primer nivel como artefacto binario (float32) junto
+    con los artículos que agrupa cada uno (`counts`), que usa la actualización incremental.
+    """
+    centroids = np.asarray(centroids, dtype=np.float32)
+    meta = dict(meta or {})
+    meta.update({
+        "format": "cluster_centroids",
+        "version": CENTROIDS_FORMAT_VERSION,
+        "n_clusters": int(centroids.shape[0]),
+        "n_features": int(centroids.shape[1]),
+    })
+    arrays = {"centroids": centroids}
+    if counts is not None:
+        arrays["counts"] = np.asarray(counts, dtype=np.int64)
+    write_artifact(path, arrays, meta)
+
+
+class CentroidModel:
+    """
+    Asigna documentos (filas TF-IDF) al centroide más cercano sin sklearn ni el corpus: el coste
+    por documento depende solo del número de clusters y de sus términos, no del tamaño del corpus.
+    """
+
+    def __init__(self, centroids, meta=None, counts=None):
+        self.meta = meta or {}
+        self.centroids = centroids
+        self.counts = counts
+        # ||x - c||² = ||x||² - 2·x·c + ||c||²; ||x||² no cambia el argmin
+        self.squared_norms = np.einsum("ij,ij->i", centroids, centroids, dtype=np.float64)
+
+    @classmethod
+    def load(cls, path=CENTROIDS_PATH):
+        arrays, meta = open_artifact(path)
+        if meta.get("format") != "cluster_centroids" or meta.get("version") != CENTROIDS_FORMAT_VERSION:
+            raise ValueError(f"{path} no contiene centroides compatibles (versión {CENTROIDS_FORMAT_VERSION}).")
+        return cls(arrays["centroids"], meta, arrays.get("counts"))
+
+    def distances(self, matrix):
+        """Distancias euclídeas al cuadrado (salvo la constante ||x||²) de cada fila a cada centroide."""
+        return self.squared_norms[None, :] - 2.0 * np.asarray(matrix @ self.centroids.T)
+
+    def assign(self, matrix):
+        """Índice del centroide más cercano para cada fila de `matrix` (dispersa o densa)."""
+        return np.argmin(self.distances(matrix), axis=1)
+
+    def mean_squared_distance(self, matrix, labels):
+        """Distancia euclídea al cuadrado media de cada fila de `matrix` a su centroide `labels`."""
+        row_norms = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+        distances = self.distances(matrix)[np.arange(matrix.shape[0]), labels]
+        return float(np.mean(row_norms + distances))
+
+
+def subcluster_centroids(matrix, parent_labels, final_labels):
+    """
+    Centroides de los sub-clusters como media de sus miembros. Devuelve (ids finales, cluster
+    principal de cada uno, centroides, nº de miembros). Las filas con etiqueta final negativa se
+    ignoran.
+    """
+    final_labels = np.asarray(final_labels)
+    parent_labels = np.asarray(parent_labels)
+    final_ids = np.unique(final_labels[final_labels >= 0])
+    centroids = np.zeros((len(final_ids), matrix.shape[1]))
+    parents = np.zeros(len(final_ids), dtype=np.int64)
+    sizes = np.zeros(len(final_ids), dtype=np.int64)
+    for i, final_id in enumerate(final_ids):
+        rows = np.flatnonzero(final_labels == final_id)
+        centroids[i] = np.asarray(matrix[rows].mean(axis=0)).ravel()
+        # Cada sub-cluster pertenece al cluster principal de la mayoría de sus miembros
+        parents[i] = np.bincount(parent_labels[rows]).argmax()
+        sizes[i] = len(rows)
+    return final_ids, parents, centroids, sizes
+
+
+def top_term_indices(centroid, num_terms=TOP_TERMS):
+    """Índices de los términos de mayor peso del centroide, de mayor a menor."""
+    return centroid.argsort()[::-1][:num_terms]
+
+
+class ClusterHierarchy:
+    """
+    Jerarquía de dos niveles: cada documento va al centroide principal más cercano y, dentro de
+    él, al sub-cluster más cercano. Todo el lote se resuelve con dos productos matriz-centroides.
+
+    Se guarda en un único artefacto (cluster_hierarchy.bin) con los centroides principales, los
+    de los sub-clusters apilados por cluster principal (child_ptr[p]:child_ptr[p+1]), el id final,
+    el tamaño y los términos principales de cada sub-cluster: nombrar, reportar o asignar
+    documentos nuevos no necesita volver a transformar el corpus ni reajustar nada.
+    """
+
+    def __init__(self, top_model, child_ids, child_parents, child_centroids, child_sizes=None, top_terms=None,
+                 terms=None, meta=None):
+        self.top_model = top_model
+        self.child_ids = np.asarray(child_ids)
+        self.child_parents = np.asarray(child_parents)
+        self.child_model = CentroidModel(np.asarray(child_centroids))
+        self.child_sizes = child_sizes
+        self.top_terms = top_terms
+        self.terms = terms
+        self.meta = meta or {}
+        self.child_index = {int(final_id): i for i, final_id in enumerate(self.child_ids)}
+
+    @classmethod
+    def from_members(cls, top_model, matrix, parent_labels, final_labels, terms=None, meta=None):
+        """Construye la jerarquía con los centroides de los sub-clusters calculados desde sus miembros."""
+        child_ids, child_parents, child_centroids, child_sizes = subcluster_centroids(matrix, parent_labels, final_labels)
+        top_terms = np.asarray([top_term_indices(c) for c in child_centroids], dtype=np.int32).reshape(len(child_ids), -1)
+        return cls(top_model, child_ids, child_parents, child_centroids, child_sizes, top_terms, terms, meta)
+
+    def save(self, path=HIERARCHY_PATH):
+        """Guarda la jerarquía (centroides en float32) con los sub-clusters agrupados por cluster principal."""
+        order = np.argsort(self.child_parents, kind="stable")
+        num_parents = len(self.top_model.centroids)
+        child_ptr = np.zeros(num_parents + 1, dtype=np.int64)
+        child_ptr[1:] = np.cumsum(np.bincount(self.child_parents, minlength=num_parents))
+        term_offsets, term_blob = encode_strings(self.terms or [])
+        meta = dict(self.meta)
+        meta.update({
+            "format": "cluster_hierarchy",
+            "version": HIERARCHY_FORMAT_VERSION,
+            "n_parents": int(num_parents),
+            "n_children": int(len(self.child_ids)),
+            "n_features": int(self.top_model.centroids.shape[1]),
+        })
+        write_artifact(path, {
+            "parent_centroids": np.asarray(self.top_model.centroids, dtype=np.float32),
+            "child_ptr": child_ptr,
+            "child_centroids": np.asarray(self.child_model.centroids[order], dtype=np.float32),
+            "child_ids": self.child_ids[order].astype(np.int32),
+            "child_sizes": np.asarray(self.child_sizes)[order].astype(np.int64),
+            "top_terms": self.top_terms[order].astype(np.int32),
+            "term_offsets": term_offsets,
+            "term_blob": term_blob,
+        }, meta)
+
+    @classmethod
+    def load(cls, path=HIERARCHY_PATH):
+        arrays, meta = open_artifact(path)
+        if meta.get("format") != "cluster_hierarchy" or meta.get("version") != HIERARCHY_FORMAT_VERSION:
+            raise ValueError(f"{path} no contiene una jerarquía compatible (versión {HIERARCHY_FORMAT_VERSION}).")
+        child_ptr = arrays["child_ptr"]
+        child_parents = np.repeat(np.arange(len(child_ptr) - 1), np.diff(child_ptr))
+        return cls(
+            CentroidModel(arrays["parent_centroids"]), arrays["child_ids"], child_parents, arrays["child_centroids"],
+            arrays["child_sizes"], arrays["top_terms"], decode_strings(arrays["term_offsets"], arrays["term_blob"]), meta,
+        )
+
+    def cluster_terms(self, final_id, num_terms=TOP_TERMS):
+        """Términos principales del sub-cluster `final_id` (lista vacía si no existe)."""
+        i = self.child_index.get(int(final_id))
+        if i is None:
+            return []
+        return [self.terms[t] for t in self.top_terms[i][:num_terms]]
+
+    def cluster_size(self, final_id):
+        i = self.child_index.get(int(final_id))
+        return 0 if i is None else int(self.child_sizes[i])
+
+    def assign(self, matrix):
+        """
+        Devuelve (cluster principal, id final, distancia al centroide principal, distancia al
+        centroide final) por fila; distancias euclídeas. Las filas cuyo cluster principal no tiene
+        sub-clusters reciben id final -1 y distancia final NaN.
+        """
+        import scipy.sparse as sp  # aquí y no arriba: la API importa este módulo y scipy alarga el arranque
+        row_norms = np.asarray(matrix.multiply(matrix).sum(axis=1) if sp.issparse(matrix)
+                               else np.einsum("ij,ij->i", matrix, matrix)).ravel()
+        rows = np.arange(matrix.shape[0])
+        top_distances = self.top_model.distances(matrix)
+        parents = np.argmin(top_distances, axis=1)
+        # Solo cuentan los sub-clusters del cluster principal asignado
+        child_distances = self.child_model.distances(matrix)
+        child_distances[self.child_parents[None, :] != parents[:, None]] = np.inf
+        children = np.argmin(child_distances, axis=1)
+        best = child_distances[rows, children]
+        has_child = np.isfinite(best)
+        finals = np.where(has_child, self.child_ids[children], -1)
+        parent_distances = np.sqrt(np.maximum(row_norms + top_distances[rows, parents], 0.0))
+        final_distances = np.where(has_child, np.sqrt(np.maximum(row_norms + best, 0.0)), np.nan)
+        return parents, finals, parent_distances, final_distances
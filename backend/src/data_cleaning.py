@@ -1,8 +1,13 @@
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
-import time
 import os
+import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from http_fetcher import TokenBucket, make_session, fetch, is_permanent_error
+from http_cache import HttpCache, fetch_cached
 
 # === CONFIG ===
 # Carpeta actual (backend/)
@@ -15,41 +20,80 @@ DATA_DIR = os.path.join(BASE_DIR, "../../data")
 DATA_PATH = os.path.join(DATA_DIR, "SB_publication_PMC.csv")
 OUTPUT_PATH = os.path.join(DATA_DIR, "cleaned_articles.csv")
 FAILED_OUTPUT_PATH = os.path.join(DATA_DIR, "failed_articles.csv")
+# Progreso de la extracción: un JSON por línea con {"link", "abstract"} de cada artículo terminado
+# (los que fallan con un error HTTP definitivo, como un 404, se guardan con abstract nulo y su "status")
+CHECKPOINT_PATH = os.path.join(DATA_DIR, "scrape_checkpoint.jsonl")
+
+# === CONCURRENCIA ===
+MAX_WORKERS = 8         # Descargas simultáneas
+REQUESTS_PER_SECOND = 3  # Tasa media máxima de peticiones a PMC
+MAX_RETRIES = 3
+
 
-def extract_abstract(url):
+def parse_abstract(html):
     """
-    Extrae el abstract (resumen) del artículo en NCBI/PMC.
+    Extrae el abstract (resumen) del HTML de un artículo en NCBI/PMC.
+    Recibe el cuerpo en bytes, venga de la red o de la caché, y BeautifulSoup detecta su
+    codificación: los dos caminos parsean exactamente la misma entrada.
     Devuelve texto limpio o None si no lo encuentra.
     """
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+    soup = BeautifulSoup(html, "html.parser")
 
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Buscar el section que contiene el abstract
-        abstract_section = soup.find("section", {"class": "abstract"})
-        if not abstract_section:
-            return None
+    # Buscar el section que contiene el abstract
+    abstract_section = soup.find("section", {"class": "abstract"})
+    if not abstract_section:
+        return None
 
-        # Obtener el texto dentro del section (ignorando "Abstract" del h2)
-        text = abstract_section.get_text(separator=" ", strip=True)
+    # Obtener el texto dentro del section (ignorando "Abstract" del h2)
+    text = abstract_section.get_text(separator=" ", strip=True)
 
-        # Quitar la palabra "Abstract" al inicio si existe
-        if text.lower().startswith("abstract"):
-            text = text[len("abstract"):].strip()
+    # Quitar la palabra "Abstract" al inicio si existe
+    if text.lower().startswith("abstract"):
+        text = text[len("abstract"):].strip()
 
-        return text
+    return text
 
-    except Exception as e:
-        print(f"Error extrayendo {url}: {e}")
-        return None
 
+def extract_abstract(url, session=None, limiter=None, cache=None):
+    """
+    Descarga un artículo de NCBI/PMC y extrae su abstract.
+    Devuelve texto limpio o None si no lo encuentra. Los errores de red se propagan
+    (después de los reintentos) para que el artículo no se marque como terminado.
 
-def clean_data():
+    Con `cache`, la página se revalida con una petición condicional y, si su contenido no
+    cambió desde la última vez, se reutiliza el abstract ya extraído sin volver a parsear.
+    """
+    session = session or make_session(pool_size=1)
+    if cache is None:
+        response = fetch(session, url, limiter=limiter, retries=MAX_RETRIES)
+        return parse_abstract(response.content)
+
+    body, body_hash, _ = fetch_cached(session, url, cache, limiter=limiter, retries=MAX_RETRIES)
+    return cache.memoize("abstract", body_hash, lambda: parse_abstract(body))
+
+
+def load_checkpoint(path):
+    """Lee los artículos ya procesados en ejecuciones anteriores ({link: abstract})."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Línea incompleta de una ejecución interrumpida
+            done[entry["link"]] = entry["abstract"]
+    return done
+
+
+def clean_data(data_path=DATA_PATH, output_path=OUTPUT_PATH, failed_output_path=FAILED_OUTPUT_PATH,
+               checkpoint_path=CHECKPOINT_PATH, workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND, cache=None):
     # Leer CSV original
-    df = pd.read_csv(DATA_PATH)
+    df = pd.read_csv(data_path)
     print(f"CSV cargado con {len(df)} artículos")
 
     # Normalizar nombres de columnas: minúsculas y sin espacios
@@ -61,35 +105,75 @@ def clean_data():
         print("Columnas actuales:", df.columns.tolist())
         return
 
-    abstracts = []
-
-    for i, row in df.iterrows():
-        title, link = row["title"], row["link"]
-        print(f"🔍 ({i+1}/{len(df)}) Extrayendo abstract de: {title}")
-        text = extract_abstract(link)
-        abstracts.append(text)
-        time.sleep(1)  # Pausa entre requests
-
-    # Agregar la columna 'abstract'
-    df["abstract"] = abstracts
+    # Retomar desde el checkpoint: los links ya procesados no se vuelven a descargar
+    abstracts = load_checkpoint(checkpoint_path)
+    pending = {}  # link -> título (links únicos)
+    for title, link in zip(df["title"], df["link"]):
+        if link not in abstracts:
+            pending.setdefault(link, title)
+    print(f"Artículos ya procesados (checkpoint): {len(abstracts)}. Pendientes: {len(pending)}")
+
+    session = make_session(pool_size=workers)
+    limiter = TokenBucket(rate)
+    checkpoint_lock = threading.Lock()
+
+    def save_progress(checkpoint, entry):
+        with checkpoint_lock:
+            checkpoint.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(extract_abstract, link, session, limiter, cache): (title, link) for link, title in pending.items()
+        }
+        for i, future in enumerate(as_completed(futures), start=1):
+            title, link = futures[future]
+            try:
+                text = future.result()
+            except Exception as e:
+                print(f"Error extrayendo {link}: {e}")
+                abstracts[link] = None
+                # Un error HTTP definitivo (404...) no cambia al reintentar: queda como fallido en el checkpoint.
+                # Un error de red persistente no se guarda, para reintentarlo la próxima vez.
+                if is_permanent_error(e):
+                    save_progress(checkpoint, {"link": link, "abstract": None, "status": e.response.status_code})
+                continue
+            abstracts[link] = text
+            save_progress(checkpoint, {"link": link, "abstract": text})
+            print(f"🔍 ({i}/{len(pending)}) {'Abstract extraído' if text else 'Sin abstract'}: {title}")
+
+    # Agregar la columna 'abstract' (en el orden original del CSV)
+    df["abstract"] = df["link"].map(abstracts)
 
     # Separar artículos exitosos y fallidos
     df_success = df.dropna(subset=["abstract"])
     df_failed = df[df["abstract"].isna()]
 
     # Crear carpetas si no existen
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    os.makedirs(os.path.dirname(FAILED_OUTPUT_PATH), exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(failed_output_path)), exist_ok=True)
 
     # Guardar resultados
-    df_success.to_csv(OUTPUT_PATH, index=False)
-    df_failed.to_csv(FAILED_OUTPUT_PATH, index=False)
+    df_success.to_csv(output_path, index=False)
+    df_failed.to_csv(failed_output_path, index=False)
 
-    print(f"Limpieza completada. Archivo guardado en: {OUTPUT_PATH}")
+    print(f"Limpieza completada. Archivo guardado en: {output_path}")
     print(f"Total de artículos con abstract: {len(df_success)}")
-    print(f"Artículos sin abstract guardados en: {FAILED_OUTPUT_PATH}")
+    print(f"Artículos sin abstract guardados en: {failed_output_path}")
     print(f"Total de artículos sin abstract: {len(df_failed)}")
 
 
 if __name__ == "__main__":
-    clean_data()
+    parser = argparse.ArgumentParser(description="Extrae los abstracts de los artículos de PMC.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Descargas simultáneas.")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="Peticiones por segundo como máximo.")
+    parser.add_argument("--reset", action="store_true", help="Ignorar el checkpoint y empezar desde cero.")
+    parser.add_argument("--no-cache", action="store_true", help="No usar la caché HTTP local.")
+    args = parser.parse_args()
+
+    if args.reset and os.path.exists(CHECKPOINT_PATH):
+        os.remove(CHECKPOINT_PATH)
+    http_cache = None if args.no_cache else HttpCache()
+    clean_data(workers=args.workers, rate=args.rate, cache=http_cache)
@@ -0,0 +1,52 @@
+import zlib
+import numpy as np
+
+from response_cache import serialize
+
+# === CONFIGURACIÓN ===
+EXPORT_BATCH = 512       # Registros por fragmento enviado al cliente
+GZIP_LEVEL = 6
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def iter_row_batches(rows, batch=EXPORT_BATCH):
+    for start in range(0, len(rows), batch):
+        yield rows[start:start + batch]
+
+
+def iter_all_rows(num_rows, batch=EXPORT_BATCH):
+    """Bloques de filas 0..num_rows-1 sin crear el array completo."""
+    for start in range(0, num_rows, batch):
+        yield np.arange(start, min(start + batch, num_rows))
+
+
+def ranked_rows(rows, scores):
+    """Todas las filas ordenadas por puntuación descendente (mismo orden que InvertedIndex.rank)."""
+    return rows[np.lexsort((rows, -scores))]
+
+
+def article_lines(data, row_batches):
+    """
+    NDJSON de artículos: una línea por artículo con el mismo registro que devuelve /articles,
+    copiando directamente los fragmentos ya serializados del snapshot.
+    """
+    offsets, blob = data.record_json_offsets, data.record_json_blob
+    for rows in row_batches:
+        if len(rows):
+            yield b"\n".join([blob[offsets[row]:offsets[row + 1]] for row in rows]) + b"\n"
+
+
+def rule_lines(rule_index, id_batches):
+    """NDJSON de reglas: una línea por regla con el mismo registro que devuelve /associations."""
+    for rule_ids in id_batches:
+        yield b"".join([serialize(record) + b"\n" for record in rule_index.records(rule_ids)])
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """Comprime en formato gzip a medida que se generan los fragmentos (memoria constante)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -1,50 +1,140 @@
 # pip install google-generativeai selenium beautifulsoup4 pandas python-dotenv
 
 import os
+import csv
 import time
+import random
+import asyncio
+import argparse
+import threading
 import pandas as pd
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from dotenv import load_dotenv
-import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor
 
-# === LOAD API KEY ===
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-2.5-flash")
+from http_fetcher import make_session
+from http_cache import HttpCache, fetch_cached
 
 # === PATHS ===
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, "../../data")
 FAILED_PATH = os.path.join(DATA_DIR, "failed_articles.csv")
 OUTPUT_PATH = os.path.join(DATA_DIR, "generated_abstracts.csv")
+OUTPUT_COLUMNS = ["title", "link", "abstract"]
+
+# === PIPELINE CONFIG ===
+BROWSER_WORKERS = 3         # Headless Chrome instances extracting pages in parallel
+MAX_IN_FLIGHT = 4           # Concurrent generation requests
+REQUESTS_PER_MINUTE = 60    # Generation rate limit
+MAX_RETRIES = 3             # Retries per article on transient generation errors
+QUEUE_SIZE = 16             # Extracted articles waiting for generation
+PAGE_WAIT_SECONDS = 10      # Max wait for the page body to render
+PAGE_POLL_SECONDS = 0.25
+MODEL_NAME = "gemini-2.5-flash"
+
+
+# === CLIENT FACTORIES ===
+def create_model():
+    """Creates the Gemini client (imported lazily so the module loads without it)."""
+    from dotenv import load_dotenv
+    import google.generativeai as genai
+
+    load_dotenv()
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai.GenerativeModel(MODEL_NAME)
+
+def create_driver():
+    """Creates a headless Chrome driver."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(options=options)
+
+
+class DriverPool:
+    """One browser per extraction thread, created on first use and closed together at the end."""
+
+    def __init__(self, driver_factory):
+        self.driver_factory = driver_factory
+        self.local = threading.local()
+        self.drivers = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        driver = getattr(self.local, "driver", None)
+        if driver is None:
+            driver = self.driver_factory()
+            self.local.driver = driver
+            with self.lock:
+                self.drivers.append(driver)
+        return driver
+
+    def close(self):
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+
+
+class RateLimiter:
+    """Async limiter: spaces request starts so that at most `rate_per_minute` begin per minute."""
+
+    def __init__(self, rate_per_minute):
+        self.interval = 60.0 / rate_per_minute
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
 
-# === SELENIUM CONFIG ===
-options = Options()
-options.add_argument("--headless")
-options.add_argument("--no-sandbox")
-options.add_argument("--disable-dev-shm-usage")
-driver = webdriver.Chrome(options=options)
 
 # === FUNCTIONS ===
-def extract_full_text(url):
+def wait_for_content(driver, timeout=PAGE_WAIT_SECONDS, poll=PAGE_POLL_SECONDS):
+    """Waits until the page has paragraphs (instead of a fixed sleep) and returns its source."""
+    deadline = time.monotonic() + timeout
+    page_source = driver.page_source
+    while "<p" not in page_source and time.monotonic() < deadline:
+        time.sleep(poll)
+        page_source = driver.page_source
+    return page_source
+
+def render_full_text(driver, url):
     """Extracts the main text from the article page using Selenium and BeautifulSoup."""
+    driver.get(url)
+    soup = BeautifulSoup(wait_for_content(driver), "html.parser")
+    paragraphs = soup.find_all("p")
+    text = " ".join(p.get_text() for p in paragraphs if len(p.get_text()) > 50)
+    return text.strip()[:7000]  # Limit length for API
+
+def extract_full_text(driver, url, session=None, cache=None):
+    """
+    Returns the article text. With a cache, a conditional GET tells us whether the page changed
+    since the last run; if not, the text extracted then is reused and the browser is not used.
+    """
     try:
-        driver.get(url)
-        time.sleep(3)
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-        paragraphs = soup.find_all("p")
-        text = " ".join(p.get_text() for p in paragraphs if len(p.get_text()) > 50)
-        return text.strip()[:7000]  # Limit length for API
+        if cache is None or session is None:
+            return render_full_text(driver, url)
+        try:
+            _, body_hash, _ = fetch_cached(session, url, cache)
+        except Exception as e:
+            print(f"Could not revalidate {url} ({e}); rendering without cache.")
+            return render_full_text(driver, url)
+        return cache.memoize("full_text", body_hash, lambda: render_full_text(driver, url))
     except Exception as e:
         print(f"Error extracting text from {url}: {e}")
         return None
 
-def generate_summary(title, text):
-    """Generates an academic-style abstract using Gemini."""
-    try:
-        prompt = f"""
+def build_prompt(title, text):
+    return f"""
 You are a scientific assistant. Given the following article titled:
 '{title}'
 
@@ -54,49 +144,146 @@ Do not include section titles or labels. Summarize in a single paragraph the mai
 Article text:
 {text[:6000]}
 """
-        response = model.generate_content(prompt)
-        return response.text.strip() if response else None
-    except Exception as e:
-        print(f"Error generating summary: {e}")
-        return None
+
+async def generate_summary(model, title, text, limiter, retries=MAX_RETRIES, backoff=2.0):
+    """Generates an academic-style abstract, retrying transient failures with exponential backoff."""
+    prompt = build_prompt(title, text)
+    for attempt in range(retries + 1):
+        await limiter.wait()
+        try:
+            response = await asyncio.to_thread(model.generate_content, prompt)
+            return response.text.strip() if response else None
+        except Exception as e:
+            if attempt >= retries:
+                print(f"Error generating summary for '{title}': {e}")
+                return None
+            delay = backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+            print(f"Generation failed for '{title}' ({e}); retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+def load_done_links(output_path):
+    """Links that already have a generated abstract (so a restarted run skips them)."""
+    if not os.path.exists(output_path):
+        return set()
+    return set(pd.read_csv(output_path, usecols=["link"])["link"])
+
 
 # === PROCESSING ===
-def generate_missing_abstracts():
-    df = pd.read_csv(FAILED_PATH)
-    print(f"Processing {len(df)} articles without abstracts...")
-
-    generated_data = []
-
-    for i, row in df.iterrows():
-        title, link = row["title"], row["link"]
-        print(f"({i+1}/{len(df)}) Generating abstract for: {title}")
-
-        full_text = extract_full_text(link)
-        if not full_text:
-            print("Could not retrieve full text.")
-            continue
-
-        abstract = generate_summary(title, full_text)
-        if abstract:
-            generated_data.append({
-                "title": title,
-                "link": link,
-                "generated_abstract": abstract
-            })
-            print("Abstract generated.")
-        else:
-            print("No abstract generated.")
-
-        time.sleep(2)  # Avoid overloading API
-
-    if generated_data:
-        os.makedirs(DATA_DIR, exist_ok=True)
-        pd.DataFrame(generated_data).to_csv(OUTPUT_PATH, index=False)
-        print(f"\nGenerated abstracts saved to {OUTPUT_PATH}")
-    else:
+async def run_pipeline(articles, output_path, driver_pool, model, session=None, cache=None,
+                       browser_workers=BROWSER_WORKERS, max_in_flight=MAX_IN_FLIGHT,
+                       requests_per_minute=REQUESTS_PER_MINUTE):
+    """
+    Two overlapping stages connected by a bounded queue:
+    1. Extraction: `browser_workers` threads, each with its own browser, render the pages.
+    2. Generation: `max_in_flight` async workers call the model under a shared rate limit.
+    Each generated abstract is appended to the output CSV as soon as it is ready.
+    """
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    limiter = RateLimiter(requests_per_minute)
+    loop = asyncio.get_running_loop()
+    stats = {"extracted": 0, "generated": 0, "failed": 0}
+
+    write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    output_file = open(output_path, "a", newline="", encoding="utf-8")
+    writer = csv.DictWriter(output_file, fieldnames=OUTPUT_COLUMNS)
+    if write_header:
+        writer.writeheader()
+        output_file.flush()
+
+    def extract(link):
+        return extract_full_text(driver_pool.get(), link, session, cache)
+
+    async def extraction_stage(executor):
+        semaphore = asyncio.Semaphore(browser_workers)
+
+        async def extract_one(title, link):
+            async with semaphore:
+                text = await loop.run_in_executor(executor, extract, link)
+            if not text:
+                print(f"Could not retrieve full text: {title}")
+                stats["failed"] += 1
+                return
+            stats["extracted"] += 1
+            await queue.put((title, link, text))
+
+        await asyncio.gather(*(extract_one(title, link) for title, link in articles))
+
+    async def generation_worker():
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                title, link, text = item
+                abstract = await generate_summary(model, title, text, limiter)
+                if abstract:
+                    writer.writerow({"title": title, "link": link, "abstract": abstract})
+                    output_file.flush()
+                    stats["generated"] += 1
+                    print(f"({stats['generated']}/{len(articles)}) Abstract generated: {title}")
+                else:
+                    stats["failed"] += 1
+                    print(f"No abstract generated: {title}")
+            except Exception as e:
+                # A failing item must not kill the worker: with every worker gone the bounded
+                # queue fills up and the extraction stage blocks forever on `queue.put`
+                stats["failed"] += 1
+                print(f"Error saving the abstract for '{item[0]}': {e}")
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(generation_worker()) for _ in range(max_in_flight)]
+    try:
+        with ThreadPoolExecutor(max_workers=browser_workers) as executor:
+            await extraction_stage(executor)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        output_file.close()
+    return stats
+
+def generate_missing_abstracts(failed_path=FAILED_PATH, output_path=OUTPUT_PATH, driver_factory=create_driver,
+                               model=None, use_cache=True, browser_workers=BROWSER_WORKERS,
+                               max_in_flight=MAX_IN_FLIGHT, requests_per_minute=REQUESTS_PER_MINUTE):
+    df = pd.read_csv(failed_path)
+    done_links = load_done_links(output_path)
+    articles = [(title, link) for title, link in zip(df["title"], df["link"]) if link not in done_links]
+    print(f"Processing {len(articles)} articles without abstracts ({len(done_links)} already generated)...")
+    if not articles:
         print("\nNo new abstracts were generated.")
+        return
+
+    model = model or create_model()
+    session = make_session(pool_size=browser_workers) if use_cache else None
+    cache = HttpCache() if use_cache else None
+    driver_pool = DriverPool(driver_factory)
+    try:
+        stats = asyncio.run(run_pipeline(
+            articles, output_path, driver_pool, model, session=session, cache=cache,
+            browser_workers=browser_workers, max_in_flight=max_in_flight,
+            requests_per_minute=requests_per_minute,
+        ))
+    finally:
+        driver_pool.close()
 
-    driver.quit()
+    print(f"\nGenerated abstracts: {stats['generated']} | Failed: {stats['failed']}")
+    print(f"Generated abstracts saved to {output_path}")
 
 if __name__ == "__main__":
-    generate_missing_abstracts()
+    parser = argparse.ArgumentParser(description="Generate abstracts for articles whose abstract could not be scraped.")
+    parser.add_argument("--browsers", type=int, default=BROWSER_WORKERS, help="Headless browsers in the pool.")
+    parser.add_argument("--in-flight", type=int, default=MAX_IN_FLIGHT, help="Concurrent generation requests.")
+    parser.add_argument("--rpm", type=float, default=REQUESTS_PER_MINUTE, help="Generation requests per minute.")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the local HTTP cache.")
+    args = parser.parse_args()
+
+    generate_missing_abstracts(
+        use_cache=not args.no_cache,
+        browser_workers=args.browsers,
+        max_in_flight=args.in_flight,
+        requests_per_minute=args.rpm,
+    )
@@ -0,0 +1,31 @@
+import gc
+import os
+import multiprocessing
+
+# === CONFIGURACIÓN ===
+# Uso: cd backend/src && gunicorn api:app
+bind = os.environ.get("API_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+keepalive = 5
+
+# La app se importa una sola vez en el master; los workers la heredan al hacer fork
+preload_app = True
+
+
+def when_ready(server):
+    """
+    Se ejecuta en el master antes de crear los workers: carga los datos de solo lectura (snapshot,
+    reglas y vecinos con mmap, y el clasificador) para que todos los workers los hereden
+    copy-on-write en lugar de cargar cada uno su copia.
+    """
+    import api
+
+    state = api.get_state()
+    # Los workers de gunicorn heredan también el clasificador de /classify (en uvicorn se carga en su primera petición)
+    api.get_classifier()
+    # Los objetos ya creados pasan a la generación permanente: el GC de los workers no los recorre
+    # ni toca sus cabeceras, así que sus páginas siguen compartidas con el master
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Datos cargados en el master (versión {state.version}, {state.timings['boot_ms']} ms)")
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from http_fetcher import fetch
+
+# === CONFIGURACIÓN ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "../../data/http_cache")
+MAX_CACHE_BYTES = 512 * 1024 * 1024  # 512 MB
+
+
+class HttpCache:
+    """
+    Caché local de respuestas HTTP indexada por URL.
+
+    - Los cuerpos se guardan una sola vez por contenido (nombre de archivo = sha256 del cuerpo).
+    - Un índice SQLite guarda, por URL, el hash del cuerpo, ETag, Last-Modified y el último acceso.
+    - Cuando el tamaño total supera `max_bytes` se eliminan las entradas usadas hace más tiempo (LRU).
+    - `memoize` guarda resultados de parseo por hash de cuerpo para no volver a parsear lo que no cambió.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, "objects")
+        self.max_bytes = max_bytes
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                body_hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_by_access ON entries (last_access);
+        """)
+        # Las cachés creadas antes indexaban los resultados por "namespace:hash" sin poder borrarlos
+        # con su cuerpo; son recalculables, así que se descartan
+        memo_columns = {row[1] for row in self.db.execute("PRAGMA table_info(memo)")}
+        if memo_columns and "body_hash" not in memo_columns:
+            self.db.execute("DROP TABLE memo")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS memo (
+                namespace TEXT NOT NULL,
+                body_hash TEXT NOT NULL,
+                value TEXT,
+                PRIMARY KEY (namespace, body_hash)
+            );
+            CREATE INDEX IF NOT EXISTS memo_by_body ON memo (body_hash);
+        """)
+        self.db.commit()
+
+    def _object_path(self, body_hash):
+        return os.path.join(self.objects_dir, body_hash[:2], body_hash)
+
+    # === ENTRADAS ===
+    def get(self, url):
+        """Devuelve la entrada de la URL como dict (sin el cuerpo) o None."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT body_hash, etag, last_modified FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"body_hash": row[0], "etag": row[1], "last_modified": row[2]}
+
+    def read_body(self, body_hash):
+        """Lee un cuerpo por su hash; None si ya no está en disco."""
+        try:
+            with open(self._object_path(body_hash), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def touch(self, url):
+        """Marca la entrada como usada ahora (política LRU)."""
+        with self.lock:
+            self.db.execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+
+    def put(self, url, body, etag=None, last_modified=None):
+        """Guarda el cuerpo de la URL y sus validadores. Devuelve el hash del cuerpo."""
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self._object_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+
+        with self.lock:
+            previous = self.db.execute("SELECT body_hash FROM entries WHERE url = ?", (url,)).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries (url, body_hash, etag, last_modified, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, body_hash, etag, last_modified, len(body), time.time()),
+            )
+            if previous and previous[0] != body_hash:
+                self._remove_object_if_unused(previous[0])
+            self._evict()
+            self.db.commit()
+        return body_hash
+
+    def _remove_object_if_unused(self, body_hash):
+        """Borra el cuerpo y sus resultados de parseo si ninguna URL lo usa ya."""
+        in_use = self.db.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone()
+        if not in_use:
+            self.db.execute("DELETE FROM memo WHERE body_hash = ?", (body_hash,))
+            try:
+                os.remove(self._object_path(body_hash))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        """Elimina las entradas menos usadas hasta que el tamaño total quepa en max_bytes."""
+        (total,) = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_bytes:
+            return
+        for url, body_hash, size in self.db.execute(
+            "SELECT url, body_hash, size FROM entries ORDER BY last_access"
+        ).fetchall():
+            self.db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._remove_object_if_unused(body_hash)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    # === RESULTADOS DE PARSEO ===
+    def memoize(self, namespace, body_hash, compute):
+        """
+        Devuelve el resultado guardado para (namespace, body_hash) o lo calcula con `compute()`
+        y lo guarda. El resultado debe ser serializable en JSON. Los resultados se borran junto con
+        su cuerpo al expulsarlo de la caché, así que la tabla no crece más que el índice de URLs.
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value FROM memo WHERE namespace = ? AND body_hash = ?", (namespace, body_hash)
+            ).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+        value = compute()
+        with self.lock:
+            # Solo si el cuerpo sigue en la caché: si se expulsó mientras se calculaba, la fila quedaría huérfana
+            self.db.execute(
+                "INSERT OR REPLACE INTO memo (namespace, body_hash, value) "
+                "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM entries WHERE body_hash = ?)",
+                (namespace, body_hash, json.dumps(value), body_hash),
+            )
+            self.db.commit()
+        return value
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def fetch_cached(session, url, cache, **fetch_kwargs):
+    """
+    Descarga una URL a través de la caché con una petición condicional (If-None-Match /
+    If-Modified-Since). Si el servidor responde 304 se usa el cuerpo guardado.
+    Devuelve (cuerpo en bytes, hash del cuerpo, True si vino de la caché).
+    """
+    entry = cache.get(url)
+    headers = {}
+    cached_body = None
+    if entry is not None:
+        cached_body = cache.read_body(entry["body_hash"])
+        if cached_body is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = fetch(session, url, headers=headers or None, **fetch_kwargs)
+    if response.status_code == 304 and cached_body is not None:
+        cache.touch(url)
+        return cached_body, entry["body_hash"], True
+
+    body = response.content
+    body_hash = cache.put(url, body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return body, body_hash, False
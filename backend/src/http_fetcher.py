@@ -0,0 +1,81 @@
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# === CONFIGURACIÓN ===
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+# Códigos HTTP que se consideran transitorios y se reintentan
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Limitador de tasa (token bucket) compartido entre hilos.
+    Permite hasta `rate` peticiones por segundo de media, con ráfagas de hasta `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta que haya un token disponible."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size=10, headers=None):
+    """Sesión HTTP con pool de conexiones reutilizables (keep-alive) para `pool_size` hilos."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(headers or DEFAULT_HEADERS)
+    return session
+
+
+def is_permanent_error(error):
+    """True si la excepción es una respuesta HTTP que no se reintenta (404, 403...): repetirla no cambia nada."""
+    response = getattr(error, "response", None)
+    return isinstance(error, requests.HTTPError) and response is not None and response.status_code not in RETRY_STATUS
+
+
+def fetch(session, url, limiter=None, retries=3, backoff=1.0, timeout=10, headers=None):
+    """
+    Descarga una URL respetando el limitador de tasa y reintentando los errores transitorios
+    (conexión, timeout, 429 y 5xx) con espera exponencial. Devuelve la respuesta o lanza la
+    última excepción si se agotan los reintentos.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = session.get(url, timeout=timeout, headers=headers)
+            if response.status_code in RETRY_STATUS and attempt < retries:
+                raise requests.HTTPError(f"{response.status_code} transitorio", response=response)
+            response.raise_for_status()
+            return response
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            status = e.response.status_code if getattr(e, "response", None) is not None else None
+            if attempt >= retries or (status is not None and status not in RETRY_STATUS):
+                raise
+            # Respetar Retry-After si el servidor lo indica; si no, espera exponencial con jitter
+            retry_after = e.response.headers.get("Retry-After") if status is not None else None
+            if retry_after and retry_after.isdigit():
+                delay = float(retry_after)
+            else:
+                delay = backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+            time.sleep(delay)
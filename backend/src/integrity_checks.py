@@ -0,0 +1,223 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "../../data")
+DATASET_PATH = os.path.join(DATA_DIR, "final_dataset.csv")
+ASSIGNMENTS_PATH = os.path.join(DATA_DIR, "cluster_assignments.csv")
+FINAL_ASSIGNMENTS_PATH = os.path.join(DATA_DIR, "final_cluster_assignments.csv")
+REPORT_PATH = os.path.join(DATA_DIR, "integrity_report.json")
+
+# === CONFIGURACIÓN ===
+SAMPLE_SIZE = 10  # Ejemplos por comprobación en el reporte
+
+# Comprobaciones que solo avisan: no hacen fallar la etapa
+WARNING_CHECKS = {"unassigned_articles"}
+
+# Id de PMC dentro del link: el mismo artículo aparece bajo el host antiguo y el nuevo
+# (www.ncbi.nlm.nih.gov/pmc/articles/PMC... y pmc.ncbi.nlm.nih.gov/articles/PMC...)
+PMC_ID_PATTERN = r"(PMC\d+)"
+
+
+# === CARGA ===
+def load_artifacts(dataset_path=DATASET_PATH, assignments_path=ASSIGNMENTS_PATH,
+                   final_assignments_path=FINAL_ASSIGNMENTS_PATH):
+    """Lee cada CSV una sola vez, solo con las columnas que usan las comprobaciones."""
+    return {
+        "final_dataset": pd.read_csv(dataset_path, usecols=["link", "title", "abstract"], dtype=str),
+        "cluster_assignments": pd.read_csv(assignments_path, dtype={"link": str}),
+        "final_cluster_assignments": pd.read_csv(final_assignments_path, dtype={"link": str}),
+    }
+
+
+def hash_column(values):
+    """Hash uint64 de cada valor (los nulos tienen su propio hash, como un valor más)."""
+    return pd.util.hash_array(np.asarray(values, dtype=object), categorize=False)
+
+
+def normalize_links(links):
+    """
+    Clave de cada link para compararlos: su id de PMC en mayúsculas o, si no lo tiene, el link sin
+    espacios y en minúsculas. Los nulos se mantienen nulos.
+    """
+    links = pd.Series(np.asarray(links, dtype=object), dtype=object)
+    pmc_ids = links.str.extract(PMC_ID_PATTERN, flags=re.IGNORECASE, expand=False).str.upper()
+    return pmc_ids.fillna(links.str.strip().str.lower()).to_numpy(dtype=object)
+
+
+def sample(values):
+    return [str(v) for v in values[:SAMPLE_SIZE]]
+
+
+class LinkIndex:
+    """
+    Links de un artefacto normalizados (normalize_links), convertidos a hashes y ordenados una sola
+    vez: todas las comprobaciones (repetidos, pertenencia, cardinalidad de la unión) reutilizan el
+    mismo orden. Los ejemplos de los reportes muestran el link original.
+    """
+
+    def __init__(self, links):
+        self.links = np.asarray(links, dtype=object)
+        self.keys = normalize_links(self.links)
+        self.hashes = hash_column(self.keys)
+        order = np.argsort(self.hashes, kind="stable")
+        sorted_hashes = self.hashes[order]
+        starts = np.ones(len(order), dtype=bool)
+        starts[1:] = sorted_hashes[1:] != sorted_hashes[:-1]
+        start_positions = np.flatnonzero(starts)
+        self.unique = sorted_hashes[start_positions]
+        self.first = order[start_positions]  # primera fila de cada link (el orden es estable)
+        self.counts = np.diff(np.append(start_positions, len(order)))
+        self.row_counts = np.empty(len(order), dtype=np.int64)
+        self.row_counts[order] = np.repeat(self.counts, self.counts)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def lookup(self, hashes):
+        """Para cada hash: (está en el índice, posición en `unique`)."""
+        if not len(self.unique):
+            return np.zeros(len(hashes), dtype=bool), np.zeros(len(hashes), dtype=np.int64)
+        position = np.minimum(np.searchsorted(self.unique, hashes), len(self.unique) - 1)
+        return self.unique[position] == hashes, position
+
+
+# === COMPROBACIONES ===
+def link_uniqueness(index):
+    """Links repetidos: filas de más y ejemplos de links afectados."""
+    return {
+        "rows": len(index),
+        "unique_links": int(len(index.unique)),
+        "duplicate_rows": int(len(index) - len(index.unique)),
+        "null_links": int(pd.isna(index.links).sum()),
+        "examples": sample(index.links[np.sort(index.first[index.counts > 1])]),
+    }
+
+
+def content_discrepancy(index, titles, abstracts):
+    """
+    Links repetidos cuyas filas no tienen el mismo título y abstract. Solo se calculan los hashes
+    de título y abstract de las filas con link repetido; se cuentan las combinaciones
+    (link, título, abstract) distintas: un link con más de una tiene contenido discrepante.
+    """
+    rows = np.flatnonzero(index.row_counts > 1)
+    versions = np.stack([index.hashes[rows], hash_column(titles[rows]), hash_column(abstracts[rows])], axis=1)
+    version_links, num_versions = np.unique(np.unique(versions, axis=0)[:, 0], return_counts=True)
+    discrepant = version_links[num_versions > 1]
+    _, position = index.lookup(discrepant)
+    return {
+        "discrepant_links": int(len(discrepant)),
+        "examples": sample(index.links[np.sort(index.first[position])]),
+    }
+
+
+def orphan_links(index, reference):
+    """Filas de `index` cuyo link no aparece en `reference`."""
+    found, _ = reference.lookup(index.hashes)
+    return {"orphan_rows": int((~found).sum()), "examples": sample(index.links[~found])}
+
+
+def merge_cardinality(left, right):
+    """
+    Filas que produciría `pd.merge(left.drop_duplicates('link'), right, on='link', how='left')`,
+    sin hacer el merge: cada link de la izquierda aporta max(1, sus apariciones a la derecha).
+    """
+    found, position = right.lookup(left.unique)
+    matches = np.where(found, right.counts[position] if len(right.counts) else 0, 0)
+    return {
+        "left_rows": int(len(left.unique)),
+        "right_rows": len(right),
+        "merged_rows": int(np.maximum(matches, 1).sum()),
+        "fanout_links": int((matches > 1).sum()),
+    }
+
+
+def run_checks(artifacts):
+    """
+    Ejecuta todas las comprobaciones sobre los artefactos ya cargados. Los links de cada
+    artefacto se convierten una vez a hashes uint64 ordenados y todo lo demás son operaciones de
+    numpy sobre esos arrays. Devuelve {nombre: resultado}; cada resultado lleva su campo "ok".
+    """
+    dataset = artifacts["final_dataset"]
+    indexes = {name: LinkIndex(df["link"]) for name, df in artifacts.items()}
+    dataset_index = indexes["final_dataset"]
+
+    checks = {}
+    for name, index in indexes.items():
+        result = link_uniqueness(index)
+        result["ok"] = result["duplicate_rows"] == 0 and result["null_links"] == 0
+        checks[f"link_uniqueness.{name}"] = result
+
+    result = content_discrepancy(dataset_index, dataset["title"].to_numpy(dtype=object),
+                                 dataset["abstract"].to_numpy(dtype=object))
+    result["ok"] = result["discrepant_links"] == 0
+    checks["content_discrepancy.final_dataset"] = result
+
+    for name in ("cluster_assignments", "final_cluster_assignments"):
+        result = orphan_links(indexes[name], dataset_index)
+        result["ok"] = result["orphan_rows"] == 0
+        checks[f"orphan_assignments.{name}"] = result
+
+        result = merge_cardinality(dataset_index, indexes[name])
+        result["ok"] = result["fanout_links"] == 0
+        checks[f"merge_cardinality.{name}"] = result
+
+    # Artículos sin cluster final: la API los muestra como "sin asignar", así que solo es un aviso
+    result = orphan_links(dataset_index, indexes["final_cluster_assignments"])
+    result["ok"] = result["orphan_rows"] == 0
+    checks["unassigned_articles"] = result
+    return checks
+
+
+def build_report(checks):
+    """Reporte sin fechas ni tiempos: con los mismos datos es idéntico y no re-ejecuta las etapas siguientes."""
+    failed = [name for name, result in checks.items() if not result["ok"] and name not in WARNING_CHECKS]
+    warnings = [name for name, result in checks.items() if not result["ok"] and name in WARNING_CHECKS]
+    return {
+        "ok": not failed,
+        "failed": failed,
+        "warnings": warnings,
+        "checks": checks,
+    }
+
+
+def run_integrity_checks(report_path=REPORT_PATH, **paths):
+    """Carga los artefactos, ejecuta las comprobaciones y guarda el reporte JSON. Devuelve (reporte, tiempos en ms)."""
+    start = time.perf_counter()
+    artifacts = load_artifacts(**paths)
+    loaded = time.perf_counter()
+    checks = run_checks(artifacts)
+    checked = time.perf_counter()
+    report = build_report(checks)
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return report, {"load": (loaded - start) * 1000, "checks": (checked - loaded) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprueba la integridad del dataset y de las asignaciones de clusters.")
+    parser.add_argument("--report", default=REPORT_PATH, help="Ruta del reporte JSON.")
+    args = parser.parse_args()
+
+    report, timings = run_integrity_checks(args.report)
+    for name, result in report["checks"].items():
+        status = "✅" if result["ok"] else ("⚠️ " if name in WARNING_CHECKS else "❌")
+        details = ", ".join(f"{key}={value}" for key, value in result.items() if key not in ("ok", "examples"))
+        print(f"{status} {name}: {details}")
+    print(f"\nCarga: {timings['load']:.1f} ms | comprobaciones: {timings['checks']:.1f} ms")
+    print(f"Reporte guardado en: {args.report}")
+    if not report["ok"]:
+        print(f"\n❌ Fallan: {', '.join(report['failed'])}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
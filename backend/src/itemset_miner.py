@@ -0,0 +1,188 @@
+import math
+import numpy as np
+from array import array
+from itertools import combinations
+
+from artifact_store import write_artifact, open_artifact, encode_strings, decode_strings
+
+# Versión del formato de los conteos de itemsets (frequent_itemsets.bin)
+ITEMSETS_FORMAT_VERSION = 1
+
+# === CONFIGURACIÓN ===
+WORD_BITS = 64
+
+if hasattr(np, "bitwise_count"):
+    def popcount(words):
+        """Número de bits a 1 de cada fila de `words` (uint64)."""
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+else:
+    _BYTE_COUNTS = np.asarray([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Número de bits a 1 de cada fila de `words` (uint64)."""
+        as_bytes = np.ascontiguousarray(words).view(np.uint8)
+        return _BYTE_COUNTS[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+def min_support_count(min_support, num_transactions):
+    """
+    Menor número de documentos c con c / n >= min_support, con la misma comparación en coma
+    flotante que usa mlxtend (así el umbral coincide exactamente).
+    """
+    count = max(1, math.ceil(min_support * num_transactions))
+    while count > 1 and (count - 1) / float(num_transactions) >= min_support:
+        count -= 1
+    while count / float(num_transactions) < min_support:
+        count += 1
+    return count
+
+
+# === BITSETS ===
+def build_bitsets(transactions, num_items):
+    """
+    Representación vertical de las transacciones: para cada ítem, el conjunto de documentos que
+    lo contienen como array de bits empaquetado en palabras uint64 (fila i = ítem i).
+    `transactions` es un iterable de secuencias de ids de ítem; se recorre una sola vez.
+    Devuelve (bitsets, número de transacciones).
+    """
+    item_ids, doc_ids = array("i"), array("q")
+    num_transactions = 0
+    for doc, items in enumerate(transactions):
+        items = np.unique(np.asarray(items, dtype=np.int32))
+        item_ids.extend(items.tolist())
+        doc_ids.extend([doc] * len(items))
+        num_transactions = doc + 1
+
+    num_words = max(1, (num_transactions + WORD_BITS - 1) // WORD_BITS)
+    bitsets = np.zeros((num_items, num_words), dtype=np.uint64)
+    items = np.frombuffer(item_ids, dtype=np.int32)
+    docs = np.frombuffer(doc_ids, dtype=np.int64)
+    np.bitwise_or.at(
+        bitsets.reshape(-1),
+        items.astype(np.int64) * num_words + docs // WORD_BITS,
+        np.left_shift(np.uint64(1), (docs % WORD_BITS).astype(np.uint64)),
+    )
+    return bitsets, num_transactions
+
+
+# === ECLAT ===
+def eclat(bitsets, min_count, max_len=None):
+    """
+    Genera (itemset, soporte en documentos) para todos los itemsets frecuentes con búsqueda en
+    profundidad sobre la representación vertical: el soporte de un itemset es el popcount del AND
+    de los bitsets de sus ítems. Los itemsets son tuplas de ids ordenadas de menor a mayor.
+    """
+    counts = popcount(bitsets)
+    frequent = np.flatnonzero(counts >= min_count)
+    # Extender primero con los ítems menos frecuentes reduce el tamaño de las intersecciones
+    frequent = frequent[np.argsort(counts[frequent], kind="stable")]
+    yield from _extend((), frequent, bitsets[frequent], counts[frequent], min_count, max_len)
+
+
+def _extend(prefix, items, bits, counts, min_count, max_len):
+    for i, item in enumerate(items):
+        itemset = tuple(sorted(prefix + (int(item),)))
+        yield itemset, int(counts[i])
+        if (max_len is not None and len(itemset) >= max_len) or i + 1 == len(items):
+            continue
+        # Intersección con todos los ítems siguientes a la vez (AND por filas + popcount)
+        joined = bits[i + 1:] & bits[i]
+        joined_counts = popcount(joined)
+        keep = joined_counts >= min_count
+        if keep.any():
+            yield from _extend(itemset, items[i + 1:][keep], joined[keep], joined_counts[keep], min_count, max_len)
+
+
+def frequent_itemset_counts(bitsets, num_transactions, min_support, max_len=None):
+    """Diccionario {itemset (tupla ordenada de ids): nº de documentos} de los itemsets frecuentes."""
+    return dict(eclat(bitsets, min_support_count(min_support, num_transactions), max_len))
+
+
+def supports_from_counts(itemset_counts, num_transactions, min_support=None):
+    """Pasa de conteos a soporte relativo; con `min_support`, descarta los que ya no son frecuentes."""
+    supports = {itemset: count / float(num_transactions) for itemset, count in itemset_counts.items()}
+    if min_support is not None:
+        supports = {itemset: support for itemset, support in supports.items() if support >= min_support}
+    return supports
+
+
+def frequent_itemsets(bitsets, num_transactions, min_support, max_len=None):
+    """Diccionario {itemset (tupla ordenada de ids): soporte relativo} de los itemsets frecuentes."""
+    return supports_from_counts(frequent_itemset_counts(bitsets, num_transactions, min_support, max_len), num_transactions)
+
+
+def count_itemsets(itemsets, bitsets):
+    """
+    Cuenta en cuántas transacciones de `bitsets` aparece cada itemset (lista de tuplas de ids).
+    Los itemsets se agrupan por longitud y se cuentan todos a la vez: AND de las filas de sus
+    ítems y popcount.
+    """
+    counts = np.zeros(len(itemsets), dtype=np.int64)
+    by_length = {}
+    for position, itemset in enumerate(itemsets):
+        by_length.setdefault(len(itemset), []).append(position)
+    for length, positions in by_length.items():
+        items = np.asarray([itemsets[p] for p in positions], dtype=np.int64).reshape(len(positions), length)
+        joined = np.bitwise_and.reduce(bitsets[items], axis=1)
+        counts[positions] = popcount(joined)
+    return counts
+
+
+# === PERSISTENCIA DE CONTEOS ===
+def save_itemset_counts(path, terms, itemset_counts, item_counts, num_transactions, meta=None):
+    """
+    Guarda los conteos de los itemsets frecuentes (CSR de ids sobre `terms`) y el conteo de cada
+    término, para poder actualizarlos con transacciones nuevas sin volver a minar.
+    """
+    itemsets = list(itemset_counts)
+    ptr = np.zeros(len(itemsets) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(itemset) for itemset in itemsets])
+    term_offsets, term_blob = encode_strings(terms)
+    meta = dict(meta or {})
+    meta.update({"format": "itemset_counts", "version": ITEMSETS_FORMAT_VERSION, "num_transactions": int(num_transactions)})
+    write_artifact(path, {
+        "itemset_ptr": ptr,
+        "itemset_items": np.fromiter((i for itemset in itemsets for i in itemset), dtype=np.int32, count=int(ptr[-1])),
+        "itemset_counts": np.asarray([itemset_counts[itemset] for itemset in itemsets], dtype=np.int64),
+        "item_counts": np.asarray(item_counts, dtype=np.int64),
+        "term_offsets": term_offsets,
+        "term_blob": term_blob,
+    }, meta)
+
+
+def load_itemset_counts(path):
+    """Devuelve (terms, {itemset: conteo}, conteos por término, meta)."""
+    arrays, meta = open_artifact(path)
+    if meta.get("format") != "itemset_counts" or meta.get("version") != ITEMSETS_FORMAT_VERSION:
+        raise ValueError(f"{path} no contiene conteos de itemsets compatibles (versión {ITEMSETS_FORMAT_VERSION}).")
+    ptr, items, counts = arrays["itemset_ptr"], arrays["itemset_items"], arrays["itemset_counts"]
+    itemset_counts = {
+        tuple(int(i) for i in items[ptr[k]:ptr[k + 1]]): int(counts[k]) for k in range(len(counts))
+    }
+    terms = decode_strings(arrays["term_offsets"], arrays["term_blob"])
+    return terms, itemset_counts, np.array(arrays["item_counts"]), meta
+
+
+# === REGLAS ===
+def generate_rules(itemsets, min_confidence):
+    """
+    Genera las reglas A -> C con confianza >= min_confidence a partir de los itemsets frecuentes,
+    igual que mlxtend.association_rules(metric="confidence"): para cada itemset de 2 o más ítems,
+    todas las particiones en antecedente y consecuente no vacíos.
+    Produce (antecedente, consecuente, soporte, confianza, lift) una regla a la vez.
+    """
+    for itemset, support in itemsets.items():
+        for size in range(len(itemset) - 1, 0, -1):
+            for antecedent in combinations(itemset, size):
+                confidence = support / itemsets[antecedent]
+                if confidence < min_confidence:
+                    continue
+                consequent = tuple(item for item in itemset if item not in antecedent)
+                yield antecedent, consequent, support, confidence, confidence / itemsets[consequent]
+
+
+def mine_rules(transactions, num_items, min_support, min_confidence, max_len=None):
+    """Atajo: bitsets + Eclat + reglas. Devuelve (generador de reglas, nº de itemsets frecuentes)."""
+    bitsets, num_transactions = build_bitsets(transactions, num_items)
+    itemsets = frequent_itemsets(bitsets, num_transactions, min_support, max_len)
+    return generate_rules(itemsets, min_confidence), len(itemsets)
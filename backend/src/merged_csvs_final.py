@@ -1,6 +1,9 @@
 import pandas as pd
 import os
 
+from near_duplicates import NearDuplicateIndex
+from preprocess_abstracts import preprocess_texts
+
 # Rutas a tus CSV
 CLEANED_CSV = "../../data/cleaned_articles.csv"
 GENERATED_CSV = "../../data/generated_abstracts.csv"
@@ -37,10 +40,28 @@ with open(LOG_FILE, "w", encoding="utf-8") as f:
 # Eliminar duplicados (manteniendo la primera aparición)
 df_final = df_all.drop_duplicates(subset=["title"], keep="first")
 
+# Detectar casi duplicados (títulos o abstracts con pequeños cambios) con MinHash + LSH.
+# No se eliminan: quedan en el log para revisarlos. Se comparan los abstracts limpios
+# (preprocess_abstracts.py), igual que el índice de near_duplicates.py y append_articles.py
+near_index = NearDuplicateIndex()
+clean_abstracts = preprocess_texts(df_final["abstract"].tolist())
+near_pairs, _ = near_index.insert(df_final.index.tolist(), df_final["title"].tolist(), clean_abstracts)
+with open(LOG_FILE, "a", encoding="utf-8") as f:
+    f.write(f"\n=== Casi duplicados detectados (Jaccard >= {near_index.threshold}, título y abstract limpio) ===\n")
+    if near_pairs:
+        for idx, duplicate_of, similarity in near_pairs:
+            f.write(f"\nJaccard {similarity:.2f}:\n")
+            for row_idx in (duplicate_of, idx):
+                row = df_final.loc[row_idx]
+                f.write(f"  Fuente: {row['source']}, Título: {row['title']}\n")
+    else:
+        f.write("No se detectaron casi duplicados.\n")
+
 # Guardar CSV final
 os.makedirs(os.path.dirname(FINAL_CSV), exist_ok=True)
 df_final.to_csv(FINAL_CSV, index=False)
 
 print(f"CSV final guardado en: {FINAL_CSV}")
 print(f"Se generó log de duplicados en: {LOG_FILE}")
+print(f"Pares de casi duplicados para revisar: {len(near_pairs)}")
 print(f"Total artículos finales: {len(df_final)}")
@@ -0,0 +1,137 @@
+import time
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import adjusted_rand_score
+
+from cluster_model import CentroidModel
+
+# === CONFIGURACIÓN ===
+DOCUMENT_BATCH = 2048   # Documentos leídos del CSV por lote
+EPOCHS = 5              # Pasadas sobre el corpus durante el entrenamiento
+RANDOM_STATE = 42
+TEXT_COLUMN = "clean_abstract"
+
+
+def iter_document_batches(data_path, batch_size=DOCUMENT_BATCH, columns=(TEXT_COLUMN,)):
+    """Lee el CSV por lotes de `batch_size` filas (solo las columnas pedidas) sin cargarlo entero."""
+    for chunk in pd.read_csv(data_path, usecols=list(columns), chunksize=batch_size):
+        if TEXT_COLUMN in chunk:
+            chunk[TEXT_COLUMN] = chunk[TEXT_COLUMN].fillna("")
+        yield chunk
+
+
+def iter_texts(data_path, batch_size=DOCUMENT_BATCH):
+    for chunk in iter_document_batches(data_path, batch_size):
+        yield from chunk[TEXT_COLUMN]
+
+
+def fit_vectorizer_streaming(vectorizer, data_path, batch_size=DOCUMENT_BATCH):
+    """Ajusta el vectorizador recorriendo los textos del CSV sin tenerlos todos en memoria."""
+    return vectorizer.fit(iter_texts(data_path, batch_size))
+
+
+def new_minibatch_model(num_clusters, batch_size=DOCUMENT_BATCH):
+    return MiniBatchKMeans(n_clusters=num_clusters, batch_size=batch_size, random_state=RANDOM_STATE, n_init=3)
+
+
+def fit_minibatch(vectorizer, data_path, num_clusters, batch_size=DOCUMENT_BATCH, epochs=EPOCHS):
+    """
+    Entrena MiniBatchKMeans con `partial_fit` sobre lotes TF-IDF leídos del disco. En memoria solo
+    hay un lote a la vez; los centroides se inicializan con el primer lote, así que éste debe tener
+    al menos `num_clusters` documentos.
+    """
+    model = new_minibatch_model(num_clusters, batch_size)
+    for _ in range(epochs):
+        for chunk in iter_document_batches(data_path, batch_size):
+            model.partial_fit(vectorizer.transform(chunk[TEXT_COLUMN]))
+    return model
+
+
+def predict_streaming(model, vectorizer, data_path, batch_size=DOCUMENT_BATCH):
+    """Devuelve (links, etiquetas) asignando cada lote del CSV al centroide más cercano."""
+    links, labels = [], []
+    for chunk in iter_document_batches(data_path, batch_size, columns=("link", TEXT_COLUMN)):
+        links.append(chunk["link"].to_numpy())
+        labels.append(model.predict(vectorizer.transform(chunk[TEXT_COLUMN])))
+    return np.concatenate(links), np.concatenate(labels)
+
+
+def minibatch_model_from_centroids(centroids, counts, batch_size=DOCUMENT_BATCH):
+    """
+    MiniBatchKMeans que arranca en `centroids` con el número real de artículos de cada uno: el
+    primer partial_fit con los propios centroides ponderados por `counts` no los mueve y deja esos
+    conteos en el estimador, así que un partial_fit posterior pesa los artículos nuevos igual que
+    update_centroids en lugar de tratar cada centroide como si tuviera un solo artículo.
+    """
+    centroids = np.asarray(centroids, dtype=np.float64)
+    model = MiniBatchKMeans(n_clusters=len(centroids), init=centroids, n_init=1, batch_size=batch_size,
+                            random_state=RANDOM_STATE)
+    return model.partial_fit(centroids, sample_weight=np.asarray(counts, dtype=np.float64))
+
+
+def update_centroids(centroids, counts, matrix, labels=None):
+    """
+    Actualización incremental explícita: cada fila de `matrix` va al centroide más cercano (o al
+    de `labels` si ya está asignada) y cada centroide pasa a ser la media de los `counts`
+    artículos que ya agrupaba y de los nuevos, así que pesa tanto como su tamaño y unos pocos
+    artículos no lo mueven como si fuera el primero.
+    Devuelve (centroides, conteos, etiquetas de las filas nuevas).
+    """
+    centroids = np.asarray(centroids, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    if labels is None:
+        labels = CentroidModel(centroids).assign(matrix)
+    labels = np.asarray(labels)
+    new_counts = counts + np.bincount(labels, minlength=len(centroids))
+    sums = centroids * counts[:, None]
+    for cluster in np.unique(labels):
+        sums[cluster] += np.asarray(matrix[labels == cluster].sum(axis=0)).ravel()
+    updated = np.where(new_counts[:, None] > 0, sums / np.maximum(new_counts, 1)[:, None], centroids)
+    return updated, new_counts, labels
+
+
+def update_hierarchy_top(hierarchy, centroids, counts, matrix, labels):
+    """
+    Sustituye el nivel principal de la jerarquía por los centroides actualizados y recalcula su
+    distancia media de referencia sin el corpus: el error de los artículos previos crece en
+    n·||c - c'||² por centroide desplazado (teorema de Steiner) y se suman los de los nuevos.
+    Los sub-clusters no cambian: reagruparlos requiere volver a ejecutar consolidate_clusters.
+    """
+    old_model = hierarchy.top_model
+    old_counts = counts - np.bincount(labels, minlength=len(centroids))
+    shift = np.einsum("ij,ij->i", centroids - old_model.centroids, centroids - old_model.centroids)
+    new_model = CentroidModel(np.asarray(centroids, dtype=np.float32))
+    previous = hierarchy.meta.get("num_articles", int(old_counts.sum()))
+    total_error = hierarchy.meta.get("mean_squared_distance", 0.0) * previous + float(old_counts @ shift)
+    total_error += new_model.mean_squared_distance(matrix, labels) * matrix.shape[0]
+    hierarchy.top_model = new_model
+    hierarchy.meta.update({
+        "mean_squared_distance": total_error / (previous + matrix.shape[0]),
+        "num_articles": int(previous + matrix.shape[0]),
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    return hierarchy
+
+
+def compare_with_full_batch(model, vectorizer, data_path, num_clusters):
+    """
+    Ajusta el KMeans completo (el del entrenamiento normal) y compara sus asignaciones con las del
+    modelo por lotes: ARI y cociente de inercias (>= 1; cuanto más cerca de 1, mejor).
+    """
+    texts = pd.read_csv(data_path, usecols=[TEXT_COLUMN])[TEXT_COLUMN].fillna("")
+    matrix = vectorizer.transform(texts)
+
+    start = time.perf_counter()
+    full_model = KMeans(n_clusters=num_clusters, random_state=RANDOM_STATE, n_init=10).fit(matrix)
+    full_seconds = time.perf_counter() - start
+
+    minibatch_inertia = -model.score(matrix)
+    return {
+        "ari": float(adjusted_rand_score(full_model.labels_, model.predict(matrix))),
+        "inertia_ratio": float(minibatch_inertia / full_model.inertia_),
+        "minibatch_inertia": float(minibatch_inertia),
+        "full_inertia": float(full_model.inertia_),
+        "full_seconds": full_seconds,
+    }
+
@@ -1,20 +1,43 @@
 import pandas as pd
+import numpy as np
 import os
 import pickle
+import argparse
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
-from mlxtend.preprocessing import TransactionEncoder
-from mlxtend.frequent_patterns import fpgrowth, association_rules
+
+from rules_index import RuleColumns, save_rule_columns
+from itemset_miner import (
+    build_bitsets, frequent_itemset_counts, supports_from_counts, generate_rules, popcount, save_itemset_counts,
+)
+from cluster_model import save_centroids, CENTROIDS_PATH
+from minibatch_clustering import (
+    DOCUMENT_BATCH, EPOCHS, fit_vectorizer_streaming, fit_minibatch, predict_streaming, compare_with_full_batch,
+)
 
 # === RUTAS ===
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "../../data/final_dataset.csv")
 MODEL_DIR = os.path.join(BASE_DIR, "../models")
 CLUSTER_ASSIGNMENTS_PATH = os.path.join(BASE_DIR, "../../data/cluster_assignments.csv") # Nueva ruta
+ITEMSETS_PATH = os.path.join(MODEL_DIR, "frequent_itemsets.bin")
 
 # Asegurarse de que el directorio de modelos exista
 os.makedirs(MODEL_DIR, exist_ok=True)
 
+# === OPCIONES ===
+parser = argparse.ArgumentParser(description="Entrena el vectorizador TF-IDF, el clustering y las reglas de asociación.")
+parser.add_argument("--minibatch", action="store_true",
+                    help="Clustering con MiniBatchKMeans leyendo los documentos del disco por lotes.")
+parser.add_argument("--batch-size", type=int, default=DOCUMENT_BATCH, help="Documentos por lote (modo --minibatch).")
+parser.add_argument("--epochs", type=int, default=EPOCHS, help="Pasadas sobre el corpus (modo --minibatch).")
+parser.add_argument("--compare", action="store_true",
+                    help="Comparar el modelo por lotes con el KMeans completo (ARI y cociente de inercias).")
+parser.add_argument("--min-support", type=float, default=0.04, help="Soporte mínimo de los itemsets frecuentes.")
+parser.add_argument("--max-len", type=int, default=None,
+                    help="Longitud máxima de los itemsets (recomendable con soportes bajos como 0.01).")
+args = parser.parse_args()
+
 # === CARGAR DATA ===
 print("Cargando dataset preprocesado...")
 df = pd.read_csv(DATA_PATH)
@@ -26,7 +49,11 @@ if "clean_abstract" not in df.columns:
 # === VECTORIZACIÓN TF-IDF ===
 print("Entrenando TF-IDF Vectorizer...")
 tfidf_vectorizer = TfidfVectorizer(max_features=1000) # Limitar a 1000 características para empezar
-tfidf_matrix = tfidf_vectorizer.fit_transform(df["clean_abstract"])
+if args.minibatch:
+    # La matriz completa no se materializa: cada lote se transforma cuando se necesita
+    fit_vectorizer_streaming(tfidf_vectorizer, DATA_PATH, args.batch_size)
+else:
+    tfidf_matrix = tfidf_vectorizer.fit_transform(df["clean_abstract"])
 
 # Guardar el vectorizador TF-IDF
 tfidf_vectorizer_path = os.path.join(MODEL_DIR, "tfidf_vectorizer.pkl")
@@ -39,8 +66,21 @@ print("Entrenando modelo K-Means...")
 # Puedes ajustar n_clusters. Para empezar, usaremos 10.
 # La elección óptima de K se haría con métodos como el "método del codo" o "coeficiente de silueta".
 num_clusters = 5 
-kmeans_model = KMeans(n_clusters=num_clusters, random_state=42, n_init=10)
-cluster_labels = kmeans_model.fit_predict(tfidf_matrix) # Obtener las etiquetas de cluster
+if args.minibatch:
+    print(f"Modo por lotes: {args.epochs} pasadas con lotes de {args.batch_size} documentos.")
+    kmeans_model = fit_minibatch(tfidf_vectorizer, DATA_PATH, num_clusters, args.batch_size, args.epochs)
+    assigned_links, cluster_labels = predict_streaming(kmeans_model, tfidf_vectorizer, DATA_PATH, args.batch_size)
+    if not (assigned_links == df["link"].to_numpy()).all():
+        raise ValueError("El orden de los artículos leídos por lotes no coincide con el del dataset.")
+
+    if args.compare:
+        comparison = compare_with_full_batch(kmeans_model, tfidf_vectorizer, DATA_PATH, num_clusters)
+        print(f"Comparación con KMeans completo: ARI {comparison['ari']:.4f} | "
+              f"cociente de inercias {comparison['inertia_ratio']:.4f} "
+              f"({comparison['minibatch_inertia']:.2f} vs {comparison['full_inertia']:.2f})")
+else:
+    kmeans_model = KMeans(n_clusters=num_clusters, random_state=42, n_init=10)
+    cluster_labels = kmeans_model.fit_predict(tfidf_matrix) # Obtener las etiquetas de cluster
 
 # Guardar el modelo K-Means
 kmeans_model_path = os.path.join(MODEL_DIR, "kmeans_model.pkl")
@@ -48,6 +88,12 @@ with open(kmeans_model_path, "wb") as f:
     pickle.dump(kmeans_model, f)
 print(f"Modelo K-Means guardado en: {kmeans_model_path}")
 
+# Centroides en formato binario: asignar un documento nuevo cuesta lo mismo sin importar el tamaño del corpus
+# junto con los artículos de cada centroide, que usa la actualización incremental (append_articles.py)
+save_centroids(CENTROIDS_PATH, kmeans_model.cluster_centers_, {"model": type(kmeans_model).__name__},
+               counts=np.bincount(cluster_labels, minlength=num_clusters))
+print(f"Centroides guardados en: {CENTROIDS_PATH}")
+
 # === GUARDAR ASIGNACIONES DE CLUSTER EN ARCHIVO SEPARADO ===
 print("Guardando asignaciones de cluster en archivo separado...")
 # Crear un DataFrame con los identificadores de artículo y sus clusters
@@ -64,47 +110,53 @@ print(cluster_assignments_df.head())
 print("\nIniciando análisis de asociación con Apriori...")
 
 # 1. Preparar los datos: Usaremos solo las 1000 palabras clave más importantes del TF-IDF para evitar errores de memoria.
-top_tfidf_features = set(tfidf_vectorizer.get_feature_names_out())
+top_tfidf_features = list(tfidf_vectorizer.get_feature_names_out())
+feature_ids = {term: i for i, term in enumerate(top_tfidf_features)}
 print(f"Limitando el análisis de Apriori a las {len(top_tfidf_features)} características más importantes del TF-IDF.")
 
-# Filtrar las transacciones para que solo contengan estas palabras clave
-transactions = df['clean_abstract'].apply(
-    lambda abstract: [word for word in abstract.split() if word in top_tfidf_features]
-).tolist()
+# Filtrar las transacciones para que solo contengan estas palabras clave (ids de término, de una en una)
+transactions = (
+    [feature_ids[word] for word in abstract.split() if word in feature_ids] for abstract in df['clean_abstract']
+)
 
-# 2. One-Hot Encode las transacciones filtradas
-te = TransactionEncoder()
-te_ary = te.fit(transactions).transform(transactions)
-df_onehot = pd.DataFrame(te_ary, columns=te.columns_)
-print(f"Datos codificados para Apriori con {df_onehot.shape[1]} ítems únicos (filtrados por TF-IDF).")
+# 2. Representación vertical: por cada término, los documentos que lo contienen como bits empaquetados
+# en palabras uint64 (en lugar de un DataFrame one-hot documentos x términos)
+bitsets, num_transactions = build_bitsets(transactions, len(top_tfidf_features))
+print(f"Datos codificados para Apriori: {num_transactions} documentos x {len(top_tfidf_features)} ítems "
+      f"({bitsets.nbytes / 1024:.0f} KB).")
 
-# 3. Ejecutar Apriori para encontrar conjuntos de ítems frecuentes
+# 3. Encontrar conjuntos de ítems frecuentes (Eclat: soporte = popcount del AND de los bitsets)
 # min_support=0.01 significa que el conjunto de ítems debe aparecer en al menos el 1% de los documentos (~6 artículos).
-# Este es un hiperparámetro clave. Un valor más bajo puede ser computacionalmente muy costoso.
-frequent_itemsets = fpgrowth(df_onehot, min_support=0.04, use_colnames=True)
-print(f"Apriori encontró {len(frequent_itemsets)} conjuntos de ítems frecuentes.")
+# Con soportes bajos conviene limitar la longitud de los itemsets (--max-len): su número crece combinatoriamente.
+itemset_counts = frequent_itemset_counts(bitsets, num_transactions, args.min_support, args.max_len)
+frequent_itemsets_by_id = supports_from_counts(itemset_counts, num_transactions)
+print(f"Apriori encontró {len(frequent_itemsets_by_id)} conjuntos de ítems frecuentes.")
+
+# Conteos guardados para que append_articles.py los actualice con artículos nuevos sin volver a minar
+save_itemset_counts(ITEMSETS_PATH, top_tfidf_features, itemset_counts, popcount(bitsets), num_transactions, {
+    "min_support": args.min_support, "max_len": args.max_len, "min_confidence": 0.5,
+    "built_transactions": num_transactions,
+})
+del itemset_counts
 
 # 4. Generar reglas de asociación
 # min_threshold=0.5 significa que estamos buscando reglas donde tengamos al menos un 50% de confianza.
-rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=0.5)
-print(f"Se generaron {len(rules)} reglas de asociación.")
-
-# 5. Formatear y guardar las reglas
-if not rules.empty:
-    # Convertir los frozensets a listas para que sean serializables en JSON
-    rules['antecedents'] = rules['antecedents'].apply(lambda a: list(a))
-    rules['consequents'] = rules['consequents'].apply(lambda a: list(a))
-    
-    # Seleccionar y renombrar columnas para mayor claridad
-    rules_to_save = rules[['antecedents', 'consequents', 'support', 'confidence', 'lift']]
-    
-    apriori_rules_path = os.path.join(MODEL_DIR, "apriori_rules.json")
-    
-    with open(apriori_rules_path, 'w', encoding='utf-8') as f:
-        rules_to_save.to_json(f, orient='records', indent=4)
-        
-    print(f"Reglas de Apriori guardadas en: {apriori_rules_path}")
-else:
+# Las reglas se acumulan en columnas compactas a medida que se generan.
+rule_columns = RuleColumns(top_tfidf_features)
+for antecedent, consequent, support, confidence, lift in generate_rules(frequent_itemsets_by_id, min_confidence=0.5):
+    rule_columns.append(antecedent, consequent, support, confidence, lift)
+del frequent_itemsets_by_id
+print(f"Se generaron {len(rule_columns)} reglas de asociación.")
+
+# 5. Guardar las reglas
+# También sin reglas: un almacén vacío se carga bien y la API no sigue sirviendo las de un entrenamiento anterior
+apriori_rules_path = os.path.join(MODEL_DIR, "apriori_rules.json")
+# Almacén binario columnar que carga la API (mmap, sin parseo de JSON) y el JSON, ambos en orden de ranking
+apriori_rules_bin_path = os.path.join(MODEL_DIR, "apriori_rules.bin")
+save_rule_columns(apriori_rules_bin_path, rule_columns, json_path=apriori_rules_path)
+print(f"Reglas de Apriori guardadas en: {apriori_rules_path}")
+print(f"Reglas de Apriori (formato binario) guardadas en: {apriori_rules_bin_path}")
+if not len(rule_columns):
     print("No se encontraron reglas de asociación con los umbrales definidos. Intente bajar 'min_support' o 'min_threshold'.")
 
 # === NOTA: final_dataset.csv NO se modifica con la columna 'cluster' ===
@@ -0,0 +1,310 @@
+import os
+import zlib
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from artifact_store import write_artifact, open_artifact, encode_strings, decode_strings
+
+NEAR_DUPLICATES_FORMAT_VERSION = 1
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "../../data")
+MODEL_DIR = os.path.join(BASE_DIR, "../models")
+DATASET_PATH = os.path.join(DATA_DIR, "final_dataset.csv")
+REPORT_PATH = os.path.join(DATA_DIR, "near_duplicates.csv")
+INDEX_PATH = os.path.join(MODEL_DIR, "near_duplicates.bin")
+
+# === CONFIGURACIÓN ===
+THRESHOLD = 0.8        # Jaccard estimada mínima para considerar dos artículos casi duplicados
+# Peso de los falsos positivos frente a los falsos negativos al elegir las bandas LSH. Cada
+# candidato se vuelve a comprobar con la firma completa, así que un falso positivo solo cuesta
+# una comparación y un falso negativo deja pasar un duplicado: se prioriza la exhaustividad
+# (16 bandas x 8 filas: un par con Jaccard 0.8 comparte banda el 95% de las veces, con 0.85 el 99%)
+FALSE_POSITIVE_WEIGHT = 0.05
+NUM_PERM = 128         # Funciones hash por firma MinHash
+SHINGLE_SIZE = 3       # Palabras por shingle
+SEED = 1
+# Máximo de shingles por bloque al calcular firmas (la matriz temporal es NUM_PERM x bloque)
+BLOCK_SHINGLES = 1 << 15
+SIGNATURE_CHUNK = 5000  # Artículos por tarea al calcular firmas en paralelo
+
+# Todo lo que no es letra o dígito ASCII separa palabras (más rápido que una expresión regular)
+SEPARATORS = str.maketrans({chr(c): " " for c in range(128) if not chr(c).isalnum()})
+EMPTY_SIGNATURE = np.iinfo(np.uint32).max
+# Los shingles del título se separan de los del abstract para que no coincidan entre sí
+TITLE_SALT = np.uint64(0x9E3779B97F4A7C15)
+
+
+# === SHINGLES ===
+class Shingler:
+    """
+    Convierte textos en shingles (k palabras seguidas) codificados como uint32. Las palabras de
+    todo el lote se numeran de una vez (crc32, estable entre ejecuciones) y los hashes de los
+    shingles se combinan con operaciones vectorizadas sobre el lote completo.
+    """
+
+    def __init__(self, shingle_size=SHINGLE_SIZE, seed=SEED):
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.mix = rng.integers(1, 2 ** 63, size=shingle_size, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    def batch(self, titles, abstracts):
+        """
+        Shingles del título y del abstract de cada artículo, concatenados: devuelve (valores,
+        offsets) con los del artículo i en valores[offsets[i]:offsets[i + 1]]. Un texto más corto
+        que un shingle aporta un único shingle con todas sus palabras.
+        """
+        tokens, lengths, salts = [], [], []
+        for title, abstract in zip(titles, abstracts):
+            for text, salt in ((title, TITLE_SALT), (abstract, np.uint64(0))):
+                words = text.lower().translate(SEPARATORS).split() if isinstance(text, str) else []
+                tokens.extend(words)
+                lengths.append(len(words))
+                salts.append(salt)
+        num_docs = len(lengths) // 2
+        if not tokens:
+            return np.empty(0, dtype=np.uint32), np.zeros(num_docs + 1, dtype=np.int64)
+
+        codes, vocabulary = pd.factorize(pd.Series(tokens, dtype=object))
+        vocabulary_hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in vocabulary),
+                                        dtype=np.uint64, count=len(vocabulary))
+        k = self.shingle_size
+        ids = np.concatenate([vocabulary_hashes[codes], np.zeros(k, dtype=np.uint64)])
+
+        lengths = np.asarray(lengths, dtype=np.int64)
+        segment = np.repeat(np.arange(len(lengths)), lengths)
+        ends = np.cumsum(lengths)
+        position = np.arange(len(tokens))
+        segment_end = ends[segment]
+        segment_start = segment_end - lengths[segment]
+
+        # Palabras fuera del texto (final del segmento) no cuentan: shingles truncados para textos cortos
+        combined = np.asarray(salts, dtype=np.uint64)[segment]
+        for j in range(k):
+            combined += np.where(position + j < segment_end, ids[j:j + len(position)], np.uint64(0)) * self.mix[j]
+        valid = (position + k <= segment_end) | ((position == segment_start) & (lengths[segment] < k))
+
+        values = (combined[valid] >> np.uint64(32)).astype(np.uint32)
+        counts = np.bincount(segment[valid] // 2, minlength=num_docs)
+        offsets = np.zeros(num_docs + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return values, offsets
+
+
+# === MINHASH ===
+def minhash_signatures(values, offsets, num_perm=NUM_PERM, seed=SEED, block_shingles=BLOCK_SHINGLES):
+    """
+    Firmas MinHash (num_docs x num_perm, uint32) con hashing multiply-shift:
+    h_i(x) = (a_i * x + b_i) mod 2^64 >> 32. Se procesan bloques de artículos consecutivos; el
+    mínimo de cada artículo sale de un único `np.minimum.reduceat` por bloque, y el desplazamiento
+    se aplica después del mínimo (es monótono). Los artículos sin shingles quedan con la firma
+    vacía (todo EMPTY_SIGNATURE).
+    """
+    rng = np.random.default_rng(seed + 1)
+    a = (rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1))[:, None]
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)[:, None]
+
+    num_docs = len(offsets) - 1
+    signatures = np.full((num_docs, num_perm), EMPTY_SIGNATURE, dtype=np.uint32)
+    docs = np.flatnonzero(np.diff(offsets))
+    doc_ends = offsets[docs + 1]
+    buffer = np.empty((num_perm, block_shingles), dtype=np.uint64)
+    start = 0
+    while start < len(docs):
+        # Artículos consecutivos hasta llenar el bloque (al menos uno, aunque sea más grande)
+        first = offsets[docs[start]]
+        stop = max(start + 1, int(np.searchsorted(doc_ends, first + block_shingles, side="right")))
+        block = docs[start:stop]
+        last = offsets[block[-1] + 1]
+        x = values[first:last].astype(np.uint64)
+        hashed = buffer[:, :len(x)] if len(x) <= block_shingles else np.empty((num_perm, len(x)), dtype=np.uint64)
+        np.multiply(a, x, out=hashed)
+        np.add(hashed, b, out=hashed)
+        minima = np.minimum.reduceat(hashed, offsets[block] - first, axis=1)
+        signatures[block] = (minima >> np.uint64(32)).astype(np.uint32).T
+        start = stop
+    return signatures
+
+
+def _signature_chunk(args):
+    """Firmas de un bloque de artículos (unidad de trabajo de cada proceso)."""
+    titles, abstracts, shingle_size, num_perm, seed = args
+    values, offsets = Shingler(shingle_size, seed).batch(titles, abstracts)
+    return minhash_signatures(values, offsets, num_perm, seed)
+
+
+def lsh_params(threshold, num_perm=NUM_PERM, false_positive_weight=FALSE_POSITIVE_WEIGHT):
+    """
+    (bandas, filas por banda) que minimizan la suma ponderada de falsos positivos y falsos
+    negativos para el umbral de Jaccard: un par comparte alguna banda con probabilidad
+    1 - (1 - s^filas)^bandas.
+    """
+    s = np.linspace(0, 1, 1001)
+    step = s[1] - s[0]
+    below = s < threshold
+    best, best_error = (1, num_perm), np.inf
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        probability = 1 - (1 - s ** rows) ** bands
+        false_positive = probability[below].sum() * step
+        false_negative = (1 - probability[~below]).sum() * step
+        error = false_positive_weight * false_positive + (1 - false_positive_weight) * false_negative
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+# === ÍNDICE ===
+class NearDuplicateIndex:
+    """
+    Índice LSH (bandas de firmas MinHash) de artículos casi duplicados. Cada artículo nuevo se
+    compara solo con los que comparten alguna banda, así que comprobar un lote cuesta lo mismo
+    sea cual sea el tamaño del corpus. Las firmas se guardan en disco; las bandas se rehacen al
+    cargar, de modo que el umbral se puede cambiar sin recalcular nada.
+    """
+
+    def __init__(self, threshold=THRESHOLD, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=SEED):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.seed = seed
+        self.shingler = Shingler(shingle_size, seed)
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.band_mix = np.random.default_rng(seed + 2).integers(
+            1, 2 ** 63, size=self.rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.keys = []
+        self.signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def signatures_for(self, titles, abstracts, workers=1):
+        """Firmas MinHash de un lote; con `workers` distinto de 1, por bloques en un pool de procesos."""
+        titles, abstracts = list(titles), list(abstracts)
+        if workers == 1 or len(titles) <= SIGNATURE_CHUNK:
+            values, offsets = self.shingler.batch(titles, abstracts)
+            return minhash_signatures(values, offsets, self.num_perm, self.seed)
+        tasks = [(titles[i:i + SIGNATURE_CHUNK], abstracts[i:i + SIGNATURE_CHUNK],
+                  self.shingler.shingle_size, self.num_perm, self.seed)
+                 for i in range(0, len(titles), SIGNATURE_CHUNK)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return np.concatenate(list(pool.map(_signature_chunk, tasks)))
+
+    def band_keys(self, signatures):
+        """Hash de cada banda de cada firma (num_docs x bandas, uint64)."""
+        used = signatures[:, :self.bands * self.rows].astype(np.uint64).reshape(len(signatures), self.bands, self.rows)
+        return (used * self.band_mix).sum(axis=2)
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed > len(self.signatures):
+            grown = np.empty((max(needed, 2 * len(self.signatures)), self.num_perm), dtype=np.uint32)
+            grown[:self._size] = self.signatures[:self._size]
+            self.signatures = grown
+
+    def _add(self, doc, band_keys):
+        for bucket, key in zip(self.buckets, band_keys.tolist()):
+            bucket.setdefault(key, []).append(doc)
+
+    def insert(self, keys, titles, abstracts, skip_duplicates=False, workers=1):
+        """
+        Compara cada artículo con el índice (y con los anteriores del mismo lote) y lo añade.
+        Con `skip_duplicates`, los casi duplicados no se añaden (se conserva la primera aparición).
+        Devuelve una lista de (clave, clave del casi duplicado, Jaccard estimada) y la máscara de
+        artículos añadidos.
+        """
+        signatures = self.signatures_for(titles, abstracts, workers)
+        band_keys = self.band_keys(signatures)
+        empty = signatures[:, 0] == EMPTY_SIGNATURE
+        self._reserve(len(signatures))
+
+        pairs = []
+        added = np.zeros(len(signatures), dtype=bool)
+        for i, key in enumerate(keys):
+            if empty[i]:
+                continue  # sin texto no hay con qué comparar; tampoco se indexa
+            candidates = set()
+            for bucket, band_key in zip(self.buckets, band_keys[i].tolist()):
+                candidates.update(bucket.get(band_key, ()))
+            duplicate = False
+            if candidates:
+                candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+                similarity = (self.signatures[candidates] == signatures[i]).mean(axis=1)
+                matched = similarity >= self.threshold
+                for j in np.argsort(-similarity[matched], kind="stable"):
+                    pairs.append((key, self.keys[candidates[matched][j]], round(float(similarity[matched][j]), 4)))
+                duplicate = bool(matched.any())
+            if duplicate and skip_duplicates:
+                continue
+            doc = self._size
+            self.signatures[doc] = signatures[i]
+            self.keys.append(key)
+            self._add(doc, band_keys[i])
+            self._size += 1
+            added[i] = True
+        return pairs, added
+
+    def save(self, path=INDEX_PATH):
+        key_offsets, key_blob = encode_strings(self.keys)
+        meta = {
+            "format": "near_duplicates",
+            "version": NEAR_DUPLICATES_FORMAT_VERSION,
+            "num_perm": self.num_perm,
+            "shingle_size": self.shingler.shingle_size,
+            "seed": self.seed,
+            "threshold": self.threshold,
+            "num_articles": self._size,
+        }
+        write_artifact(path, {
+            "signatures": self.signatures[:self._size],
+            "key_offsets": key_offsets,
+            "key_blob": key_blob,
+        }, meta)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH, threshold=None):
+        """Carga las firmas y rehace las bandas (para `threshold`, o el umbral con que se guardó)."""
+        arrays, meta = open_artifact(path)
+        if meta.get("format") != "near_duplicates" or meta.get("version") != NEAR_DUPLICATES_FORMAT_VERSION:
+            raise ValueError(f"{path} no es un índice de casi duplicados compatible.")
+        index = cls(threshold or meta["threshold"], meta["num_perm"], meta["shingle_size"], meta["seed"])
+        index.signatures = np.array(arrays["signatures"])
+        index.keys = decode_strings(arrays["key_offsets"], arrays["key_blob"])
+        index._size = len(index.keys)
+        for doc, band_keys in enumerate(index.band_keys(index.signatures)):
+            index._add(doc, band_keys)
+        return index
+
+
+def near_duplicate_report(pairs):
+    return pd.DataFrame(pairs, columns=["link", "duplicate_of", "similarity"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexa el corpus con MinHash + LSH y lista los artículos casi duplicados.")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Jaccard estimada mínima.")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para calcular las firmas (por defecto, todos los núcleos).")
+    args = parser.parse_args()
+
+    print(f"📄 Cargando dataset desde: {DATASET_PATH}")
+    df = pd.read_csv(DATASET_PATH, dtype=str)
+    index = NearDuplicateIndex(threshold=args.threshold)
+    print(f"Indexando {len(df)} artículos ({index.bands} bandas x {index.rows} filas, umbral {index.threshold})...")
+    start = time.perf_counter()
+    pairs, _ = index.insert(df["link"].tolist(), df["title"].tolist(), df["clean_abstract"].tolist(), workers=args.workers)
+    print(f"Índice construido en {time.perf_counter() - start:.2f} s.")
+
+    report = near_duplicate_report(pairs)
+    report.to_csv(REPORT_PATH, index=False)
+    index.save(INDEX_PATH)
+    print(f"Pares de casi duplicados: {len(report)} (guardados en {REPORT_PATH})")
+    print(f"Índice guardado en: {INDEX_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+import os
+import ast
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.normpath(os.path.join(BASE_DIR, "../.."))
+STATE_PATH = os.path.join(ROOT_DIR, "data/.pipeline_state.json")
+LOG_DIR = os.path.join(ROOT_DIR, "data/pipeline_logs")
+# Carpetas donde se buscan los módulos propios que importa cada script (los de analysis/ añaden backend/src al path)
+MODULE_DIRS = ["backend/src", "analysis"]
+
+# === ETAPAS ===
+# Cada etapa declara el script que la ejecuta y sus archivos de entrada y salida (relativos a la
+# raíz del repositorio). Las dependencias entre etapas se deducen de esos archivos: una etapa
+# depende de las que producen sus entradas. El propio script y los módulos del repositorio que
+# importa (directa o indirectamente, ver local_imports) también cuentan como entradas, así que
+# modificar el código de una etapa o de cualquiera de sus módulos la vuelve a ejecutar.
+STAGES = [
+    {
+        "name": "data_cleaning",
+        "script": "backend/src/data_cleaning.py",
+        "inputs": ["data/SB_publication_PMC.csv"],
+        "outputs": ["data/cleaned_articles.csv", "data/failed_articles.csv"],
+    },
+    {
+        "name": "generate_missing_abstracts",
+        "script": "backend/src/generate_missing_abstracts.py",
+        "inputs": ["data/failed_articles.csv"],
+        "outputs": ["data/generated_abstracts.csv"],
+    },
+    {
+        "name": "merged_csvs_final",
+        "script": "backend/src/merged_csvs_final.py",
+        "inputs": ["data/cleaned_articles.csv", "data/generated_abstracts.csv"],
+        "outputs": ["data/final_merged.csv", "data/merge_log.txt"],
+    },
+    {
+        "name": "preprocess_abstracts",
+        "script": "backend/src/preprocess_abstracts.py",
+        "args": ["--stream"],
+        "inputs": ["data/final_merged.csv"],
+        "outputs": ["data/final_dataset.csv"],
+    },
+    {
+        "name": "near_duplicates",
+        "script": "backend/src/near_duplicates.py",
+        "inputs": ["data/final_dataset.csv"],
+        "outputs": ["backend/models/near_duplicates.bin", "data/near_duplicates.csv"],
+    },
+    {
+        "name": "model_trainer",
+        "script": "backend/src/model_trainer.py",
+        "inputs": ["data/final_dataset.csv"],
+        "outputs": [
+            "backend/models/tfidf_vectorizer.pkl",
+            "backend/models/kmeans_model.pkl",
+            "backend/models/cluster_centroids.bin",
+            "data/cluster_assignments.csv",
+            "backend/models/apriori_rules.json",
+            "backend/models/apriori_rules.bin",
+            "backend/models/frequent_itemsets.bin",
+        ],
+    },
+    {
+        "name": "consolidate_clusters",
+        "script": "analysis/consolidate_clusters.py",
+        "inputs": [
+            "data/final_dataset.csv",
+            "data/cluster_assignments.csv",
+            "backend/models/tfidf_vectorizer.pkl",
+            "backend/models/cluster_centroids.bin",
+        ],
+        "outputs": ["data/final_cluster_assignments.csv", "backend/models/cluster_hierarchy.bin"],
+    },
+    {
+        # Puerta de calidad: si falla alguna comprobación, el script sale con error y las etapas
+        # que usan el reporte (el snapshot que sirve la API) quedan bloqueadas
+        "name": "integrity_checks",
+        "script": "backend/src/integrity_checks.py",
+        "inputs": ["data/final_dataset.csv", "data/cluster_assignments.csv", "data/final_cluster_assignments.csv"],
+        "outputs": ["data/integrity_report.json"],
+    },
+    {
+        "name": "serving_snapshot",
+        "script": "backend/src/serving_snapshot.py",
+        "inputs": [
+            "data/final_dataset.csv",
+            "data/final_cluster_assignments.csv",
+            "data/cluster_names.json",
+            "data/integrity_report.json",
+        ],
+        "outputs": ["backend/models/serving_snapshot.bin"],
+    },
+    {
+        "name": "similar_articles",
+        "script": "backend/src/similar_articles.py",
+        "inputs": ["backend/models/serving_snapshot.bin", "backend/models/tfidf_vectorizer.pkl"],
+        "outputs": ["backend/models/similar_articles.bin"],
+    },
+]
+
+
+# === HUELLAS DE CONTENIDO ===
+class Fingerprints:
+    """
+    Hash sha256 del contenido de cada archivo. Para no releer archivos grandes en cada ejecución,
+    el hash se reutiliza mientras el tamaño y la fecha de modificación no cambien.
+    """
+
+    def __init__(self, known=None):
+        self.known = known or {}
+
+    def get(self, rel_path):
+        path = os.path.join(ROOT_DIR, rel_path)
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        entry = self.known.get(rel_path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            return entry["sha256"]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.known[rel_path] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+        return digest.hexdigest()
+
+
+def _module_path(name, script_dir):
+    """Ruta (relativa a la raíz) del módulo propio `name`, o None si es de la librería estándar o externo."""
+    for directory in [script_dir] + MODULE_DIRS:
+        rel_path = os.path.join(directory, *name.split(".")) + ".py"
+        if os.path.exists(os.path.join(ROOT_DIR, rel_path)):
+            return os.path.normpath(rel_path)
+    return None
+
+
+def local_imports(script):
+    """
+    Módulos del repositorio que importa `script`, directa o indirectamente (también los imports
+    dentro de funciones), leyendo el código con `ast` sin ejecutarlo.
+    """
+    found = []
+    pending = [script]
+    seen = {script}
+    while pending:
+        rel_path = pending.pop()
+        with open(os.path.join(ROOT_DIR, rel_path), "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=rel_path)
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names.add(node.module)
+        for name in sorted(names):
+            module = _module_path(name, os.path.dirname(rel_path))
+            if module and module not in seen:
+                seen.add(module)
+                found.append(module)
+                pending.append(module)
+    return sorted(found)
+
+
+def stage_inputs(stage):
+    inputs = [stage["script"]] + local_imports(stage["script"])
+    return inputs + [path for path in stage["inputs"] if path not in inputs]
+
+
+def build_dependencies(stages):
+    """Etapa -> conjunto de etapas que producen alguna de sus entradas."""
+    producers = {output: stage["name"] for stage in stages for output in stage["outputs"]}
+    return {
+        stage["name"]: {producers[path] for path in stage["inputs"] if path in producers and producers[path] != stage["name"]}
+        for stage in stages
+    }
+
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {"stages": {}, "files": {}}
+    with open(STATE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = f"{STATE_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def stale_reason(stage, stage_state, fingerprints):
+    """Devuelve por qué hay que ejecutar la etapa, o None si sus salidas están al día."""
+    if stage_state is None:
+        return "nunca ejecutada"
+    if stage_state.get("args") != stage.get("args", []):
+        return "argumentos distintos"
+    for path in stage_inputs(stage):
+        if fingerprints.get(path) != stage_state["inputs"].get(path):
+            return f"cambió {path}"
+    for path in stage["outputs"]:
+        current = fingerprints.get(path)
+        if current is None:
+            return f"falta {path}"
+        if current != stage_state["outputs"].get(path):
+            return f"{path} se modificó fuera del pipeline"
+    return None
+
+
+def record_stage(state, stage, fingerprints):
+    """Guarda en el estado las huellas con las que la etapa quedó al día."""
+    state["stages"][stage["name"]] = {
+        "args": stage.get("args", []),
+        "inputs": {path: fingerprints.get(path) for path in stage_inputs(stage)},
+        "outputs": {path: fingerprints.get(path) for path in stage["outputs"]},
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    state["files"] = fingerprints.known
+    save_state(state)
+
+
+def adopt_outputs(stages=STAGES, only=None):
+    """
+    Marca como al día las etapas cuyas salidas ya existen, sin ejecutarlas. Sirve para empezar
+    a usar el pipeline sobre artefactos ya generados (evita repetir el scraping y la generación).
+    """
+    state = load_state()
+    fingerprints = Fingerprints(state.get("files"))
+    for stage in stages:
+        if only and stage["name"] not in only:
+            continue
+        missing = [path for path in stage["outputs"] if fingerprints.get(path) is None]
+        if missing:
+            print(f"⚠️  {stage['name']}: no se adopta, falta {', '.join(missing)}")
+            continue
+        record_stage(state, stage, fingerprints)
+        print(f"📌 {stage['name']}: salidas actuales adoptadas")
+
+
+def run_stage(stage):
+    """Ejecuta el script de la etapa en su propio directorio y guarda su salida en un log."""
+    script_path = os.path.join(ROOT_DIR, stage["script"])
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage['name']}.log")
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8") as log:
+        result = subprocess.run(
+            [sys.executable, script_path, *stage.get("args", [])],
+            cwd=os.path.dirname(script_path),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    return result.returncode, time.perf_counter() - start, log_path
+
+
+# === EJECUCIÓN ===
+def run_pipeline(stages=STAGES, only=None, force=(), jobs=None, dry_run=False):
+    """
+    Ejecuta las etapas en orden de dependencias, en paralelo cuando son independientes, y salta
+    las etapas cuyas entradas (por hash de contenido) no cambiaron desde la última ejecución.
+    Como la decisión se toma al terminar las etapas anteriores, si una etapa se re-ejecuta pero
+    produce salidas idénticas, las siguientes no se vuelven a ejecutar.
+    Devuelve True si todas las etapas seleccionadas terminaron bien.
+    """
+    dependencies = build_dependencies(stages)
+    by_name = {stage["name"]: stage for stage in stages}
+    selected = set(only) if only else set(by_name)
+    unknown = (selected | set(force)) - set(by_name)
+    if unknown:
+        raise ValueError(f"Etapas desconocidas: {', '.join(sorted(unknown))}")
+
+    state = load_state()
+    fingerprints = Fingerprints(state.get("files"))
+
+    finished = {}  # nombre -> "ok" | "skipped" | "would_run" | "failed" | "blocked"
+    pending = [stage["name"] for stage in stages if stage["name"] in selected]
+    running = {}
+
+    def ready(name):
+        return all(dep in finished or dep not in selected for dep in dependencies[name])
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        while pending or running:
+            for name in [n for n in pending if ready(n)]:
+                pending.remove(name)
+                stage = by_name[name]
+                if any(finished.get(dep) in ("failed", "blocked") for dep in dependencies[name]):
+                    finished[name] = "blocked"
+                    print(f"⏭️  {name}: bloqueada (falló una etapa anterior)")
+                    continue
+                reason = "forzada" if name in force else stale_reason(stage, state["stages"].get(name), fingerprints)
+                if reason is None and dry_run and any(finished.get(dep) == "would_run" for dep in dependencies[name]):
+                    reason = "si cambian las salidas de etapas anteriores"
+                if reason is None:
+                    finished[name] = "skipped"
+                    print(f"✅ {name}: al día")
+                    continue
+                if dry_run:
+                    finished[name] = "would_run"
+                    print(f"🔸 {name}: se ejecutaría ({reason})")
+                    continue
+                print(f"▶️  {name}: ejecutando ({reason})")
+                running[pool.submit(run_stage, stage)] = name
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                returncode, elapsed, log_path = future.result()
+                if returncode != 0:
+                    finished[name] = "failed"
+                    print(f"❌ {name}: falló (código {returncode}, {elapsed:.1f} s). Ver {log_path}")
+                    continue
+                finished[name] = "ok"
+                print(f"✔️  {name}: terminada en {elapsed:.1f} s")
+                record_stage(state, by_name[name], fingerprints)
+
+    if not dry_run:
+        state["files"] = fingerprints.known
+        save_state(state)
+    return all(status in ("ok", "skipped", "would_run") for status in finished.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ejecuta el pipeline de datos y modelos de forma incremental.")
+    parser.add_argument("--only", nargs="+", metavar="ETAPA", help="Ejecutar solo estas etapas.")
+    parser.add_argument("--force", nargs="+", metavar="ETAPA", default=[], help="Ejecutar estas etapas aunque estén al día.")
+    parser.add_argument("--jobs", type=int, default=None, help="Etapas independientes en paralelo.")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar qué se ejecutaría sin ejecutar nada.")
+    parser.add_argument("--adopt", action="store_true", help="Marcar como al día las salidas que ya existen.")
+    parser.add_argument("--list", action="store_true", help="Listar las etapas y sus dependencias.")
+    args = parser.parse_args()
+
+    if args.list:
+        for stage_name, deps in build_dependencies(STAGES).items():
+            print(f"{stage_name}: {', '.join(sorted(deps)) or '(sin dependencias)'}")
+        sys.exit(0)
+
+    if args.adopt:
+        adopt_outputs(only=args.only)
+        sys.exit(0)
+
+    ok = run_pipeline(only=args.only, force=args.force, jobs=args.jobs, dry_run=args.dry_run)
+    sys.exit(0 if ok else 1)
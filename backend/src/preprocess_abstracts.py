@@ -1,9 +1,13 @@
 import pandas as pd
 import os
-import re
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import nltk
 from nltk.corpus import stopwords
 
+import text_processing
+
 # Descargar stopwords si no están
 nltk.download('stopwords', quiet=True)
 STOPWORDS = set(stopwords.words('english'))
@@ -13,39 +17,116 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "../../data/final_merged.csv")
 OUTPUT_PATH = os.path.join(BASE_DIR, "../../data/final_dataset.csv")
 
+# === MODO STREAMING ===
+CHUNKSIZE = 5000  # Filas por bloque: acota la memoria máxima, sin importar el tamaño del corpus
+
 # === FUNCIÓN DE PREPROCESAMIENTO ===
+def tokenize(text):
+    """Devuelve la lista de tokens limpios y normalizados de un texto en inglés."""
+    return text_processing.tokenize(text, STOPWORDS)
+
 def preprocess_text(text):
     """Limpia y normaliza texto en inglés."""
-    if not isinstance(text, str):
-        return ""
-    text = text.lower()  # pasar a minúsculas
-    text = re.sub(r"[^a-z\s]", "", text)  # eliminar caracteres no alfabéticos
-    tokens = text.split()  # dividir en palabras
-    tokens = [t for t in tokens if t not in STOPWORDS and len(t) > 2]  # quitar stopwords
-    return " ".join(tokens)
-
-# === CARGAR DATA ===
-print("📄 Cargando dataset...")
-df = pd.read_csv(DATA_PATH)
-print(f"Dataset cargado con {len(df)} artículos")
-
-# Eliminar duplicados basados en el link
-df.drop_duplicates(subset=['link'], keep='first', inplace=True)
-print(f"Dataset después de eliminar duplicados: {len(df)} artículos")
-
-# Eliminar columna source si existe
-if "source" in df.columns:
-    df = df.drop(columns=["source"])
-
-if "abstract" not in df.columns:
-    raise ValueError("No se encontró la columna 'abstract' en el CSV")
-
-# === APLICAR PREPROCESAMIENTO ===
-print("🧹 Limpiando abstracts...")
-df["clean_abstract"] = df["abstract"].apply(preprocess_text)
-
-# === GUARDAR RESULTADOS ===
-os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-df.to_csv(OUTPUT_PATH, index=False)
-print(f"\nArchivo preprocesado guardado en: {OUTPUT_PATH}")
-print(df.head(3))
+    return " ".join(tokenize(text))
+
+def preprocess_texts(texts):
+    """Aplica preprocess_text a una lista de textos (unidad de trabajo de cada proceso)."""
+    stopwords = STOPWORDS
+    return [" ".join(text_processing.tokenize(text, stopwords)) for text in texts]
+
+def main(data_path=DATA_PATH, output_path=OUTPUT_PATH):
+    # === CARGAR DATA ===
+    print("📄 Cargando dataset...")
+    df = pd.read_csv(data_path)
+    print(f"Dataset cargado con {len(df)} artículos")
+
+    # Eliminar duplicados basados en el link
+    df.drop_duplicates(subset=['link'], keep='first', inplace=True)
+    print(f"Dataset después de eliminar duplicados: {len(df)} artículos")
+
+    # Eliminar columna source si existe
+    if "source" in df.columns:
+        df = df.drop(columns=["source"])
+
+    if "abstract" not in df.columns:
+        raise ValueError("No se encontró la columna 'abstract' en el CSV")
+
+    # === APLICAR PREPROCESAMIENTO ===
+    print("🧹 Limpiando abstracts...")
+    df["clean_abstract"] = df["abstract"].apply(preprocess_text)
+
+    # === GUARDAR RESULTADOS ===
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    df.to_csv(output_path, index=False)
+    print(f"\nArchivo preprocesado guardado en: {output_path}")
+    print(df.head(3))
+
+
+def _deduplicate_chunk(chunk, seen_links):
+    """Elimina links repetidos dentro del bloque y con bloques anteriores (keep='first')."""
+    keys = chunk["link"].fillna("\0nan")  # NaN cuenta como un único link, igual que drop_duplicates
+    keep = ~keys.duplicated(keep="first") & ~keys.isin(seen_links)
+    seen_links.update(keys[keep])
+    return chunk[keep]
+
+def main_streaming(data_path=DATA_PATH, output_path=OUTPUT_PATH, chunksize=CHUNKSIZE, workers=None):
+    """
+    Igual que main(), pero lee el CSV por bloques, limpia los abstracts de cada bloque en un pool
+    de procesos y escribe el resultado de forma incremental. La memoria máxima depende del tamaño
+    de bloque (y del número de bloques en vuelo), no del tamaño del corpus. La salida es idéntica
+    byte a byte a la de main().
+    """
+    print(f"📄 Procesando dataset por bloques de {chunksize} filas...")
+    # dtype=str evita que la inferencia de tipos varíe de un bloque a otro
+    reader = pd.read_csv(data_path, chunksize=chunksize, dtype=str)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    seen_links = set()
+    total_rows = 0
+    written_rows = 0
+    first_chunk = None
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(output_path, "w", newline="", encoding="utf-8") as out:
+        max_in_flight = 2 * workers
+        in_flight = deque()
+
+        def write_oldest():
+            nonlocal written_rows, first_chunk
+            chunk, future = in_flight.popleft()
+            chunk = chunk.assign(clean_abstract=future.result())
+            chunk.to_csv(out, index=False, header=(written_rows == 0))
+            written_rows += len(chunk)
+            if first_chunk is None:
+                first_chunk = chunk.head(3)
+
+        for chunk in reader:
+            total_rows += len(chunk)
+            chunk = _deduplicate_chunk(chunk, seen_links)
+            if "source" in chunk.columns:
+                chunk = chunk.drop(columns=["source"])
+            if "abstract" not in chunk.columns:
+                raise ValueError("No se encontró la columna 'abstract' en el CSV")
+
+            in_flight.append((chunk, pool.submit(preprocess_texts, chunk["abstract"].tolist())))
+            if len(in_flight) >= max_in_flight:
+                write_oldest()
+        while in_flight:
+            write_oldest()
+
+    print(f"Dataset procesado: {total_rows} artículos leídos, {written_rows} tras eliminar duplicados")
+    print(f"\nArchivo preprocesado guardado en: {output_path}")
+    print(first_chunk)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Limpia y normaliza los abstracts del dataset fusionado.")
+    parser.add_argument("--stream", action="store_true", help="Procesar por bloques con un pool de procesos.")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help="Filas por bloque en modo streaming.")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en modo streaming (por defecto, todos los núcleos).")
+    args = parser.parse_args()
+
+    if args.stream:
+        main_streaming(chunksize=args.chunksize, workers=args.workers)
+    else:
+        main()
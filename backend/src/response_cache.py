@@ -0,0 +1,109 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# === CONFIGURACIÓN ===
+MAX_ENTRIES = 2048                   # Respuestas guardadas por proceso
+MAX_BYTES = 64 * 1024 * 1024         # 64 MB de cuerpos serializados por proceso
+# Los datos solo cambian al reconstruir los artefactos: los navegadores pueden reutilizar la respuesta
+# un minuto y después revalidarla con If-None-Match (304 sin cuerpo si no cambió)
+CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+
+def serialize(content):
+    """Serializa igual que JSONResponse de FastAPI/Starlette (UTF-8, sin espacios)."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def serialize_object(fields):
+    """
+    Serializa un objeto JSON cuyos valores pueden ser fragmentos ya codificados (bytes), que se
+    insertan tal cual. Con valores normales equivale a `serialize(fields)`.
+    """
+    members = [serialize(name) + b":" + (value if isinstance(value, bytes) else serialize(value))
+               for name, value in fields.items()]
+    return b"{" + b",".join(members) + b"}"
+
+
+def strong_etag(body):
+    """ETag fuerte: depende de los bytes exactos del cuerpo."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Comprueba la cabecera If-None-Match contra `etag` (comparación débil, como pide RFC 9110 para
+    If-None-Match: se ignora el prefijo W/).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+class ResponseCache:
+    """
+    Caché LRU, por proceso, de respuestas JSON ya serializadas.
+
+    La clave es (ruta, parámetros normalizados, versión de los datos): al cambiar de versión las
+    entradas antiguas dejan de usarse y salen por LRU. Cada entrada guarda los bytes del cuerpo y
+    su ETag, así que una respuesta repetida no vuelve a pasar por pandas/NumPy ni por el JSON.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # clave -> (cuerpo, etag)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(path, params, version):
+        """Clave normalizada: parámetros ya validados y ordenados, sin los que valen None."""
+        return path, tuple(sorted((name, value) for name, value in params.items() if value is not None)), version
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body):
+        entry = (body, strong_etag(body))
+        if len(body) > self.max_bytes:
+            return entry
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self.entries[key] = entry
+            self.size += len(body)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, (old_body, _) = self.entries.popitem(last=False)
+                self.size -= len(old_body)
+        return entry
+
+    def get_or_build(self, key, build):
+        """
+        Devuelve (cuerpo, etag) de la clave, serializando `build()` si no está en caché (`build`
+        puede devolver directamente los bytes del cuerpo). Si `build` lanza una excepción
+        (p. ej. HTTPException 404) no se guarda nada.
+        """
+        entry = self.get(key)
+        if entry is None:
+            content = build()
+            entry = self.put(key, content if isinstance(content, bytes) else serialize(content))
+        return entry
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,335 @@
+import os
+import sys
+import json
+import textwrap
+import numpy as np
+from array import array
+
+from artifact_store import write_artifact, open_artifact, encode_strings, decode_strings
+
+# Versión del formato binario de reglas (apriori_rules.bin)
+RULES_FORMAT_VERSION = 1
+
+
+class RuleIndex:
+    """
+    Índice de reglas de asociación para consultas por término.
+
+    Las reglas se guardan ordenadas por (lift, confidence) descendente, de modo que el id de
+    una regla es también su posición en el ranking. Para cada término se guardan, en formato CSR:
+    - los ids de las reglas donde aparece (en antecedentes o en consecuentes), ya ordenados por ranking;
+    - las confianzas de esas reglas ordenadas de menor a mayor, para contar con búsqueda binaria
+      cuántas superan el umbral de confianza.
+    """
+
+    def __init__(self, terms, ant_ptr, ant_terms, cons_ptr, cons_terms, support, confidence, lift,
+                 by_ant_ptr, by_ant_rules, by_ant_conf, by_cons_ptr, by_cons_rules, by_cons_conf,
+                 conf_sorted):
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        # Regla -> términos (CSR)
+        self.ant_ptr, self.ant_terms = ant_ptr, ant_terms
+        self.cons_ptr, self.cons_terms = cons_ptr, cons_terms
+        # Métricas por regla
+        self.support, self.confidence, self.lift = support, confidence, lift
+        # Término -> reglas (CSR) y confianzas ordenadas por término
+        self.by_ant_ptr, self.by_ant_rules, self.by_ant_conf = by_ant_ptr, by_ant_rules, by_ant_conf
+        self.by_cons_ptr, self.by_cons_rules, self.by_cons_conf = by_cons_ptr, by_cons_rules, by_cons_conf
+        # Confianzas de todas las reglas ordenadas (consultas sin término)
+        self.conf_sorted = conf_sorted
+
+    def __len__(self):
+        return len(self.confidence)
+
+    @classmethod
+    def from_records(cls, records):
+        """Construye el índice a partir de una lista de reglas con el formato de apriori_rules.json."""
+        return cls(**build_index_arrays(records))
+
+    @classmethod
+    def load(cls, path):
+        """Abre un almacén binario de reglas (apriori_rules.bin) con mmap, sin copiar los arrays."""
+        arrays, meta = open_artifact(path)
+        if meta.get("format") != "apriori_rules" or meta.get("version") != RULES_FORMAT_VERSION:
+            raise ValueError(f"{path} no es un almacén de reglas compatible (versión {RULES_FORMAT_VERSION}).")
+        terms = decode_strings(arrays.pop("term_offsets"), arrays.pop("term_blob"))
+        return cls(terms=terms, **arrays)
+
+    # === CONSULTAS ===
+    def _term_rules(self, term, ptr, rules, conf):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return rules[:0], conf[:0]
+        start, end = ptr[term_id], ptr[term_id + 1]
+        return rules[start:end], conf[start:end]
+
+    def query(self, antecedent=None, consequent=None, min_confidence=0.0, skip=0, limit=10):
+        """
+        Devuelve (total, ids de la página) de las reglas que contienen `antecedent` en los
+        antecedentes y/o `consequent` en los consecuentes, con confianza >= min_confidence,
+        en orden de (lift, confidence) descendente.
+        """
+        # Comparar en el mismo dtype en que están guardadas las confianzas (float32 en el almacén binario)
+        min_confidence = self.confidence.dtype.type(min_confidence)
+        if antecedent is not None and consequent is not None:
+            ant_rules, _ = self._term_rules(antecedent, self.by_ant_ptr, self.by_ant_rules, self.by_ant_conf)
+            cons_rules, _ = self._term_rules(consequent, self.by_cons_ptr, self.by_cons_rules, self.by_cons_conf)
+            rules = np.intersect1d(ant_rules, cons_rules, assume_unique=True)
+            rules = rules[self.confidence[rules] >= min_confidence]
+            return len(rules), rules[skip:skip + limit]
+
+        if antecedent is not None:
+            rules, conf_sorted = self._term_rules(antecedent, self.by_ant_ptr, self.by_ant_rules, self.by_ant_conf)
+        elif consequent is not None:
+            rules, conf_sorted = self._term_rules(consequent, self.by_cons_ptr, self.by_cons_rules, self.by_cons_conf)
+        else:
+            rules, conf_sorted = None, self.conf_sorted
+
+        # Total con búsqueda binaria sobre las confianzas ordenadas
+        total = len(conf_sorted) - int(np.searchsorted(conf_sorted, min_confidence, side='left'))
+        if total == len(conf_sorted):
+            # Todas las reglas superan el umbral: la página es un slice directo
+            page = rules[skip:skip + limit] if rules is not None else np.arange(skip, min(skip + limit, total))
+            return total, page
+        return total, self._filtered_page(rules, min_confidence, skip, limit, total)
+
+    def iter_query(self, antecedent=None, consequent=None, min_confidence=0.0, batch=1024):
+        """
+        Recorre todas las reglas de `query` (mismo filtro y orden) por bloques de ids, sin
+        materializar la lista completa cuando no hay término.
+        """
+        min_confidence = self.confidence.dtype.type(min_confidence)
+        if antecedent is not None and consequent is not None:
+            _, rules = self.query(antecedent, consequent, min_confidence, skip=0, limit=len(self))
+            for start in range(0, len(rules), batch):
+                yield rules[start:start + batch]
+            return
+
+        if antecedent is not None:
+            rules, _ = self._term_rules(antecedent, self.by_ant_ptr, self.by_ant_rules, self.by_ant_conf)
+        elif consequent is not None:
+            rules, _ = self._term_rules(consequent, self.by_cons_ptr, self.by_cons_rules, self.by_cons_conf)
+        else:
+            rules = None
+        num_rules = len(rules) if rules is not None else len(self.confidence)
+        for start in range(0, num_rules, batch):
+            ids = rules[start:start + batch] if rules is not None else np.arange(start, min(start + batch, num_rules))
+            ids = ids[self.confidence[ids] >= min_confidence]
+            if len(ids):
+                yield ids
+
+    def _filtered_page(self, rules, min_confidence, skip, limit, total):
+        """Recorre las reglas en orden de ranking por bloques hasta llenar la página."""
+        wanted = min(skip + limit, total)
+        num_rules = len(rules) if rules is not None else len(self.confidence)
+        block = max(64, 2 * wanted)
+        found = []
+        count = 0
+        start = 0
+        while count < wanted and start < num_rules:
+            ids = rules[start:start + block] if rules is not None else np.arange(start, min(start + block, num_rules))
+            ids = ids[self.confidence[ids] >= min_confidence]
+            found.append(ids)
+            count += len(ids)
+            start += block
+            block *= 2
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)[skip:wanted]
+
+    def records(self, rule_ids):
+        """Convierte ids de reglas al formato de registro de la API."""
+        terms = self.terms
+        return [
+            {
+                "antecedents": [terms[t] for t in self.ant_terms[self.ant_ptr[r]:self.ant_ptr[r + 1]]],
+                "consequents": [terms[t] for t in self.cons_terms[self.cons_ptr[r]:self.cons_ptr[r + 1]]],
+                "support": _to_float(self.support[r]),
+                "confidence": _to_float(self.confidence[r]),
+                "lift": _to_float(self.lift[r]),
+            }
+            for r in rule_ids
+        ]
+
+
+def _to_float(value):
+    """Convierte a float de Python con la representación más corta (evita ruido de float32 en el JSON)."""
+    return float(str(value)) if isinstance(value, np.float32) else float(value)
+
+
+# === CONSTRUCCIÓN ===
+def _csr(lists, dtype=np.int32):
+    """Convierte una lista de listas en (punteros, valores) CSR."""
+    ptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(values) for values in lists])
+    values = np.fromiter((v for values in lists for v in values), dtype=dtype, count=int(ptr[-1]))
+    return ptr, values
+
+
+def _invert(ptr, values, num_terms, confidence):
+    """Invierte regla -> términos en término -> reglas (ordenadas por id) y confianzas ordenadas."""
+    rule_ids = np.repeat(np.arange(len(ptr) - 1, dtype=np.int32), np.diff(ptr))
+    order = np.lexsort((rule_ids, values))  # por término y luego por id de regla (= ranking)
+    term_rules = rule_ids[order]
+    term_ptr = np.zeros(num_terms + 1, dtype=np.int64)
+    term_ptr[1:] = np.cumsum(np.bincount(values, minlength=num_terms))
+
+    term_of_posting = values[order]
+    conf_order = np.lexsort((confidence[term_rules], term_of_posting))
+    term_conf = confidence[term_rules[conf_order]]
+    return term_ptr, term_rules, term_conf
+
+
+def _take_rows(ptr, values, order):
+    """Reordena las filas de una estructura CSR según `order`."""
+    lengths = np.diff(ptr)[order]
+    new_ptr = np.zeros(len(order) + 1, dtype=np.int64)
+    new_ptr[1:] = np.cumsum(lengths)
+    positions = np.repeat(ptr[:-1][order] - new_ptr[:-1], lengths) + np.arange(new_ptr[-1])
+    return new_ptr, values[positions]
+
+
+def build_index_arrays(records, dtype=np.float64):
+    """
+    Calcula todos los arrays del índice a partir de las reglas (lista de dicts con
+    antecedents, consequents, support, confidence y lift).
+    """
+    terms = sorted({t for r in records for t in r["antecedents"]} | {t for r in records for t in r["consequents"]})
+    term_ids = {term: i for i, term in enumerate(terms)}
+    ant_ptr, ant_terms = _csr([[term_ids[t] for t in r["antecedents"]] for r in records])
+    cons_ptr, cons_terms = _csr([[term_ids[t] for t in r["consequents"]] for r in records])
+    return build_index_arrays_from_columns(
+        terms, ant_ptr, ant_terms, cons_ptr, cons_terms,
+        [r["support"] for r in records], [r["confidence"] for r in records], [r["lift"] for r in records],
+        dtype=dtype,
+    )
+
+
+def build_index_arrays_from_columns(terms, ant_ptr, ant_terms, cons_ptr, cons_terms, support, confidence, lift,
+                                    dtype=np.float64):
+    """
+    Igual que `build_index_arrays` pero a partir de columnas: términos de antecedentes y
+    consecuentes en CSR (ids sobre `terms`, que debe estar ordenado) y métricas por regla.
+    Los términos que no aparecen en ninguna regla se descartan del diccionario.
+    """
+    support = np.asarray(support, dtype=np.float64)
+    confidence = np.asarray(confidence, dtype=np.float64)
+    lift = np.asarray(lift, dtype=np.float64)
+
+    # Orden estable por (lift, confidence) descendente: el id de regla pasa a ser su ranking.
+    # Se ordena con los valores originales y después se convierte al dtype de almacenamiento.
+    order = np.lexsort((-confidence, -lift))
+    support, confidence, lift = support[order].astype(dtype), confidence[order].astype(dtype), lift[order].astype(dtype)
+    ant_ptr, ant_terms = _take_rows(np.asarray(ant_ptr, dtype=np.int64), np.asarray(ant_terms, dtype=np.int32), order)
+    cons_ptr, cons_terms = _take_rows(np.asarray(cons_ptr, dtype=np.int64), np.asarray(cons_terms, dtype=np.int32), order)
+
+    # Diccionario compacto: solo los términos usados, en el mismo orden
+    used = np.unique(np.concatenate([ant_terms, cons_terms]))
+    if len(used) != len(terms):
+        remap = np.full(len(terms), -1, dtype=np.int32)
+        remap[used] = np.arange(len(used), dtype=np.int32)
+        terms = [terms[i] for i in used]
+        ant_terms, cons_terms = remap[ant_terms], remap[cons_terms]
+
+    by_ant_ptr, by_ant_rules, by_ant_conf = _invert(ant_ptr, ant_terms, len(terms), confidence)
+    by_cons_ptr, by_cons_rules, by_cons_conf = _invert(cons_ptr, cons_terms, len(terms), confidence)
+
+    return dict(
+        terms=list(terms),
+        ant_ptr=ant_ptr, ant_terms=ant_terms,
+        cons_ptr=cons_ptr, cons_terms=cons_terms,
+        support=support, confidence=confidence, lift=lift,
+        by_ant_ptr=by_ant_ptr, by_ant_rules=by_ant_rules, by_ant_conf=by_ant_conf,
+        by_cons_ptr=by_cons_ptr, by_cons_rules=by_cons_rules, by_cons_conf=by_cons_conf,
+        conf_sorted=np.sort(confidence),
+    )
+
+
+def save_rules(path, records):
+    """
+    Guarda las reglas en formato binario columnar: diccionario de términos, offsets CSR de
+    antecedentes/consecuentes sobre arrays int32 de ids de término, métricas en float32 y el
+    índice término -> reglas ya construido, para que cargarlo no dependa del número de reglas.
+    """
+    _write_index(path, build_index_arrays(records, dtype=np.float32))
+
+
+def _write_index(path, arrays):
+    term_offsets, term_blob = encode_strings(arrays.pop("terms"))
+    arrays["term_offsets"] = term_offsets
+    arrays["term_blob"] = term_blob
+    meta = {"format": "apriori_rules", "version": RULES_FORMAT_VERSION, "num_rules": len(arrays["confidence"])}
+    write_artifact(path, arrays, meta)
+
+
+class RuleColumns:
+    """
+    Acumulador columnar de reglas para generarlas en streaming: cada regla ocupa unos pocos
+    enteros y tres float64 en arrays compactos, en lugar de un dict o una fila de DataFrame.
+    """
+
+    def __init__(self, terms):
+        self.terms = list(terms)
+        self.ant_terms, self.cons_terms = array("i"), array("i")
+        self.ant_lengths, self.cons_lengths = array("i"), array("i")
+        self.support, self.confidence, self.lift = array("d"), array("d"), array("d")
+
+    def __len__(self):
+        return len(self.support)
+
+    def append(self, antecedent_ids, consequent_ids, support, confidence, lift):
+        self.ant_terms.extend(antecedent_ids)
+        self.ant_lengths.append(len(antecedent_ids))
+        self.cons_terms.extend(consequent_ids)
+        self.cons_lengths.append(len(consequent_ids))
+        self.support.append(support)
+        self.confidence.append(confidence)
+        self.lift.append(lift)
+
+    def index_arrays(self, dtype=np.float64):
+        def ptr(lengths):
+            values = np.zeros(len(lengths) + 1, dtype=np.int64)
+            values[1:] = np.cumsum(np.frombuffer(lengths, dtype=np.int32))
+            return values
+
+        return build_index_arrays_from_columns(
+            self.terms,
+            ptr(self.ant_lengths), np.frombuffer(self.ant_terms, dtype=np.int32),
+            ptr(self.cons_lengths), np.frombuffer(self.cons_terms, dtype=np.int32),
+            np.frombuffer(self.support), np.frombuffer(self.confidence), np.frombuffer(self.lift),
+            dtype=dtype,
+        )
+
+
+def save_rule_columns(path, columns, json_path=None):
+    """
+    Guarda las reglas acumuladas en `columns` en el almacén binario. Con `json_path`, exporta
+    también apriori_rules.json escribiendo las reglas una a una (en orden de ranking).
+    """
+    if json_path is not None:
+        write_rules_json(json_path, RuleIndex(**columns.index_arrays(dtype=np.float64)))
+    _write_index(path, columns.index_arrays(dtype=np.float32))
+
+
+def write_rules_json(path, rule_index, batch=1000):
+    """Escribe las reglas del índice con el formato de apriori_rules.json sin construir la lista entera."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for start in range(0, len(rule_index), batch):
+            for i, record in enumerate(rule_index.records(range(start, min(start + batch, len(rule_index))))):
+                for key in ("support", "confidence", "lift"):
+                    record[key] = round(record[key], 10)
+                f.write(",\n" if start + i else "\n")
+                f.write(textwrap.indent(json.dumps(record, indent=4), "    "))
+        f.write("\n]")
+
+
+if __name__ == "__main__":
+    # Convertir un apriori_rules.json existente al almacén binario
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    json_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(BASE_DIR, "../models/apriori_rules.json")
+    bin_path = os.path.splitext(json_path)[0] + ".bin"
+    with open(json_path, "r", encoding="utf-8") as f:
+        rule_records = json.load(f)
+    save_rules(bin_path, rule_records)
+    print(f"{len(rule_records)} reglas convertidas a formato binario en: {bin_path}")
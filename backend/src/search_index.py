@@ -0,0 +1,248 @@
+import re
+import numpy as np
+
+from text_processing import tokenize
+from artifact_store import encode_strings, decode_strings
+
+# === PARÁMETROS BM25 ===
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Hueco de posiciones entre título y abstract para que una frase no cruce de un campo a otro
+FIELD_GAP = 1
+
+# Frases entre comillas, operador OR o palabras sueltas
+QUERY_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class InvertedIndex:
+    """
+    Índice invertido con posiciones sobre título + abstract de cada artículo.
+
+    Las listas de postings se guardan en formato CSR (arrays de NumPy):
+    - term_ptr[t]:term_ptr[t+1] delimita los postings del término t.
+    - post_docs: id de documento (ordenado dentro de cada término).
+    - post_weights: peso BM25 precalculado del término en ese documento.
+    - pos_ptr[j]:pos_ptr[j+1] delimita las posiciones del posting j dentro de positions.
+
+    Las consultas se tokenizan con las mismas stopwords que se usaron al construir el índice.
+    """
+
+    def __init__(self, vocabulary, term_ptr, post_docs, post_weights, pos_ptr, positions, num_docs, stopwords):
+        self.vocabulary = vocabulary
+        self.term_ptr = term_ptr
+        self.post_docs = post_docs
+        self.post_weights = post_weights
+        self.pos_ptr = pos_ptr
+        self.positions = positions
+        self.num_docs = num_docs
+        self.stopwords = stopwords
+
+    @classmethod
+    def build(cls, titles, abstracts, stopwords):
+        """Construye el índice a partir de títulos y abstracts (mismo orden que el DataFrame)."""
+        postings = {}  # término -> lista de (doc_id, [posiciones])
+        doc_lengths = []
+
+        for doc_id, (title, abstract) in enumerate(zip(titles, abstracts)):
+            title_tokens = tokenize(title, stopwords)
+            abstract_tokens = tokenize(abstract, stopwords)
+            offset = len(title_tokens) + FIELD_GAP
+            tokens = [(pos, t) for pos, t in enumerate(title_tokens)]
+            tokens += [(offset + pos, t) for pos, t in enumerate(abstract_tokens)]
+            doc_lengths.append(len(title_tokens) + len(abstract_tokens))
+
+            doc_positions = {}
+            for pos, term in tokens:
+                doc_positions.setdefault(term, []).append(pos)
+            for term, term_positions in doc_positions.items():
+                postings.setdefault(term, []).append((doc_id, term_positions))
+
+        num_docs = len(doc_lengths)
+        doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        avg_length = float(doc_lengths.mean()) if num_docs else 0.0
+
+        vocabulary = {term: term_id for term_id, term in enumerate(sorted(postings))}
+        term_ptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        post_docs, post_tf, pos_ptr, positions = [], [], [0], []
+        for term, term_id in vocabulary.items():
+            for doc_id, term_positions in postings[term]:
+                post_docs.append(doc_id)
+                post_tf.append(len(term_positions))
+                positions.extend(term_positions)
+                pos_ptr.append(len(positions))
+            term_ptr[term_id + 1] = len(post_docs)
+
+        post_docs = np.asarray(post_docs, dtype=np.int32)
+        post_tf = np.asarray(post_tf, dtype=np.float32)
+
+        # Peso BM25 por posting: idf(t) * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+        doc_freq = np.diff(term_ptr).astype(np.float32)
+        idf = np.log(1.0 + (num_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        post_idf = np.repeat(idf, np.diff(term_ptr))
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * doc_lengths[post_docs] / max(avg_length, 1.0))
+        post_weights = (post_idf * post_tf * (BM25_K1 + 1.0) / (post_tf + norm)).astype(np.float32)
+
+        return cls(
+            vocabulary=vocabulary,
+            term_ptr=term_ptr,
+            post_docs=post_docs,
+            post_weights=post_weights,
+            pos_ptr=np.asarray(pos_ptr, dtype=np.int64),
+            positions=np.asarray(positions, dtype=np.int32),
+            num_docs=num_docs,
+            stopwords=frozenset(stopwords),
+        )
+
+    # === SERIALIZACIÓN ===
+    def to_arrays(self, prefix="search_"):
+        """Devuelve los arrays del índice para guardarlos con artifact_store."""
+        vocab_offsets, vocab_blob = encode_strings(sorted(self.vocabulary, key=self.vocabulary.get))
+        stop_offsets, stop_blob = encode_strings(sorted(self.stopwords))
+        arrays = {
+            "vocab_offsets": vocab_offsets, "vocab_blob": vocab_blob,
+            "stop_offsets": stop_offsets, "stop_blob": stop_blob,
+            "term_ptr": self.term_ptr, "post_docs": self.post_docs, "post_weights": self.post_weights,
+            "pos_ptr": self.pos_ptr, "positions": self.positions,
+            "num_docs": np.asarray([self.num_docs], dtype=np.int64),
+        }
+        return {prefix + name: array for name, array in arrays.items()}
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix="search_"):
+        """Reconstruye el índice a partir de los arrays guardados (sin recalcular postings)."""
+        get = lambda name: arrays[prefix + name]
+        terms = decode_strings(get("vocab_offsets"), get("vocab_blob"))
+        return cls(
+            vocabulary={term: term_id for term_id, term in enumerate(terms)},
+            term_ptr=get("term_ptr"),
+            post_docs=get("post_docs"),
+            post_weights=get("post_weights"),
+            pos_ptr=get("pos_ptr"),
+            positions=get("positions"),
+            num_docs=int(get("num_docs")[0]),
+            stopwords=frozenset(decode_strings(get("stop_offsets"), get("stop_blob"))),
+        )
+
+    # === CONSULTAS ===
+    def _postings(self, term):
+        """Devuelve (docs, pesos, inicio) del término, o None si no está en el vocabulario."""
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            return None
+        start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+        return self.post_docs[start:end], self.post_weights[start:end], start
+
+    def _phrase_keys(self, postings, offset, length):
+        """
+        Claves (documento << 32 | posición - offset + length) de todas las apariciones del término,
+        ya ordenadas: los postings van por documento y las posiciones crecen dentro de cada uno.
+        """
+        term_docs, _, start = postings
+        pointers = self.pos_ptr[start:start + len(term_docs) + 1]
+        keys = np.repeat(term_docs.astype(np.int64) << 32, np.diff(pointers))
+        keys += self.positions[pointers[0]:pointers[-1]]
+        keys += length - offset
+        return keys
+
+    def _match_clause(self, terms):
+        """
+        Documentos que contienen todos los términos (y en orden consecutivo si es una frase).
+        Devuelve (docs ordenados, puntuaciones alineadas).
+        """
+        lists = [self._postings(t) for t in terms]
+        if any(p is None for p in lists):
+            return _empty()
+
+        if len(terms) > 1:
+            docs = self._phrase_docs(lists)
+        else:
+            docs = lists[0][0]
+
+        # Un término repetido en la cláusula ("bone bone") solo puntúa una vez
+        scores = np.zeros(len(docs), dtype=np.float32)
+        for term in dict.fromkeys(terms):
+            term_docs, term_weights, _ = lists[terms.index(term)]
+            scores += term_weights[np.searchsorted(term_docs, docs)]
+        return docs, scores
+
+    def _phrase_docs(self, lists):
+        """
+        Documentos donde los términos aparecen consecutivos, sin recorrerlos uno a uno: cada
+        aparición es una clave (documento, posición - desplazamiento del término en la frase) y una
+        frase empieza donde la clave está en las listas de todos los términos. Se parte del término
+        con menos apariciones y sus claves se buscan en las de los demás.
+        """
+        keys_per_term = [self._phrase_keys(postings, offset, len(lists)) for offset, postings in enumerate(lists)]
+        keys_per_term.sort(key=len)
+        keys = keys_per_term[0]
+        for term_keys in keys_per_term[1:]:
+            found = np.minimum(np.searchsorted(term_keys, keys), len(term_keys) - 1)
+            keys = keys[term_keys[found] == keys]
+            if len(keys) == 0:
+                break
+        docs = keys >> 32
+        return docs[np.r_[True, docs[1:] != docs[:-1]]].astype(np.int32) if len(docs) else _empty()[0]
+
+    def match(self, query):
+        """
+        Evalúa una consulta y devuelve (docs ordenados por id, puntuaciones BM25).
+
+        Sintaxis:
+        - Términos separados por espacios: AND (bone loss -> bone AND loss).
+        - "frase entre comillas": los términos deben aparecer consecutivos.
+        - OR entre grupos: bone OR muscle.
+        """
+        groups = [[]]
+        for phrase, word in QUERY_TOKEN_RE.findall(query or ""):
+            if word == "OR":
+                groups.append([])
+            elif phrase:
+                terms = tokenize(phrase, self.stopwords)
+                if terms:
+                    groups[-1].append(terms)
+            else:
+                # Cada término suelto es su propia cláusula; las stopwords y los repetidos se ignoran
+                groups[-1].extend([t] for t in tokenize(word, self.stopwords) if [t] not in groups[-1])
+
+        result_docs, result_scores = _empty()
+        for clauses in groups:
+            if not clauses:
+                continue
+            docs, scores = self._match_clause(clauses[0])
+            for clause in clauses[1:]:
+                clause_docs, clause_scores = self._match_clause(clause)
+                docs, left, right = np.intersect1d(docs, clause_docs, assume_unique=True, return_indices=True)
+                scores = scores[left] + clause_scores[right]
+            result_docs, result_scores = _union(result_docs, result_scores, docs, scores)
+        return result_docs, result_scores
+
+    @staticmethod
+    def rank(docs, scores, skip, limit):
+        """Devuelve los ids de la página [skip, skip+limit) ordenados por puntuación descendente."""
+        end = min(skip + limit, len(docs))
+        if skip >= end:
+            return docs[:0]
+        if end < len(docs):
+            # Solo ordenar los mejores `end` resultados
+            top = np.argpartition(-scores, end - 1)[:end]
+        else:
+            top = np.arange(len(docs))
+        order = top[np.lexsort((docs[top], -scores[top]))]
+        return docs[order[skip:end]]
+
+
+def _empty():
+    return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+
+def _union(docs_a, scores_a, docs_b, scores_b):
+    """Unión de dos listas de resultados sumando las puntuaciones de los documentos comunes."""
+    if len(docs_a) == 0:
+        return docs_b, scores_b
+    if len(docs_b) == 0:
+        return docs_a, scores_a
+    docs = np.concatenate([docs_a, docs_b])
+    scores = np.concatenate([scores_a, scores_b])
+    unique_docs, inverse = np.unique(docs, return_inverse=True)
+    return unique_docs.astype(np.int32), np.bincount(inverse, weights=scores).astype(np.float32)
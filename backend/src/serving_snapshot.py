@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+from functools import cached_property
+
+from artifact_store import write_artifact, open_artifact, encode_strings, decode_strings, StringColumn
+from search_index import InvertedIndex
+from response_cache import serialize
+
+# Versión del formato del snapshot; cambiarla obliga a reconstruirlo
+SNAPSHOT_FORMAT_VERSION = 2
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "../../data")
+MODEL_DIR = os.path.join(BASE_DIR, "../models")
+ARTICLES_PATH = os.path.join(DATA_DIR, "final_dataset.csv")
+ASSIGNMENTS_PATH = os.path.join(DATA_DIR, "final_cluster_assignments.csv")
+CLUSTER_NAMES_PATH = os.path.join(DATA_DIR, "cluster_names.json")
+SNAPSHOT_PATH = os.path.join(MODEL_DIR, "serving_snapshot.bin")
+# Archivos de los que se construye el snapshot; su contenido define la versión de los datos
+SOURCE_PATHS = [ARTICLES_PATH, ASSIGNMENTS_PATH, CLUSTER_NAMES_PATH]
+
+# Columnas de texto de cada artículo, en el orden en que las devuelve la API
+ARTICLE_FIELDS = ["title", "link", "abstract", "clean_abstract"]
+UNASSIGNED_CLUSTER_ID = "-1"
+UNASSIGNED_CLUSTER_NAME = "Sin categoría"
+
+
+def article_id_from_link(link):
+    """Identificador estable de un artículo: el id PMC al final de su link (p. ej. PMC4136787)."""
+    return link.rstrip("/").rsplit("/", 1)[-1]
+
+
+def data_version(paths):
+    """Hash del contenido de los archivos de entrada; identifica la versión de los datos servidos."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def source_stamps(paths=SOURCE_PATHS, hashes=True):
+    """
+    Tamaño, fecha de modificación y (con `hashes`) hash del contenido de cada archivo de entrada,
+    por nombre de archivo. Los que no existen quedan en None.
+    """
+    stamps = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stamps[os.path.basename(path)] = None
+            continue
+        stamps[os.path.basename(path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "content": data_version([path]) if hashes else None,
+        }
+    return stamps
+
+
+def stale_sources(meta, paths=SOURCE_PATHS):
+    """
+    Archivos de entrada que cambiaron desde que se construyó el snapshot. Comparar tamaño y fecha
+    no lee nada; solo los archivos cuya fecha difiere se leen para comparar su contenido, así que
+    un checkout que solo cambia las fechas no da un falso aviso. Los snapshots sin esta
+    información se comparan por la versión de datos completa.
+    """
+    recorded = meta.get("sources")
+    if recorded is None:
+        return [] if data_version(paths) == meta.get("data_version") else sorted(os.path.basename(p) for p in paths)
+    stale = []
+    for path, (name, current) in zip(paths, source_stamps(paths, hashes=False).items()):
+        before = recorded.get(name)
+        if current is None or before is None:
+            if current != before:
+                stale.append(name)
+        elif current["size"] != before["size"]:
+            stale.append(name)
+        elif current["mtime_ns"] != before["mtime_ns"] and data_version([path]) != before["content"]:
+            stale.append(name)
+    return sorted(stale)
+
+
+# === CONSTRUCCIÓN (OFFLINE) ===
+def build_snapshot_arrays():
+    """
+    Fusiona artículos, asignaciones de cluster y nombres de cluster (igual que hacía la API al
+    arrancar) y devuelve (arrays, meta) listos para guardarse con artifact_store.
+    """
+    # pandas y NLTK solo se necesitan para construir el snapshot, no para servirlo
+    import pandas as pd
+    from preprocess_abstracts import STOPWORDS
+
+    articles_df = pd.read_csv(ARTICLES_PATH)
+    assignments_df = pd.read_csv(ASSIGNMENTS_PATH)
+    with open(CLUSTER_NAMES_PATH, "r", encoding="utf-8") as f:
+        cluster_names = json.load(f)
+
+    merged_df = pd.merge(articles_df, assignments_df, on="link", how="left")
+    article_cluster_ids = [
+        str(int(value)) if pd.notna(value) else UNASSIGNED_CLUSTER_ID for value in merged_df["final_cluster"]
+    ]
+
+    # Clusters ordenados por id numérico; los códigos enteros reemplazan al string por artículo
+    cluster_ids = sorted(set(cluster_names) | set(article_cluster_ids), key=int)
+    code_by_id = {cluster_id: code for code, cluster_id in enumerate(cluster_ids)}
+
+    arrays = {}
+    text_columns = {}
+    for field in ARTICLE_FIELDS:
+        text_columns[field] = [str(value) for value in merged_df[field].where(merged_df[field].notna(), "")]
+        arrays[f"{field}_offsets"], arrays[f"{field}_blob"] = encode_strings(text_columns[field])
+    arrays["cluster_codes"] = np.asarray([code_by_id[c] for c in article_cluster_ids], dtype=np.int32)
+    arrays["cluster_id_offsets"], arrays["cluster_id_blob"] = encode_strings(cluster_ids)
+    arrays["cluster_name_offsets"], arrays["cluster_name_blob"] = encode_strings(
+        [cluster_names.get(c, UNASSIGNED_CLUSTER_NAME) for c in cluster_ids]
+    )
+    # Solo los clusters con nombre se listan en /clusters
+    arrays["cluster_listed"] = np.asarray([c in cluster_names for c in cluster_ids], dtype=np.uint8)
+
+    # Cada artículo ya serializado tal como lo devuelve la API: una página se arma uniendo bytes
+    records = [
+        serialize(dict({field: column[row] for field, column in text_columns.items()},
+                       final_cluster=article_cluster_ids[row],
+                       cluster_name=cluster_names.get(article_cluster_ids[row], UNASSIGNED_CLUSTER_NAME)))
+        for row in range(len(merged_df))
+    ]
+    arrays["record_json_offsets"] = np.zeros(len(records) + 1, dtype=np.int64)
+    arrays["record_json_offsets"][1:] = np.cumsum([len(record) for record in records])
+    arrays["record_json_blob"] = np.frombuffer(b"".join(records), dtype=np.uint8)
+
+    search_index = InvertedIndex.build(merged_df["title"], merged_df["abstract"], STOPWORDS)
+    arrays.update(search_index.to_arrays())
+
+    meta = {
+        "format": "serving_snapshot",
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "data_version": data_version(SOURCE_PATHS),
+        "sources": source_stamps(SOURCE_PATHS),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "num_articles": len(merged_df),
+    }
+    return arrays, meta
+
+
+def build_snapshot(path=SNAPSHOT_PATH):
+    """Construye y guarda el snapshot de datos que sirve la API."""
+    arrays, meta = build_snapshot_arrays()
+    write_artifact(path, arrays, meta)
+    return meta
+
+
+# === LECTURA (API) ===
+class ServingData:
+    """Datos de solo lectura que sirve la API: artículos, clusters e índice de búsqueda."""
+
+    def __init__(self, arrays, meta, stale_sources=()):
+        self.meta = meta
+        self.version = meta["data_version"]
+        # Archivos de entrada modificados después de construir el snapshot (vacío si está al día)
+        self.stale_sources = list(stale_sources)
+        self.columns = {
+            field: StringColumn(arrays[f"{field}_offsets"], arrays[f"{field}_blob"]) for field in ARTICLE_FIELDS
+        }
+        self.cluster_codes = arrays["cluster_codes"]
+        self.cluster_ids = decode_strings(arrays["cluster_id_offsets"], arrays["cluster_id_blob"])
+        self.cluster_names = decode_strings(arrays["cluster_name_offsets"], arrays["cluster_name_blob"])
+        self.cluster_listed = arrays["cluster_listed"].astype(bool)
+        self.cluster_code_by_id = {cluster_id: code for code, cluster_id in enumerate(self.cluster_ids)}
+        self.cluster_counts = np.bincount(self.cluster_codes, minlength=len(self.cluster_ids))
+        # Miembros de cada cluster como filas ordenadas (CSR): cluster_ptr[c]:cluster_ptr[c+1] en cluster_rows
+        self.cluster_ptr = np.zeros(len(self.cluster_ids) + 1, dtype=np.int64)
+        self.cluster_ptr[1:] = np.cumsum(self.cluster_counts)
+        self.cluster_rows = np.argsort(self.cluster_codes, kind="stable").astype(np.int32)
+        self.search_index = InvertedIndex.from_arrays(arrays)
+        # Artículos pre-serializados: vista sin copia sobre el blob (mmap)
+        self.record_json_offsets = arrays["record_json_offsets"]
+        self.record_json_blob = memoryview(arrays["record_json_blob"])
+
+    def __len__(self):
+        return len(self.cluster_codes)
+
+    @classmethod
+    def load(cls, path=SNAPSHOT_PATH):
+        """Abre el snapshot con mmap: los procesos que lo abren comparten las mismas páginas."""
+        arrays, meta = open_artifact(path)
+        if meta.get("format") != "serving_snapshot" or meta.get("version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"{path} no es un snapshot compatible (versión {SNAPSHOT_FORMAT_VERSION}).")
+        return cls(arrays, meta, stale_sources(meta))
+
+    @classmethod
+    def from_sources(cls):
+        """Construye los datos en memoria desde los CSV (respaldo si no existe el snapshot)."""
+        arrays, meta = build_snapshot_arrays()
+        return cls(arrays, meta)
+
+    def cluster_members(self, code):
+        """Filas del cluster `code` ordenadas de menor a mayor (vacío si el código no existe)."""
+        if not 0 <= code < len(self.cluster_ids):
+            return self.cluster_rows[:0]
+        return self.cluster_rows[self.cluster_ptr[code]:self.cluster_ptr[code + 1]]
+
+    def in_cluster(self, rows, code):
+        """
+        Máscara de las filas `rows` (ordenadas) que pertenecen al cluster `code`: intersección de
+        dos arrays ordenados, buscando los elementos del más corto en el más largo.
+        """
+        members = self.cluster_members(code)
+        if len(members) == 0 or len(rows) == 0:
+            return np.zeros(len(rows), dtype=bool)
+        if len(rows) <= len(members):
+            positions = np.minimum(np.searchsorted(members, rows), len(members) - 1)
+            return members[positions] == rows
+        positions = np.searchsorted(rows, members)
+        found = positions < len(rows)
+        positions = positions[found][rows[positions[found]] == members[found]]
+        mask = np.zeros(len(rows), dtype=bool)
+        mask[positions] = True
+        return mask
+
+    @cached_property
+    def row_by_article_id(self):
+        """Índice id PMC -> fila (se construye la primera vez que se necesita)."""
+        links = self.columns["link"]
+        return {article_id_from_link(links[row]): row for row in range(len(self))}
+
+    def record(self, row):
+        """Devuelve el artículo de la fila `row` en el formato de la API."""
+        code = self.cluster_codes[row]
+        record = {field: column[row] for field, column in self.columns.items()}
+        record["final_cluster"] = self.cluster_ids[code]
+        record["cluster_name"] = self.cluster_names[code]
+        return record
+
+    def records(self, rows):
+        return [self.record(row) for row in rows]
+
+    def records_json(self, rows):
+        """
+        Lista JSON (bytes) de los artículos de `rows`, idéntica a serializar `records(rows)`, pero
+        uniendo los fragmentos precalculados del snapshot sin decodificar ni copiar cada campo.
+        """
+        offsets, blob = self.record_json_offsets, self.record_json_blob
+        return b"[" + b",".join([blob[offsets[row]:offsets[row + 1]] for row in rows]) + b"]"
+
+
+if __name__ == "__main__":
+    print("Construyendo snapshot de datos para la API...")
+    start = time.perf_counter()
+    snapshot_meta = build_snapshot()
+    print(f"Snapshot guardado en: {SNAPSHOT_PATH}")
+    print(f"Versión de datos: {snapshot_meta['data_version']} | Artículos: {snapshot_meta['num_articles']} "
+          f"| Tiempo: {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,120 @@
+import os
+import time
+import pickle
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from artifact_store import write_artifact, open_artifact
+from serving_snapshot import ServingData, SNAPSHOT_PATH
+
+SIMILAR_FORMAT_VERSION = 1
+
+# === RUTAS ===
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, "../models")
+TFIDF_VECTORIZER_PATH = os.path.join(MODEL_DIR, "tfidf_vectorizer.pkl")
+SIMILAR_PATH = os.path.join(MODEL_DIR, "similar_articles.bin")
+
+# === CONFIGURACIÓN ===
+TOP_K = 20
+# Máximo de celdas (filas del bloque x artículos) de la matriz densa de similitud por bloque
+BLOCK_CELLS = 8_000_000
+
+# Matriz TF-IDF del corpus en cada proceso del pool (se envía una vez, en el initializer)
+_worker_matrix = None
+
+
+def _init_worker(matrix):
+    global _worker_matrix
+    _worker_matrix = matrix
+
+
+def _top_k_block(args):
+    """Calcula los k vecinos más similares (coseno) de las filas [start, end)."""
+    start, end, k = args
+    matrix = _worker_matrix
+    # Las filas TF-IDF ya están normalizadas (norma L2), así que el producto escalar es el coseno
+    sims = (matrix[start:end] @ matrix.T).toarray().astype(np.float32)
+    sims[np.arange(end - start), np.arange(start, end)] = -np.inf  # excluir el propio artículo
+
+    k = min(k, sims.shape[1] - 1)
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_sims, axis=1, kind="stable")
+    return start, np.take_along_axis(top, order, axis=1).astype(np.int32), np.take_along_axis(top_sims, order, axis=1)
+
+
+def build_similar_articles(matrix, k=TOP_K, workers=None):
+    """
+    Tabla de los k vecinos más similares de cada artículo mediante productos dispersos por
+    bloques de filas, repartidos entre procesos. La memoria por bloque está acotada por BLOCK_CELLS.
+    """
+    num_docs = matrix.shape[0]
+    k = min(k, num_docs - 1)
+    if k <= 0:
+        return np.empty((num_docs, 0), dtype=np.int32), np.empty((num_docs, 0), dtype=np.float32)
+    block_rows = max(1, BLOCK_CELLS // max(num_docs, 1))
+    blocks = [(start, min(start + block_rows, num_docs), k) for start in range(0, num_docs, block_rows)]
+
+    neighbours = np.empty((num_docs, k), dtype=np.int32)
+    scores = np.empty((num_docs, k), dtype=np.float32)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(matrix,)) as pool:
+        for start, block_neighbours, block_scores in pool.map(_top_k_block, blocks):
+            neighbours[start:start + len(block_neighbours)] = block_neighbours
+            scores[start:start + len(block_scores)] = block_scores
+    return neighbours, scores
+
+
+class SimilarArticles:
+    """Tabla precalculada de vecinos: la consulta de un artículo es un slice de k elementos."""
+
+    def __init__(self, neighbours, scores, meta):
+        self.neighbours = neighbours
+        self.scores = scores
+        self.meta = meta
+        self.data_version = meta["data_version"]
+
+    @classmethod
+    def load(cls, path=SIMILAR_PATH):
+        arrays, meta = open_artifact(path)
+        if meta.get("format") != "similar_articles" or meta.get("version") != SIMILAR_FORMAT_VERSION:
+            raise ValueError(f"{path} no es una tabla de artículos similares compatible.")
+        return cls(arrays["neighbours"], arrays["scores"], meta)
+
+    def query(self, row, limit):
+        """Devuelve (filas vecinas, similitudes) del artículo `row`."""
+        return self.neighbours[row, :limit], self.scores[row, :limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precalcula la tabla de artículos similares (TF-IDF + coseno).")
+    parser.add_argument("--k", type=int, default=TOP_K, help="Número de vecinos por artículo.")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto, todos los núcleos).")
+    args = parser.parse_args()
+
+    print("Cargando snapshot de datos y vectorizador TF-IDF...")
+    # Se usa el snapshot para que las filas de la tabla coincidan con las que sirve la API
+    data = ServingData.load(SNAPSHOT_PATH)
+    with open(TFIDF_VECTORIZER_PATH, "rb") as f:
+        tfidf_vectorizer = pickle.load(f)
+    clean_abstracts = data.columns["clean_abstract"]
+    tfidf_matrix = tfidf_vectorizer.transform(clean_abstracts[i] for i in range(len(data))).tocsr()
+
+    print(f"Calculando los {args.k} vecinos más similares de {len(data)} artículos...")
+    start = time.perf_counter()
+    neighbours, scores = build_similar_articles(tfidf_matrix, k=args.k, workers=args.workers)
+    print(f"Tabla calculada en {time.perf_counter() - start:.2f} s.")
+
+    meta = {
+        "format": "similar_articles",
+        "version": SIMILAR_FORMAT_VERSION,
+        "data_version": data.version,
+        "k": int(neighbours.shape[1]),
+    }
+    write_artifact(SIMILAR_PATH, {"neighbours": neighbours, "scores": scores}, meta)
+    print(f"Tabla de artículos similares guardada en: {SIMILAR_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import re
+
+# Caracteres que no son letras ni espacios (se eliminan antes de separar en palabras)
+NON_ALPHA_RE = re.compile(r"[^a-z\s]")
+
+
+def tokenize(text, stopwords):
+    """
+    Devuelve la lista de tokens limpios y normalizados de un texto en inglés.
+    No depende de NLTK: la lista de stopwords se recibe como parámetro.
+    """
+    if not isinstance(text, str):
+        return []
+    text = text.lower()  # pasar a minúsculas
+    text = NON_ALPHA_RE.sub("", text)  # eliminar caracteres no alfabéticos
+    tokens = text.split()  # dividir en palabras
+    return [t for t in tokens if t not in stopwords and len(t) > 2]  # quitar stopwords